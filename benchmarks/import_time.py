@@ -0,0 +1,85 @@
+"""
+Import time of the entry point of each mode, measured in fresh interpreters.
+
+>>> python benchmarks/import_time.py --repeat 5
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules imported by main.py for each mode
+MODES = {
+    "cli": ("core.utils.type_collection",),
+    "train": ("core.models.train_test", "core.models.decisiontree", "core.models.search"),
+    "test": ("core.models.train_test",),
+    "serve": ("core.serving.server",),
+}
+
+# heavy modules which must not be loaded by the test and serve modes
+TRAIN_ONLY = (
+    "sklearn.model_selection",
+    "sklearn.inspection",
+    "sklearn.ensemble",
+    "sklearn.svm",
+    "sklearn.linear_model",
+    "scipy.stats",
+    "openpyxl",
+)
+
+_PROBE = """
+import sys, json, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps(dict(seconds=elapsed, modules=[m for m in {heavy!r} if m in sys.modules])))
+"""
+
+
+def measure(modules: tuple, repeat: int = 3) -> dict:
+    """
+    Median import time of the modules and the heavy modules they load.
+    """
+    runs = list()
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=", ".join(modules), heavy=TRAIN_ONLY)],
+            cwd=ROOT,
+            stdout=subprocess.PIPE,
+            check=True,
+        ).stdout
+        runs.append(json.loads(output.decode().strip().splitlines()[-1]))
+    seconds = sorted(r["seconds"] for r in runs)[len(runs) // 2]
+    return dict(seconds=seconds, modules=runs[0]["modules"])
+
+
+def main(args):
+    result = {mode: measure(modules, args.repeat) for mode, modules in MODES.items()}
+    for mode, r in result.items():
+        print(f"[{mode}] {r['seconds']:.3f}s, train-only modules loaded: {r['modules']}")
+    if args.output:
+        with open(args.output, "w") as json_file:
+            json.dump(result, json_file, indent=2)
+
+    failed = [
+        mode
+        for mode in ("test", "serve")
+        if result[mode]["modules"]
+        or (args.max_seconds is not None and result[mode]["seconds"] > args.max_seconds)
+    ]
+    if failed:
+        print(f"Import time regression in: {failed}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max_seconds", type=float, default=None)
+    parser.add_argument("--output", type=str, default=None)
+
+    main(parser.parse_args())
@@ -0,0 +1,281 @@
+"""
+Time and memory of each stage of the train/test pipeline on synthetic data.
+
+Results are saved as JSON, named after the commit, so runs can be compared.
+
+>>> python benchmarks/run.py --shape Marketing_NaNs_Train --n_rows 1000000
+>>> python benchmarks/run.py --compare benchmarks/results/<before>.json benchmarks/results/<after>.json
+"""
+import os
+import sys
+import json
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import SHAPES, make_shape  # noqa: E402
+from core.utils.profiler import Profiler  # noqa: E402
+
+
+@contextmanager
+def _stage(profiler, name: str, trace_memory: bool = False):
+    """
+    Profile a stage of the run, with the peak of its traced allocations if enabled.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        with profiler.stage(name) as stage:
+            yield stage
+    finally:
+        record = next(r for r in reversed(profiler.records) if r["name"] == name)
+        if trace_memory:
+            record["traced_peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+        print(f"[{name}] {record['wall']:.3f}s, peak RSS {record['peak_rss_mb']:.0f}MB")
+
+
+def _stages(profiler) -> dict:
+    """
+    Measurements of the stages of the run, without the ones nested in them.
+    """
+    stages = dict()
+    for r in profiler.to_records():
+        if "/" in r["name"]:
+            continue
+        stages[r["name"]] = dict(
+            seconds=r["wall"],
+            cpu_seconds=r["cpu"],
+            peak_rss_mb=r["peak_rss_mb"],
+            peak_rss_growth_mb=r["rss_growth_mb"],
+        )
+        if "traced_peak_mb" in r:
+            stages[r["name"]]["traced_peak_mb"] = r["traced_peak_mb"]
+    return stages
+
+
+def run(
+    shape: str,
+    n_rows: int = None,
+    n_test_rows: int = None,
+    problem_type: str = "binary",
+    cv: int = 3,
+    chunksize: int = None,
+    report_format: str = "csv",
+    n_jobs: int = 1,
+    trace_memory: bool = False,
+    work_dir: str = None,
+    compact: bool = False,
+) -> dict:
+    """
+    Run every stage of the pipeline once and return the measurements.
+
+    Args
+    ------
+    shape: str, shape of the synthetic data, one of SHAPES
+    n_rows: int, number of train rows, the one of the sample if not given
+    n_test_rows: int, number of test rows, a quarter of the train rows if not given
+    problem_type: str, problem type which is one of 'binary', 'multiclass', 'regression'
+    cv: int, 'K' value for the cross validation
+    chunksize: int, if given, load the train data in chunks
+    report_format: str, format of the reports
+    n_jobs: int, number of processes scoring the test data
+    trace_memory: bool, trace the allocations of each stage(slows the stages down)
+    work_dir: str, folder for the data and the reports, a temporary one if not given
+    compact: bool, load categorical features as codes and numeric features downcast
+    """
+    from core.data.load import load
+    from core.preprocessing.preprocess import auto_preprocess, make_data_fit
+    from core.evaluation.cv import cross_validate_once
+    from core.models.inference import ParallelPredictor
+    from core.models.registry import load_artifact
+    from core.models.zoo import make_estimator
+    from core.utils.feature_select import select_feature
+    from core.utils.manage_report import (
+        export_test_report,
+        export_train_report,
+        generate_file_id,
+        read_report,
+    )
+
+    target = "target"
+    n_rows = n_rows or SHAPES[shape]["n_rows"]
+    n_test_rows = n_test_rows or max(n_rows // 4, 1)
+    profiler = Profiler()
+
+    with profiler, tempfile.TemporaryDirectory(dir=work_dir) as folder:
+        train_path = os.path.join(folder, "train.csv")
+        test_path = os.path.join(folder, "test.csv")
+        with _stage(profiler, "generate", trace_memory):
+            make_shape(shape, n_rows, problem_type=problem_type).to_csv(train_path, index=False)
+            make_shape(shape, n_test_rows, problem_type=problem_type, random_state=7).to_csv(
+                test_path, index=False
+            )
+
+        with _stage(profiler, "load", trace_memory):
+            data, meta = load(train_path, target, problem_type, chunksize=chunksize, compact=compact)
+        with _stage(profiler, "auto_preprocess", trace_memory):
+            data, meta, encoder = auto_preprocess(data, meta)
+        data_mb = data.memory_usage(deep=True).sum() / 2 ** 20
+
+        X, y = data.drop(target, axis=1), data[target]
+        with _stage(profiler, "select_feature", trace_memory):
+            features = select_feature(X=X, y=y, problem_type=problem_type)
+        meta = meta._replace(features_for_train=features)
+        X = X.loc[:, features]
+
+        estimator = make_estimator("dt", problem_type)
+        with _stage(profiler, "evaluate_cv", trace_memory):
+            cross_validate_once(estimator, X.values, y.values, cv)
+
+        file_id = generate_file_id()
+        with _stage(profiler, "export_train_report", trace_memory):
+            export_train_report(
+                X=X,
+                y=y,
+                meta=meta,
+                estimator=estimator,
+                cv=cv,
+                file_id=file_id,
+                save_path=folder,
+                encoder=encoder,
+                report_format=report_format,
+            )
+        artifact_path = os.path.join(folder, f"dt_{file_id}")
+
+        with _stage(profiler, "load_artifact", trace_memory):
+            artifact = load_artifact(artifact_path)
+        with _stage(profiler, "read_report", trace_memory):
+            read_report(artifact_path)
+
+        with _stage(profiler, "make_data_fit", trace_memory):
+            test_data = make_data_fit(test_path, artifact.meta, pipeline=artifact.pipeline)
+
+        with _stage(profiler, "score", trace_memory):
+            with ParallelPredictor(artifact.estimator, n_jobs=n_jobs) as predictor:
+                predictor.predict(test_data[artifact.pipeline.features].to_numpy())
+        with _stage(profiler, "export_test_report", trace_memory):
+            export_test_report(
+                artifact.estimator,
+                test_data,
+                file_id,
+                folder,
+                target,
+                report_format=report_format,
+                n_jobs=n_jobs,
+            )
+
+    stages = _stages(profiler)
+    return dict(
+        config=dict(
+            shape=shape,
+            n_rows=n_rows,
+            n_test_rows=n_test_rows,
+            problem_type=problem_type,
+            cv=cv,
+            chunksize=chunksize,
+            report_format=report_format,
+            n_jobs=n_jobs,
+            trace_memory=trace_memory,
+            compact=compact,
+        ),
+        environment=_environment(),
+        stages=stages,
+        total_seconds=sum(s["seconds"] for s in stages.values()),
+        # the peak RSS of the process only grows, so the one of the last stage is the peak
+        peak_rss_mb=max(s["peak_rss_mb"] for s in stages.values()),
+        data_mb=data_mb,
+        profile=profiler.to_records(),
+    )
+
+
+def compare(before: dict, after: dict) -> list:
+    """
+    Ratio of the time of each stage after to before, the lower the faster.
+    """
+    rows = list()
+    for name, stage in after["stages"].items():
+        if name in before["stages"]:
+            old = before["stages"][name]["seconds"]
+            rows.append((name, old, stage["seconds"], stage["seconds"] / old if old else float("nan")))
+    return rows
+
+
+def _environment() -> dict:
+    import numpy
+    import pandas
+    import sklearn
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        ).stdout.decode().strip()
+    except OSError:
+        commit = ""
+
+    return dict(
+        commit=commit,
+        timestamp=datetime.now().isoformat(timespec="seconds"),
+        python=platform.python_version(),
+        numpy=numpy.__version__,
+        pandas=pandas.__version__,
+        sklearn=sklearn.__version__,
+        cpu_count=os.cpu_count(),
+    )
+
+
+def main(args):
+    if args.compare:
+        with open(args.compare[0]) as before, open(args.compare[1]) as after:
+            rows = compare(json.load(before), json.load(after))
+        for name, old, new, ratio in rows:
+            print(f"[{name}] {old:.3f}s -> {new:.3f}s (x{ratio:.2f})")
+        return
+
+    result = run(
+        shape=args.shape,
+        n_rows=args.n_rows,
+        n_test_rows=args.n_test_rows,
+        problem_type=args.problem_type,
+        cv=args.cv,
+        chunksize=args.chunksize,
+        report_format=args.report_format,
+        n_jobs=args.n_jobs,
+        trace_memory=args.trace_memory,
+        compact=args.compact,
+    )
+
+    output = args.output
+    if output is None:
+        folder = os.path.join(ROOT, "benchmarks", "results")
+        os.makedirs(folder, exist_ok=True)
+        name = (result["environment"]["commit"][:8] or "local") + "_" + datetime.now().strftime("%Y%m%d%H%M%S")
+        output = os.path.join(folder, f"{name}.json")
+    with open(output, "w") as json_file:
+        json.dump(result, json_file, indent=2)
+    print(f"Benchmark of {result['total_seconds']:.2f}s has been saved in '{output}'.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shape", type=str, default="Marketing_NaNs_Train", choices=list(SHAPES))
+    parser.add_argument("--n_rows", type=int, default=None)
+    parser.add_argument("--n_test_rows", type=int, default=None)
+    parser.add_argument("--problem_type", type=str, default="binary")
+    parser.add_argument("--cv", type=int, default=3)
+    parser.add_argument("--chunksize", type=int, default=None)
+    parser.add_argument("--report_format", type=str, default="csv")
+    parser.add_argument("--n_jobs", type=int, default=1)
+    parser.add_argument("--trace_memory", action="store_true")
+    parser.add_argument("--compact", action="store_true")
+    parser.add_argument("--output", type=str, default=None)
+    parser.add_argument("--compare", type=str, nargs=2, default=None)
+
+    main(parser.parse_args())
@@ -0,0 +1,110 @@
+"""
+Synthetic datasets shaped like the samples of DataTypes, at any scale.
+
+>>> python benchmarks/synthetic.py --shape MarketingTrain --n_rows 1000000 --output /tmp/marketing_1m.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+
+# shapes of the samples in DataTypes: columns, cardinality of the categorical ones and NaN rate
+SHAPES = {
+    "MarketingTrain": dict(
+        n_rows=36168, n_numeric=7, n_categorical=9, cardinality=12, nan_rate=0.0
+    ),
+    "Marketing_NaNs_Train": dict(
+        n_rows=36168, n_numeric=7, n_categorical=9, cardinality=12, nan_rate=0.05
+    ),
+    "TitanicTrain": dict(
+        n_rows=891, n_numeric=5, n_categorical=4, cardinality=150, nan_rate=0.08, id_column=True
+    ),
+}
+
+
+def make_dataset(
+    n_rows: int,
+    n_numeric: int,
+    n_categorical: int,
+    cardinality: int,
+    nan_rate: float = 0.0,
+    problem_type: str = "binary",
+    target: str = "target",
+    id_column: bool = False,
+    random_state=42,
+) -> pd.DataFrame:
+    """
+    Make a dataset whose target depends on a few of its features.
+
+    Args
+    ------
+    n_rows: int, number of rows
+    n_numeric: int, number of numeric features(integer and float columns alternately)
+    n_categorical: int, number of categorical features
+    cardinality: int, number of categories of each categorical feature
+    nan_rate: float, rate of missing values in each feature
+    problem_type: str, problem type which is one of 'binary', 'multiclass', 'regression'
+    target: str, name of the target column
+    id_column: bool, add a unique ID column which the preprocessing should drop
+    """
+    rng = np.random.RandomState(random_state)
+    columns = dict()
+    if id_column:
+        columns["id"] = np.arange(1, n_rows + 1)
+
+    signal = np.zeros(n_rows)
+    for i in range(n_numeric):
+        values = rng.lognormal(3, 1, n_rows) if i % 2 else rng.normal(0, 1, n_rows)
+        if i < 3:
+            signal += (values - values.mean()) / values.std() * (1.0 / (i + 1))
+        columns[f"num_{i}"] = np.round(values) if i % 2 else values
+
+    vocabulary = np.array([f"c{j}" for j in range(cardinality)], dtype=object)
+    for i in range(n_categorical):
+        # skewed frequencies like the real samples
+        p = 1.0 / np.arange(1, cardinality + 1)
+        codes = rng.choice(cardinality, n_rows, p=p / p.sum())
+        if i < 2:
+            signal += np.where(codes % 3 == 0, 0.5, -0.25)
+        columns[f"cat_{i}"] = vocabulary[codes]
+
+    data = pd.DataFrame(columns)
+    if nan_rate > 0:
+        for c in data.columns:
+            if c != "id":
+                data.loc[rng.rand(n_rows) < nan_rate, c] = np.nan
+
+    noise = rng.normal(0, 1, n_rows)
+    if problem_type == "regression":
+        data[target] = signal + noise
+    elif problem_type == "multiclass":
+        data[target] = np.digitize(signal + noise, np.quantile(signal + noise, [1 / 3, 2 / 3]))
+    else:
+        data[target] = (signal + noise > np.quantile(signal + noise, 0.85)).astype(np.int64)
+
+    return data
+
+
+def make_shape(shape: str, n_rows: int = None, **kwargs) -> pd.DataFrame:
+    """
+    Make a dataset in the shape of a DataTypes sample, optionally with another number of rows.
+    """
+    params = dict(SHAPES[shape])
+    if n_rows is not None:
+        params["n_rows"] = n_rows
+    params.update(kwargs)
+    return make_dataset(**params)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shape", type=str, default="Marketing_NaNs_Train", choices=list(SHAPES))
+    parser.add_argument("--n_rows", type=int, default=None)
+    parser.add_argument("--problem_type", type=str, default="binary")
+    parser.add_argument("--output", type=str, required=True)
+
+    args = parser.parse_args()
+    make_shape(args.shape, args.n_rows, problem_type=args.problem_type).to_csv(
+        args.output, index=False
+    )
@@ -1,5 +1,15 @@
-import core.data
-import core.evaluation
-import core.models
-import core.preprocessing
-import core.utils
\ No newline at end of file
+import importlib
+
+
+# subpackages are imported on first access(PEP 562), so each mode loads only what it uses
+_SUBPACKAGES = ("data", "evaluation", "models", "preprocessing", "serving", "utils")
+
+
+def __getattr__(name):
+    if name in _SUBPACKAGES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_SUBPACKAGES))
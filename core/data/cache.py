@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+
+class DatasetCache:
+    """
+    Content-addressed on-disk cache of parsed and preprocessed datasets.
+
+    Each entry is a folder named after the hash of the source file and of the
+    preprocessing config. It holds one uncompressed .npy file per column, which
+    is memory-mapped on load, and a manifest.json with the column layout and
+    any json-serializable payload (meta data, encoders) stored alongside.
+
+    Args
+    ------
+    cache_dir: str, folder to keep the cache entries
+    """
+
+    MANIFEST = "manifest.json"
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def key(self, input: str, config: dict) -> str:
+        """
+        Make a cache key from the content of the input file and the config.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        with open(input, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        digest.update(json.dumps(config, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> ("data", "payload"):
+        """
+        Return cached (data, payload) of the key, or None if there is no entry.
+        """
+        entry = os.path.join(self.cache_dir, key)
+        manifest_path = os.path.join(entry, self.MANIFEST)
+        if not os.path.exists(manifest_path):
+            return None
+
+        start = time.perf_counter()
+        with open(manifest_path, "r") as json_file:
+            manifest = json.load(json_file)
+
+        columns = dict()
+        for i, (name, dtype) in enumerate(manifest["columns"]):
+            path = os.path.join(entry, f"{i}.npy")
+            if dtype == "object":
+                columns[name] = np.load(path, allow_pickle=True)
+            else:
+                columns[name] = np.load(path, mmap_mode="r")
+        # one block per column left on its map, rather than consolidated into copies
+        # (pandas before 1.3 ignores copy=False for dicts and consolidates them)
+        data = pd.DataFrame(
+            columns, columns=[name for name, _ in manifest["columns"]], copy=False
+        )
+
+        elapsed = time.perf_counter() - start
+        print(f"Cache hit '{key}': loaded {data.shape} in {elapsed:.3f}s.")
+
+        return data, manifest["payload"]
+
+    def put(self, key: str, data: pd.DataFrame, payload: dict = None):
+        """
+        Store the data and payload under the key.
+        """
+        entry = os.path.join(self.cache_dir, key)
+        temp = entry + ".tmp"
+        if os.path.exists(temp):
+            shutil.rmtree(temp)
+        os.makedirs(temp)
+
+        columns = list()
+        for i, name in enumerate(data.columns):
+            values = data[name].to_numpy()
+            np.save(os.path.join(temp, f"{i}.npy"), values, allow_pickle=values.dtype == object)
+            columns.append((name, str(values.dtype)))
+
+        with open(os.path.join(temp, self.MANIFEST), "w") as json_file:
+            json.dump(dict(columns=columns, payload=payload), json_file, default=_to_builtin)
+
+        # publish the entry at once so that a half-written entry is never read
+        if os.path.exists(entry):
+            shutil.rmtree(entry)
+        os.rename(temp, entry)
+        print(f"Cache miss '{key}': stored {data.shape} in '{entry}'.")
+
+
+def _to_builtin(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
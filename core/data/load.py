@@ -3,14 +3,43 @@ from typing import NamedTuple
 
 import pandas as pd
 import numpy as np
+from pandas.api.types import union_categoricals
 
+from core.data.sketch import QuantileSketch
+from core.data.profile import is_categorical, profile_columns
 
-def load(input: 'data path', target: 'target name', problem_type: str) -> ("data", "meta"):
+
+def load(
+    input: 'data path',
+    target: 'target name',
+    problem_type: str,
+    chunksize: int = None,
+    compact: bool = False,
+) -> ("data", "meta"):
     """
     Load dataset and generate meta data.
+
+    Args
+    ------
+    input: str, path of dataset
+    target: str, name of the target column
+    problem_type: str, problem type which is one of 'binary', 'multiclass', 'regression'
+    chunksize: int, if given, read the file in chunks of this many rows and build the meta
+        data in a single pass. Every chunk is compacted as it is read(numeric features
+        downcast, strings as pandas categoricals), so the memory held is about the one
+        of the compacted data, not bounded by the chunk size
+    compact: bool, keep categorical features as pandas categoricals(small integer codes
+        over one vocabulary per column) and downcast numeric features to the smallest
+        dtype holding their values exactly. The target is left as it is. Always done
+        with chunksize
     """
+    if chunksize:
+        return _load_stream(input, target, problem_type, chunksize)
+
     data = pd.read_csv(input)
     meta = _summarize(data, Meta(target=target, problem_type=problem_type))
+    if compact:
+        data = _compact(data, meta)
 
     return data, meta
 
@@ -23,29 +52,185 @@ class Meta(NamedTuple):
     encoder_path: str = None
     features_for_train: list = list()
     stats: dict = None
+    profile: dict = None
+    stage_profile: list = None
+    bin_edges: dict = None
+    summary: dict = None
+    imputation: dict = None
 
 
 def _summarize(data: pd.DataFrame, meta: NamedTuple) -> 'meta':
-    cats = _infer_categorical(data, meta)
+    profile = profile_columns(data)
+    cats = [
+        c
+        for c, dtype in profile["dtype"].items()
+        if dtype == "categorical" and c != meta.target
+    ]
     meta = meta._replace(categorical=cats)
 
     stats = dict()
-    for c in data.drop(meta.target, axis=1).columns:
+    for c in data.columns.drop(meta.target):
         if c in meta.categorical: # categorical
-            value = data.loc[data[c].notnull(), c].value_counts().index[0]
-            stats[c] = (value, 'MODE')
+            stats[c] = (profile["mode"][c], 'MODE')
         else: # numeric
-            value = data.loc[data[c].notnull(), c].median()
-            stats[c] = (value, 'MEDIAN')
-    meta = meta._replace(stats=stats)
+            stats[c] = (profile["median"][c], 'MEDIAN')
+    meta = meta._replace(stats=stats, profile=profile)
     return meta
 
 
+def _load_stream(
+    input: str, target: str, problem_type: str, chunksize: int
+) -> ("data", "meta"):
+    """
+    Read the csv file chunk by chunk, accumulating mode counts, median sketches and
+    null counts on the way. Each chunk is compacted as soon as it is read(numeric
+    columns downcast, strings turned into categoricals) and split into its columns,
+    which are then copied into the frame one at a time, so the memory held is about
+    the one of the compacted frame, rather than the one of all the chunks and of their
+    concatenation.
+    """
+    columns = dict()
+    null_counts = None
+    mode_counts = dict()
+    sketches = dict()
+
+    for chunk in pd.read_csv(input, chunksize=chunksize):
+        nulls = chunk.isnull().sum()
+        null_counts = nulls if null_counts is None else null_counts.add(nulls, fill_value=0)
+
+        for c in chunk.columns.drop(target):
+            if chunk[c].dtype == object:
+                counts = chunk[c].value_counts()
+                if c in mode_counts:
+                    counts = mode_counts[c].add(counts, fill_value=0)
+                mode_counts[c] = counts
+            else:
+                sketches.setdefault(c, QuantileSketch()).update(chunk[c].to_numpy())
+
+        chunk = _downcast(chunk)
+        for c in chunk.columns:
+            if c != target and chunk[c].dtype == object:
+                part = chunk[c].astype("category")
+            else:
+                # copied out of the block of the chunk, to be released on its own
+                part = chunk[c].copy()
+            columns.setdefault(c, list()).append(part)
+        del chunk
+
+    data, n_unique = _assemble(columns)
+
+    meta = Meta(target=target, problem_type=problem_type)
+    meta = meta._replace(categorical=_infer_categorical(data, meta))
+
+    stats = dict()
+    for c in data.columns.drop(target):
+        if c in meta.categorical:
+            # columns which were numeric in some chunks have to be counted again
+            if c in sketches:
+                counts = data.loc[data[c].notnull(), c].value_counts()
+            else:
+                counts = mode_counts[c]
+            stats[c] = (counts.idxmax(), 'MODE')
+        else:
+            stats[c] = (sketches[c].median(), 'MEDIAN')
+    meta = meta._replace(stats=stats)
+    meta = meta._replace(profile=_make_profile(data, null_counts, n_unique))
+
+    return data, meta
+
+
+def _compact(data: pd.DataFrame, meta: NamedTuple) -> pd.DataFrame:
+    """
+    Categorical features to pandas categoricals, whose categories are sorted like the
+    classes of LabelEncoder, integer features to the smallest integer dtype and float
+    features to float32 unless their values overflow it. Tree estimators split on
+    float32 values anyway, and the statistics of the meta data are computed before.
+    """
+    limit = np.finfo(np.float32).max
+    for c in data.columns.drop(meta.target):
+        if c in meta.categorical:
+            data[c] = data[c].astype("category")
+        elif data[c].dtype.kind in "iu":
+            data[c] = pd.to_numeric(data[c], downcast="integer")
+        elif data[c].dtype == np.float64 and not (data[c].abs() > limit).any():
+            data[c] = data[c].astype(np.float32)
+    return data
+
+
+def _assemble(columns: dict) -> ("data", "n_unique"):
+    """
+    Build the frame from the parts(one per chunk) of each column, releasing the parts
+    of a column as soon as they are copied into it, so the memory held is the one of
+    the frame plus the parts not copied yet. The number of unique values of each column
+    is counted on the way.
+    """
+    data = dict()
+    n_unique = dict()
+    for c in list(columns):
+        parts = columns.pop(c)
+        if any(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            data[c] = _concat_categorical(parts)
+            n_unique[c] = len(data[c].cat.categories)
+        else:
+            data[c] = np.concatenate([p.to_numpy() for p in parts])
+            n_unique[c] = int(pd.Series(data[c], copy=False).nunique())
+        del parts
+    # one block per column left as it is, rather than consolidated into copies
+    # (pandas before 1.3 ignores copy=False for dicts and consolidates them)
+    return pd.DataFrame(data, columns=list(data), copy=False), n_unique
+
+
+def _concat_categorical(parts: list) -> pd.Series:
+    """
+    Concatenate parts of a column whose categoricals have different categories, merging
+    the categories instead of falling back to strings.
+    """
+    # chunks where the column was all missing or numeric are read as numbers
+    parts = [
+        p if isinstance(p.dtype, pd.CategoricalDtype) else p.astype(object).astype("category")
+        for p in parts
+    ]
+    try:
+        return pd.Series(union_categoricals(parts, sort_categories=True), name=parts[0].name)
+    except TypeError:
+        # categories mixing strings and numbers can not be sorted together
+        return pd.concat([p.astype(object) for p in parts], ignore_index=True).astype("category")
+
+
+def _downcast(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Downcast numeric columns to the smallest dtype which holds their values.
+    """
+    for c in data.columns:
+        kind = data[c].dtype.kind
+        if kind in "iu":
+            data[c] = pd.to_numeric(data[c], downcast="integer")
+        elif kind == "f":
+            data[c] = pd.to_numeric(data[c], downcast="float")
+    return data
+
+
+def _make_profile(data: pd.DataFrame, null_counts: pd.Series, n_unique: dict) -> dict:
+    """
+    Profile of the streamed data, from the counts accumulated while it was read.
+    """
+    n_rows = data.shape[0]
+    missing_rate = null_counts / n_rows if n_rows else null_counts * 0.0
+    return dict(
+        n_rows=int(n_rows),
+        dtype={
+            c: "categorical" if is_categorical(data[c]) else "numeric"
+            for c in data.columns
+        },
+        missing_rate={c: float(v) for c, v in missing_rate.items()},
+        n_unique={c: int(n_unique[c]) for c in data.columns},
+    )
+
+
 def _infer_categorical(
     data: pd.DataFrame, meta: NamedTuple
 ) -> "categorical cols list":
     if meta is None:
-        return list(data.dtypes[data.dtypes == np.object].index)
+        return [c for c in data.columns if is_categorical(data[c])]
     else:
-        temp = data.drop(meta.target, axis=1)
-        return list(temp.dtypes[temp.dtypes == np.object].index)
\ No newline at end of file
+        return [c for c in data.columns.drop(meta.target) if is_categorical(data[c])]
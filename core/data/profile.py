@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+
+def profile_columns(data: pd.DataFrame, batch_size: int = 512) -> dict:
+    """
+    Profile every column of the data in a single vectorized pass.
+
+    Numeric columns are processed as 2D float blocks of `batch_size` columns:
+    one sort per block gives the null counts, the cardinality and the median of
+    all its columns at once. Categorical(object or pandas categorical) columns
+    are factorized once each and their modes are read from the code counts.
+
+    Args
+    ------
+    data: pandas.core.frame.DataFrame
+    batch_size: int, number of numeric columns sorted together
+
+    Return
+    ------
+    profile: dict, which contains
+        n_rows: int, number of rows
+        dtype: dict, 'categorical' or 'numeric' for each column
+        missing_rate: dict, rate of missing values for each column
+        n_unique: dict, number of unique non-null values for each column
+        mode: dict, most frequent value of each categorical column
+        median: dict, median of each numeric column
+    """
+    n_rows = data.shape[0]
+    categorical = [c for c in data.columns if is_categorical(data[c])]
+    numeric = [c for c in data.columns if not is_categorical(data[c])]
+
+    profile = dict(
+        n_rows=int(n_rows),
+        dtype=dict(),
+        missing_rate=dict(),
+        n_unique=dict(),
+        mode=dict(),
+        median=dict(),
+    )
+    categorical_set = set(categorical)
+    for c in data.columns:
+        profile["dtype"][c] = "categorical" if c in categorical_set else "numeric"
+
+    for start in range(0, len(numeric), batch_size):
+        cols = numeric[start : start + batch_size]
+        # one row per column so that every column is sorted in contiguous memory
+        block = np.array(data[cols].to_numpy(dtype=np.float64).T, order="C")
+        block.sort(axis=1)  # NaNs go last
+        _profile_numeric(block, cols, profile)
+
+    for c in categorical:
+        _profile_categorical(data[c].to_numpy(), c, profile)
+
+    # keep the column order of the data
+    for key in ("missing_rate", "n_unique"):
+        profile[key] = {c: profile[key][c] for c in data.columns}
+
+    return profile
+
+
+def is_categorical(column: pd.Series) -> bool:
+    """
+    Whether the column holds categories, as strings(object) or as a pandas categorical.
+    """
+    return column.dtype == object or isinstance(column.dtype, pd.CategoricalDtype)
+
+
+def _profile_numeric(block: np.array, cols: list, profile: dict):
+    n_rows = block.shape[1]
+    valid = ~np.isnan(block)
+    n_valid = valid.sum(axis=1)
+
+    if n_rows:
+        changed = np.empty(block.shape, dtype=bool)
+        changed[:, 0] = True
+        np.not_equal(block[:, 1:], block[:, :-1], out=changed[:, 1:])
+        n_unique = (changed & valid).sum(axis=1)
+
+        lower = np.clip((n_valid - 1) // 2, 0, n_rows - 1)
+        upper = np.clip(n_valid // 2, 0, n_rows - 1)
+        median = (
+            np.take_along_axis(block, lower[:, None], axis=1)[:, 0]
+            + np.take_along_axis(block, upper[:, None], axis=1)[:, 0]
+        ) / 2
+        median[n_valid == 0] = np.nan
+    else:
+        n_unique = np.zeros(len(cols), dtype=np.int64)
+        median = np.full(len(cols), np.nan)
+
+    for i, c in enumerate(cols):
+        profile["missing_rate"][c] = float((n_rows - n_valid[i]) / n_rows) if n_rows else 0.0
+        profile["n_unique"][c] = int(n_unique[i])
+        profile["median"][c] = float(median[i])
+
+
+def _profile_categorical(values: np.array, col: str, profile: dict):
+    n_rows = values.shape[0]
+    codes, uniques = pd.factorize(values)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    n_missing = n_rows - counts.sum()
+
+    profile["missing_rate"][col] = float(n_missing / n_rows) if n_rows else 0.0
+    profile["n_unique"][col] = int(len(uniques))
+    profile["mode"][col] = uniques[counts.argmax()] if len(uniques) else None
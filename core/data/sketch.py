@@ -0,0 +1,75 @@
+import numpy as np
+
+
+class QuantileSketch:
+    """
+    Mergeable approximate quantile sketch for streaming numeric columns.
+
+    Values are kept exactly until `capacity` is exceeded. After that they are
+    compressed into at most `capacity` weighted centroids, so memory stays
+    bounded no matter how many rows are pushed through `update`.
+
+    Args
+    ------
+    capacity: int, maximum number of centroids to keep
+    """
+
+    def __init__(self, capacity: int = 2048):
+        self.capacity = capacity
+        self.values = np.empty(0, dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+        self.exact = True
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def update(self, values: np.array):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self._add(values, np.ones(values.shape[0], dtype=np.float64))
+        return self
+
+    def merge(self, other: "QuantileSketch"):
+        self.exact = self.exact and other.exact
+        self._add(other.values, other.weights)
+        return self
+
+    def quantile(self, q: float) -> float:
+        if self.values.shape[0] == 0:
+            return np.nan
+        if self.exact:
+            return float(np.quantile(self.values, q))
+
+        order = np.argsort(self.values, kind="mergesort")
+        values, weights = self.values[order], self.weights[order]
+        position = np.cumsum(weights) - weights / 2
+        return float(np.interp(q * weights.sum(), position, values))
+
+    def median(self) -> float:
+        return self.quantile(0.5)
+
+    def _add(self, values: np.array, weights: np.array):
+        if values.shape[0] == 0:
+            return
+        self.values = np.concatenate([self.values, values])
+        self.weights = np.concatenate([self.weights, weights])
+        if self.values.shape[0] > self.capacity:
+            self._compress()
+
+    def _compress(self):
+        order = np.argsort(self.values, kind="mergesort")
+        values, weights = self.values[order], self.weights[order]
+
+        # assign each point to one of `capacity` equal-weight bins by its rank
+        position = np.cumsum(weights) - weights / 2
+        bins = (position / weights.sum() * self.capacity).astype(np.int64)
+        bins = np.minimum(bins, self.capacity - 1)
+
+        bin_weights = np.bincount(bins, weights=weights, minlength=self.capacity)
+        bin_sums = np.bincount(bins, weights=values * weights, minlength=self.capacity)
+        keep = bin_weights > 0
+
+        self.values = bin_sums[keep] / bin_weights[keep]
+        self.weights = bin_weights[keep]
+        self.exact = False
@@ -0,0 +1,211 @@
+import numpy as np
+import pandas as pd
+
+from core.data.profile import is_categorical
+from core.data.sketch import QuantileSketch
+
+
+# quantiles splitting numeric columns into the bins compared for the drift
+DRIFT_QUANTILES = np.linspace(0.1, 0.9, 9)
+
+# smallest share of a bin, so empty bins do not make the drift infinite
+EPS = 1e-4
+
+# categories counted in each categorical column, the rarer ones are counted in OTHER
+MAX_CATEGORIES = 100
+
+# share of the values of a column below which a category is counted in OTHER, so that
+# the categories of ID-like columns, which do not come back in new data, do not drift
+MIN_SHARE = 0.01
+
+# bucket of the rare categories
+OTHER = "__other__"
+
+
+class ColumnSummary:
+    """
+    Mergeable summary of the raw columns of the data seen in train.
+
+    Category counts of categorical columns, quantile sketches of numeric ones
+    and null counts of both are kept, so the summary of a new slice of data can
+    be merged into the one of the previous slices, and the statistics of the
+    meta data recomputed, without reading the previous slices again. Only the
+    MAX_CATEGORIES most frequent categories of a column holding at least MIN_SHARE
+    of its values are counted, the others in OTHER, so the summary does not grow
+    with the rows seen.
+
+    Args
+    ------
+    n_rows: int, number of rows summarized
+    null_counts: dict, number of missing values of each column
+    counts: dict, count of each category(and of OTHER) of each categorical column
+    sketches: dict, QuantileSketch of each numeric column
+    """
+
+    def __init__(self, n_rows: int, null_counts: dict, counts: dict, sketches: dict):
+        self.n_rows = n_rows
+        self.null_counts = null_counts
+        self.counts = counts
+        self.sketches = sketches
+
+    @classmethod
+    def from_data(
+        cls, data: pd.DataFrame, target: str, columns: list = None, capacity: int = 512
+    ) -> "ColumnSummary":
+        """
+        Summarize the raw features of the data, the target excluded, or the given columns.
+        """
+        columns = data.columns.drop(target) if columns is None else pd.Index(columns)
+        counts, sketches = dict(), dict()
+        for c in columns:
+            if is_categorical(data[c]):
+                counts[c] = _cap(
+                    {_python(k): int(v) for k, v in data[c].value_counts().items() if v > 0}
+                )
+            else:
+                sketches[c] = QuantileSketch(capacity).update(data[c].to_numpy(dtype=np.float64))
+        null_counts = {c: int(v) for c, v in data[columns].isnull().sum().items()}
+        return cls(int(data.shape[0]), null_counts, counts, sketches)
+
+    def merge(self, other: "ColumnSummary") -> "ColumnSummary":
+        """
+        Summary of the rows of both, as a new summary.
+        """
+        counts = {c: dict(v) for c, v in self.counts.items()}
+        for c, other_counts in other.counts.items():
+            merged = counts.setdefault(c, dict())
+            for k, v in other_counts.items():
+                merged[k] = merged.get(k, 0) + v
+            counts[c] = _cap(merged)
+
+        sketches = dict()
+        for c in set(self.sketches) | set(other.sketches):
+            sketch = QuantileSketch(self._capacity(c, other))
+            for summary in (self, other):
+                if c in summary.sketches:
+                    sketch.merge(summary.sketches[c])
+            sketches[c] = sketch
+
+        null_counts = {
+            c: self.null_counts.get(c, 0) + other.null_counts.get(c, 0)
+            for c in {**self.null_counts, **other.null_counts}
+        }
+        return ColumnSummary(self.n_rows + other.n_rows, null_counts, counts, sketches)
+
+    def select(self, columns: list) -> "ColumnSummary":
+        """
+        Summary of the given columns only, as a new summary.
+        """
+        columns = set(columns)
+        return ColumnSummary(
+            self.n_rows,
+            {c: v for c, v in self.null_counts.items() if c in columns},
+            {c: v for c, v in self.counts.items() if c in columns},
+            {c: v for c, v in self.sketches.items() if c in columns},
+        )
+
+    def stats(self) -> dict:
+        """
+        Imputation value of each column, in the format of Meta.stats.
+        """
+        stats = dict()
+        for c in self.null_counts:
+            if c in self.counts:
+                counts = {k: v for k, v in self.counts[c].items() if k != OTHER}
+                stats[c] = (max(counts, key=counts.get) if counts else None, "MODE")
+            else:
+                stats[c] = (self.sketches[c].median(), "MEDIAN")
+        return stats
+
+    def missing_rate(self) -> dict:
+        return {
+            c: float(v / self.n_rows) if self.n_rows else 0.0 for c, v in self.null_counts.items()
+        }
+
+    def drift(self, other: "ColumnSummary") -> dict:
+        """
+        Population stability index of each column of the other summary against this one,
+        over the categories of categorical columns(the ones counted in this summary and
+        OTHER for the rest) and over deciles of numeric ones.
+        Around 0.1 is a moderate shift and above 0.2 a significant one.
+        """
+        drift = dict()
+        for c in other.counts:
+            if self.counts.get(c) and other.counts[c]:
+                known = [k for k in self.counts[c] if k != OTHER]
+                rest = sum(v for k, v in other.counts[c].items() if k == OTHER or k not in self.counts[c])
+                expected = [self.counts[c][k] for k in known] + [self.counts[c].get(OTHER, 0)]
+                actual = [other.counts[c].get(k, 0) for k in known] + [rest]
+                drift[c] = _psi(np.array(expected, dtype=np.float64), np.array(actual, dtype=np.float64))
+        for c in other.sketches:
+            if c in self.sketches and self.sketches[c].count and other.sketches[c].count:
+                edges = np.unique([self.sketches[c].quantile(q) for q in DRIFT_QUANTILES])
+                drift[c] = _psi(_histogram(self.sketches[c], edges), _histogram(other.sketches[c], edges))
+        return drift
+
+    def to_dict(self) -> dict:
+        """
+        JSON serializable summary. Categories are kept in [category, count] pairs so
+        their types survive.
+        """
+        return dict(
+            n_rows=self.n_rows,
+            null_counts=self.null_counts,
+            counts={c: [[k, v] for k, v in counts.items()] for c, counts in self.counts.items()},
+            sketches={
+                c: dict(
+                    capacity=s.capacity,
+                    values=s.values.tolist(),
+                    weights=s.weights.tolist(),
+                    exact=s.exact,
+                )
+                for c, s in self.sketches.items()
+            },
+        )
+
+    @classmethod
+    def from_dict(cls, summary: dict) -> "ColumnSummary":
+        sketches = dict()
+        for c, s in summary["sketches"].items():
+            sketch = QuantileSketch(s["capacity"])
+            sketch.values = np.asarray(s["values"], dtype=np.float64)
+            sketch.weights = np.asarray(s["weights"], dtype=np.float64)
+            sketch.exact = s["exact"]
+            sketches[c] = sketch
+        counts = {c: {k: v for k, v in pairs} for c, pairs in summary["counts"].items()}
+        return cls(summary["n_rows"], summary["null_counts"], counts, sketches)
+
+    def _capacity(self, column: str, other: "ColumnSummary") -> int:
+        return max(s.sketches[column].capacity for s in (self, other) if column in s.sketches)
+
+
+def _cap(counts: dict, max_categories: int = MAX_CATEGORIES, min_share: float = MIN_SHARE) -> dict:
+    """
+    The most frequent categories of the counts, the others summed up in OTHER. The most
+    frequent one is always kept, as the mode of the column.
+    """
+    ranked = sorted(((k, v) for k, v in counts.items() if k != OTHER), key=lambda kv: -kv[1])
+    min_count = min_share * sum(counts.values())
+    capped = {
+        k: v for i, (k, v) in enumerate(ranked[:max_categories]) if i == 0 or v >= min_count
+    }
+    rest = sum(counts.values()) - sum(capped.values())
+    if rest:
+        capped[OTHER] = rest
+    return capped
+
+
+def _python(value):
+    # numpy scalars are not JSON serializable
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _histogram(sketch: QuantileSketch, edges: np.array) -> np.array:
+    bins = np.searchsorted(edges, sketch.values, side="right")
+    return np.bincount(bins, weights=sketch.weights, minlength=edges.shape[0] + 1)
+
+
+def _psi(expected: np.array, actual: np.array) -> float:
+    expected = np.maximum(expected / expected.sum(), EPS)
+    actual = np.maximum(actual / actual.sum(), EPS)
+    return float(((actual - expected) * np.log(actual / expected)).sum())
@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone, is_classifier
+from sklearn.model_selection import check_cv
+
+from core.evaluation.metrics import ConfusionMatrix, regression_scores
+
+
+class CVResult:
+    """
+    Result of the cross validation where each fold is fitted once.
+
+    Attributes
+    ------
+    train_scores: pandas.core.frame.DataFrame, scores of each fold on its train rows
+    valid_scores: pandas.core.frame.DataFrame, scores of each fold on its validation rows
+    oof_prediction: 1D numpy.ndarray, out-of-fold prediction of every row
+    oof_probability: 2D numpy.ndarray, out-of-fold probability of every row(classification only)
+    fold_estimators: list, estimator fitted on each fold
+    estimator: final estimator, fitted on all rows or made of the fold estimators
+    """
+
+    def __init__(self, train_scores, valid_scores, oof_prediction, oof_probability, fold_estimators, estimator):
+        self.train_scores = train_scores
+        self.valid_scores = valid_scores
+        self.oof_prediction = oof_prediction
+        self.oof_probability = oof_probability
+        self.fold_estimators = fold_estimators
+        self.estimator = estimator
+
+
+class FoldEnsemble:
+    """
+    Final model made of the fold estimators, averaging their outputs. The probabilities
+    of the classes missing from the train rows of a fold are zero for its estimator.
+    """
+
+    def __init__(self, estimators: list, classes: np.array = None):
+        self.estimators_ = estimators
+        if hasattr(estimators[0], "classes_"):
+            if classes is None:
+                classes = np.unique(np.concatenate([e.classes_ for e in estimators]))
+            self.classes_ = classes
+
+    def predict_proba(self, X):
+        return np.mean(
+            [_align(e.predict_proba(X), e.classes_, self.classes_) for e in self.estimators_],
+            axis=0,
+        )
+
+    def predict(self, X):
+        if hasattr(self, "classes_"):
+            return self.classes_[self.predict_proba(X).argmax(axis=1)]
+        return np.mean([e.predict(X) for e in self.estimators_], axis=0)
+
+    def get_params(self, deep=True):
+        return self.estimators_[0].get_params(deep=deep)
+
+
+def cross_validate_once(
+    estimator: "sklearn estimator object",
+    X: np.array,
+    y: np.array,
+    cv: int,
+    refit: str = "parallel",
+    n_jobs: int = -1,
+) -> CVResult:
+    """
+    Cross validate the estimator fitting each fold only once.
+
+    Each fold is fitted and predicted once(one predict_proba for classifiers,
+    from which the classes are derived), and every metric is computed from
+    the cached predictions. The final model is fitted on all rows alongside the
+    folds(refit='parallel') or made of the fold models(refit='ensemble').
+
+    Args
+    ------
+    estimator: sklearn estimator object, estimator to evaluate
+    X: 2D numpy.ndarray, feature data
+    y: 1D numpy.ndarray, target data
+    cv: int, 'K' value for the cross validation
+    refit: str, 'parallel' or 'ensemble'
+    n_jobs: int, number of processes
+    """
+    if refit not in ("parallel", "ensemble"):
+        raise NotImplementedError()
+
+    X, y = np.asarray(X), np.asarray(y)
+    classifier = is_classifier(estimator)
+    splits = list(check_cv(cv, y, classifier=classifier).split(X, y))
+
+    tasks = [(train, valid) for train, valid in splits]
+    if refit == "parallel":
+        tasks.append((None, None))
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_and_predict)(clone(estimator), X, y, train, valid)
+        for train, valid in tasks
+    )
+
+    fold_results = results[: len(splits)]
+    fold_estimators = [r[0] for r in fold_results]
+    # the train rows of a fold may lack a class, whose probability is zero for its estimator
+    classes = np.unique(y) if classifier else None
+
+    oof_prediction = np.empty(y.shape[0], dtype=y.dtype)
+    oof_probability = np.zeros((y.shape[0], len(classes))) if classifier else None
+    train_scores, valid_scores = list(), list()
+    for (train, valid), (fold_estimator, train_pred, valid_pred, valid_proba) in zip(splits, fold_results):
+        oof_prediction[valid] = valid_pred
+        if classifier:
+            oof_probability[valid] = _align(valid_proba, fold_estimator.classes_, classes)
+        train_scores.append(_scores(y[train], train_pred, classes))
+        valid_scores.append(_scores(y[valid], valid_pred, classes))
+
+    if refit == "parallel":
+        final = results[-1][0]
+    else:
+        final = FoldEnsemble(fold_estimators, classes)
+
+    return CVResult(
+        train_scores=pd.DataFrame(train_scores),
+        valid_scores=pd.DataFrame(valid_scores),
+        oof_prediction=oof_prediction,
+        oof_probability=oof_probability,
+        fold_estimators=fold_estimators,
+        estimator=final,
+    )
+
+
+def _align(probability: np.array, estimator_classes: np.array, classes: np.array) -> np.array:
+    """
+    Probabilities in the columns of the sorted classes, zero for the classes the estimator
+    was not fitted on.
+    """
+    if np.array_equal(estimator_classes, classes):
+        return probability
+    aligned = np.zeros((probability.shape[0], classes.shape[0]))
+    aligned[:, np.searchsorted(classes, estimator_classes)] = probability
+    return aligned
+
+
+def _fit_and_predict(estimator, X, y, train, valid):
+    if train is None:
+        return estimator.fit(X, y), None, None, None
+
+    estimator.fit(X[train], y[train])
+    train_pred, _ = _predict(estimator, X[train])
+    valid_pred, valid_proba = _predict(estimator, X[valid])
+    return estimator, train_pred, valid_pred, valid_proba
+
+
+def _predict(estimator, X) -> ("prediction", "probability"):
+    if hasattr(estimator, "predict_proba"):
+        probability = estimator.predict_proba(X)
+        return estimator.classes_[probability.argmax(axis=1)], probability
+    return estimator.predict(X), None
+
+
+def _scores(y_true: np.array, y_pred: np.array, classes: np.array) -> dict:
+    if classes is None:
+        return regression_scores(y_true, y_pred)
+    return ConfusionMatrix.from_predictions(y_true, y_pred, classes).scores()
@@ -1,8 +1,7 @@
 import numpy as np
 import pandas as pd
 
-from sklearn.model_selection import cross_validate
-from sklearn.metrics import roc_auc_score, f1_score, recall_score, precision_score
+from core.evaluation.metrics import evaluate
 
 
 def evaluate_cv(
@@ -13,6 +12,8 @@ def evaluate_cv(
     scoring: list=["accuracy", "precision", "recall", "f1"],
     return_train_score=True,
 ) -> "dict of CV result":
+    from sklearn.model_selection import cross_validate
+
     result = cross_validate(
         estimator=estimator,
         X=X,
@@ -28,57 +29,92 @@ class MeasuringTool:
     """
     Evaluate several metrics.
 
+    Every metric is derived from one confusion matrix(classification) or one
+    residual pass(regression), computed once on the first access.
+
     Args
     ------
     y_true: pandas.core.series.Series or 1D numpy.ndarray, true values of target
     y_pred: pandas.core.series.Series or 1D numpy.ndarray, predicted values of target
+    probability: 2D numpy.ndarray, predicted probability of each class, used for ROC-AUC and LogLoss
+    classes: 1D numpy.ndarray, sorted class labels, the columns of probability
+    problem_type: str, problem type which is one of 'binary', 'multiclass', 'regression'
     """
 
-    def __init__(self, y_true: np.array, y_pred: np.array) -> "evaluation result":
-        self.y_true = y_true
-        self.y_pred = np.around(y_pred)
+    def __init__(
+        self,
+        y_true: np.array,
+        y_pred: np.array,
+        probability: np.array = None,
+        classes: np.array = None,
+        problem_type: str = "binary",
+    ) -> "evaluation result":
+        self.y_true = np.asarray(y_true)
+        self.y_pred = np.asarray(y_pred)
+        # probabilities of the positive class are rounded to the class labels
+        if problem_type != "regression" and self.y_pred.dtype.kind == "f":
+            self.y_pred = np.around(self.y_pred).astype(self.y_true.dtype)
+        self.probability = probability
+        self.classes = classes
+        self.problem_type = problem_type
+        self._result = None
 
-    def get_scores(self, scoring='all'):
+    def get_scores(self, scoring="all", groups=None):
         """
-        Get 4 evaluation results: Accuracy, Precision, Recall, and F1.
+        Get the evaluation results: Accuracy, Precision, Recall, F1(and ROC-AUC,
+        LogLoss if the probability is given) or R2, MAE, RMSE for regression.
+
+        Args
+        ------
+        groups: pandas.core.series.Series or 1D numpy.ndarray, if given, evaluate each group
 
         Return
         ------
         result: pandas.core.frame.DataFrame, evaluation result
         """
-        if scoring == 'all':
-            result = (
-                pd.Series(
-                    dict(
-                        Accuracy=self.Accuracy,
-                        Precision=self.Precision,
-                        Recall=self.Recall,
-                        F1=self.F1_Score,
-                    )
-                )
-                .to_frame()
-                .T
-            )
-        else:
+        if scoring != "all":
             raise NotImplementedError()
 
-        return result
+        if groups is not None:
+            return self._evaluate(groups)
+        return self.result.drop(columns="Count").reset_index(drop=True)
+
+    @property
+    def result(self) -> pd.DataFrame:
+        if self._result is None:
+            self._result = self._evaluate()
+        return self._result
+
+    def _evaluate(self, groups=None) -> pd.DataFrame:
+        return evaluate(
+            y_true=self.y_true,
+            y_pred=self.y_pred,
+            problem_type=self.problem_type,
+            probability=self.probability,
+            classes=self.classes,
+            groups=groups,
+        )
 
     @property
     def Precision(self):
-        return precision_score(y_true=self.y_true, y_pred=self.y_pred)
+        return self.result["Precision"].iloc[0]
 
     @property
     def Accuracy(self):
-        return (self.y_true == self.y_pred).sum() / self.y_true.shape[0]
+        return self.result["Accuracy"].iloc[0]
 
     @property
     def Recall(self):
-        return recall_score(y_true=self.y_true, y_pred=self.y_pred)
+        return self.result["Recall"].iloc[0]
 
     @property
-    def F1_Score(self, problem_type="binary"):
-        if problem_type == "binary":
-            return f1_score(y_true=self.y_true, y_pred=self.y_pred, average="binary")
-        else:
-            raise NotImplementedError()
+    def F1_Score(self):
+        return self.result["F1"].iloc[0]
+
+    @property
+    def ROC_AUC(self):
+        return self.result["ROC-AUC"].iloc[0]
+
+    @property
+    def LogLoss(self):
+        return self.result["LogLoss"].iloc[0]
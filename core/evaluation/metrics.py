@@ -0,0 +1,386 @@
+import numpy as np
+import pandas as pd
+
+
+EPS = 1e-15
+
+
+class ConfusionMatrix:
+    """
+    Confusion matrix counted in one pass, from which every classification metric is derived.
+
+    Matrices of the same classes can be added, so the counts of chunks or shards
+    are merged without keeping their predictions.
+
+    Args
+    ------
+    matrix: 2D numpy.ndarray, counts of (true class, predicted class)
+    classes: 1D numpy.ndarray, sorted class labels of the rows and columns
+    """
+
+    def __init__(self, matrix: np.array, classes: np.array):
+        self.matrix = np.asarray(matrix, dtype=np.int64)
+        self.classes = np.asarray(classes)
+
+    @classmethod
+    def from_predictions(cls, y_true: np.array, y_pred: np.array, classes: np.array = None):
+        """
+        Count the confusion matrix of the predictions.
+
+        Args
+        ------
+        y_true: pandas.core.series.Series or 1D numpy.ndarray, true values of target
+        y_pred: pandas.core.series.Series or 1D numpy.ndarray, predicted values of target
+        classes: 1D numpy.ndarray, sorted class labels, inferred from the values if not given
+        """
+        y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+        if classes is None:
+            classes, codes = np.unique(np.concatenate([y_true, y_pred]), return_inverse=True)
+            true_codes, pred_codes = codes[: y_true.shape[0]], codes[y_true.shape[0] :]
+        else:
+            classes = np.asarray(classes)
+            true_codes, pred_codes = _encode(y_true, classes), _encode(y_pred, classes)
+
+        k = classes.shape[0]
+        matrix = np.bincount(true_codes * k + pred_codes, minlength=k * k).reshape(k, k)
+        return cls(matrix, classes)
+
+    def __add__(self, other: "ConfusionMatrix") -> "ConfusionMatrix":
+        if not np.array_equal(self.classes, other.classes):
+            raise ValueError("confusion matrices of different classes can not be merged")
+        return ConfusionMatrix(self.matrix + other.matrix, self.classes)
+
+    def scores(self) -> dict:
+        """
+        Accuracy, and Precision, Recall and F1 of the positive class for binary problems
+        or their macro average otherwise.
+        """
+        return {k: float(v) for k, v in _classification_scores(self.matrix).items()}
+
+    def to_frame(self) -> pd.DataFrame:
+        report = pd.DataFrame(self.matrix, index=self.classes, columns=self.classes)
+        report.index.name = "Observation \\ Prediction"
+        return report
+
+
+def evaluate(
+    y_true: np.array,
+    y_pred: np.array,
+    problem_type: str,
+    probability: np.array = None,
+    classes: np.array = None,
+    groups: np.array = None,
+) -> pd.DataFrame:
+    """
+    Evaluate all metrics of the predictions at once.
+
+    Classification metrics come from one confusion matrix(ROC-AUC and LogLoss
+    from the probabilities, if given), regression metrics from one residual pass.
+    Rows whose true value is not one of the classes(missing, or never seen by the
+    model) can not be scored, and are left out with a warning.
+    If groups are given, the metrics of every group are computed together, the
+    confusion matrices of all groups being counted by a single bincount.
+
+    Args
+    ------
+    y_true: pandas.core.series.Series or 1D numpy.ndarray, true values of target
+    y_pred: pandas.core.series.Series or 1D numpy.ndarray, predicted values of target
+    problem_type: str, problem type which is one of 'binary', 'multiclass', 'regression'
+    probability: 2D numpy.ndarray, predicted probability of each class(classification only)
+    classes: 1D numpy.ndarray, sorted class labels, the columns of probability
+    groups: pandas.core.series.Series or 1D numpy.ndarray, group of each row
+
+    Return
+    ------
+    result: pandas.core.frame.DataFrame, metrics of all rows in one row or of each group
+    """
+    y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+    if groups is None:
+        labels, group_codes = np.array(["All"]), np.zeros(y_true.shape[0], dtype=np.int64)
+    else:
+        labels, group_codes = np.unique(np.asarray(groups), return_inverse=True)
+    n_groups = labels.shape[0]
+
+    if problem_type == "regression":
+        result = _regression_scores(y_true, y_pred, group_codes, n_groups)
+    else:
+        if classes is None:
+            classes = np.unique(np.concatenate([y_true, y_pred]))
+        known = _known(y_true, np.asarray(classes))
+        if not known.all():
+            y_true, y_pred, group_codes = y_true[known], y_pred[known], group_codes[known]
+            if probability is not None:
+                probability = np.asarray(probability)[known]
+        k = classes.shape[0]
+        true_codes, pred_codes = _encode(y_true, classes), _encode(y_pred, classes)
+        matrices = np.bincount(
+            (group_codes * k + true_codes) * k + pred_codes, minlength=n_groups * k * k
+        ).reshape(n_groups, k, k)
+        result = _classification_scores(matrices)
+
+        if probability is not None:
+            probability = np.asarray(probability, dtype=np.float64)
+            if groups is None:
+                auc = [_roc_auc(true_codes, probability)]
+            else:
+                auc = [
+                    _roc_auc(true_codes[group_codes == g], probability[group_codes == g])
+                    for g in range(n_groups)
+                ]
+            result["ROC-AUC"] = np.array(auc)
+            result["LogLoss"] = _log_loss(true_codes, probability, group_codes, n_groups)
+
+    result["Count"] = np.bincount(group_codes, minlength=n_groups)
+    result = pd.DataFrame(result, index=labels)
+    result.index.name = "Group"
+    return result
+
+
+class StreamingMetrics:
+    """
+    Metrics accumulated over batches of predictions in bounded memory.
+
+    Classification keeps a confusion matrix, the sum of the log-losses and
+    histograms of the probabilities of positive and negative rows of each class,
+    from which ROC-AUC is computed(exact up to the histogram resolution).
+    Regression keeps the residual sums and the running mean and variance of the
+    target. Accumulators of the same setting can be added.
+
+    Args
+    ------
+    problem_type: str, problem type which is one of 'binary', 'multiclass', 'regression'
+    classes: 1D numpy.ndarray, sorted class labels, the columns of probability(classification only)
+    n_bins: int, resolution of the probability histograms
+    """
+
+    def __init__(self, problem_type: str, classes: np.array = None, n_bins: int = 4096):
+        self.problem_type = problem_type
+        self.classes = None if classes is None else np.asarray(classes)
+        self.n_bins = n_bins
+        self.count = 0
+
+        if problem_type == "regression":
+            self.sums = np.zeros(3)  # squared residual, absolute residual, M2 of the target
+            self.mean = 0.0
+        else:
+            k = self.classes.shape[0]
+            self.confusion = ConfusionMatrix(np.zeros((k, k), dtype=np.int64), self.classes)
+            self.loss = 0.0
+            self.histograms = np.zeros((k, 2, n_bins), dtype=np.int64)
+
+    def update(self, y_true: np.array, y_pred: np.array, probability: np.array = None):
+        y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+        n = y_true.shape[0]
+        if n == 0:
+            return self
+
+        if self.problem_type == "regression":
+            y_true, y_pred = y_true.astype(np.float64), y_pred.astype(np.float64)
+            residual = y_true - y_pred
+            mean = y_true.mean()
+            # merge the variance of the batch into the running one(Chan et al.)
+            delta = mean - self.mean
+            total = self.count + n
+            self.sums += (
+                (residual ** 2).sum(),
+                np.abs(residual).sum(),
+                ((y_true - mean) ** 2).sum() + delta ** 2 * self.count * n / total,
+            )
+            self.mean += delta * n / total
+            self.count = total
+            return self
+
+        known = _known(y_true, self.classes)
+        if not known.all():
+            y_true, y_pred, n = y_true[known], y_pred[known], int(known.sum())
+            if probability is not None:
+                probability = np.asarray(probability)[known]
+            if n == 0:
+                return self
+        self.confusion = self.confusion + ConfusionMatrix.from_predictions(y_true, y_pred, self.classes)
+        self.count += n
+        if probability is not None:
+            codes = _encode(y_true, self.classes)
+            probability = np.asarray(probability, dtype=np.float64)
+            self.loss += float(_log_loss(codes, probability, np.zeros_like(codes), 1)[0]) * n
+
+            k = self.classes.shape[0]
+            bins = np.minimum((probability * self.n_bins).astype(np.int64), self.n_bins - 1)
+            is_positive = (codes[:, None] == np.arange(k)[None, :]).astype(np.int64)
+            keys = (np.arange(k)[None, :] * 2 + is_positive) * self.n_bins + bins
+            self.histograms += np.bincount(
+                keys.ravel(), minlength=k * 2 * self.n_bins
+            ).reshape(k, 2, self.n_bins)
+        return self
+
+    def __add__(self, other: "StreamingMetrics") -> "StreamingMetrics":
+        merged = StreamingMetrics(self.problem_type, self.classes, self.n_bins)
+        merged.count = self.count + other.count
+        if self.problem_type == "regression":
+            delta = other.mean - self.mean
+            merged.mean = self.mean + delta * other.count / max(merged.count, 1)
+            merged.sums = self.sums + other.sums
+            merged.sums[2] += delta ** 2 * self.count * other.count / max(merged.count, 1)
+        else:
+            merged.confusion = self.confusion + other.confusion
+            merged.loss = self.loss + other.loss
+            merged.histograms = self.histograms + other.histograms
+        return merged
+
+    def get_scores(self) -> pd.DataFrame:
+        """
+        Metrics of all the rows seen, in the columns of MeasuringTool.get_scores.
+        """
+        if self.problem_type == "regression":
+            squared, absolute, total = self.sums
+            n = max(self.count, 1)
+            scores = dict(
+                R2=1 - squared / total if total > 0 else 0.0,
+                MAE=absolute / n,
+                RMSE=np.sqrt(squared / n),
+            )
+        else:
+            scores = self.confusion.scores()
+            if self.histograms.any():
+                scores["ROC-AUC"] = _histogram_auc(self.histograms)
+                scores["LogLoss"] = self.loss / max(self.count, 1)
+        return pd.Series(scores).to_frame().T
+
+
+def roc_auc(y_true: np.array, probability: np.array, classes: np.array) -> float:
+    """
+    ROC-AUC of the positive class for binary problems, macro one-vs-rest average otherwise.
+    """
+    return _roc_auc(_encode(np.asarray(y_true), np.asarray(classes)), np.asarray(probability))
+
+
+def log_loss(y_true: np.array, probability: np.array, classes: np.array) -> float:
+    codes = _encode(np.asarray(y_true), np.asarray(classes))
+    return float(_log_loss(codes, np.asarray(probability), np.zeros_like(codes), 1)[0])
+
+
+def regression_scores(y_true: np.array, y_pred: np.array) -> dict:
+    """
+    R2, MAE and RMSE from one residual pass.
+    """
+    y_true, y_pred = np.asarray(y_true, dtype=np.float64), np.asarray(y_pred, dtype=np.float64)
+    scores = _regression_scores(y_true, y_pred, np.zeros(y_true.shape[0], dtype=np.int64), 1)
+    return {k: float(v[0]) for k, v in scores.items()}
+
+
+def _known(y_true: np.array, classes: np.array) -> np.array:
+    """
+    Whether each true value is one of the classes, with a warning for the ones which are not.
+    """
+    known = np.isin(y_true, classes)
+    if not known.all():
+        unknown = pd.unique(y_true[~known])
+        print(
+            f"Warning: {(~known).sum()} rows whose target is not one of the classes of the model"
+            f"({unknown[:5].tolist()}) are left out of the evaluation."
+        )
+    return known
+
+
+def _encode(y: np.array, classes: np.array) -> np.array:
+    codes = np.searchsorted(classes, y)
+    codes[codes == classes.shape[0]] = 0
+    if not (classes[codes] == y).all():
+        raise ValueError(f"values out of the classes {classes.tolist()}")
+    return codes
+
+
+def _classification_scores(matrix: np.array) -> dict:
+    """
+    Metrics of one (k, k) confusion matrix or of stacked (groups, k, k) ones.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    tp = np.diagonal(matrix, axis1=-2, axis2=-1)
+    predicted = matrix.sum(axis=-2)
+    actual = matrix.sum(axis=-1)
+    total = actual.sum(axis=-1)
+
+    precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+    recall = np.divide(tp, actual, out=np.zeros_like(tp), where=actual > 0)
+    f1 = np.divide(
+        2 * precision * recall, precision + recall, out=np.zeros_like(tp), where=(precision + recall) > 0
+    )
+
+    # positive class for binary problems, macro average otherwise
+    if matrix.shape[-1] == 2:
+        precision, recall, f1 = precision[..., 1], recall[..., 1], f1[..., 1]
+    else:
+        precision, recall, f1 = precision.mean(axis=-1), recall.mean(axis=-1), f1.mean(axis=-1)
+
+    return dict(
+        Accuracy=np.divide(tp.sum(axis=-1), total, out=np.zeros_like(total), where=total > 0),
+        Precision=precision,
+        Recall=recall,
+        F1=f1,
+    )
+
+
+def _regression_scores(y_true, y_pred, group_codes, n_groups) -> dict:
+    y_true, y_pred = y_true.astype(np.float64), y_pred.astype(np.float64)
+    count = np.bincount(group_codes, minlength=n_groups).astype(np.float64)
+    residual = y_true - y_pred
+
+    mean = np.bincount(group_codes, weights=y_true, minlength=n_groups) / np.maximum(count, 1)
+    total = np.bincount(group_codes, weights=(y_true - mean[group_codes]) ** 2, minlength=n_groups)
+    squared = np.bincount(group_codes, weights=residual ** 2, minlength=n_groups)
+    absolute = np.bincount(group_codes, weights=np.abs(residual), minlength=n_groups)
+
+    return dict(
+        R2=1 - np.divide(squared, total, out=np.ones_like(total), where=total > 0),
+        MAE=absolute / np.maximum(count, 1),
+        RMSE=np.sqrt(squared / np.maximum(count, 1)),
+    )
+
+
+def _roc_auc(codes: np.array, probability: np.array) -> float:
+    """
+    Mann-Whitney statistic of the ranked scores, NaN if a class has no sample.
+    """
+    from scipy.stats import rankdata
+
+    k = probability.shape[1]
+    positives = [1] if k == 2 else range(k)
+
+    aucs = list()
+    for c in positives:
+        is_positive = codes == c
+        n_positive = is_positive.sum()
+        n_negative = codes.shape[0] - n_positive
+        if n_positive == 0 or n_negative == 0:
+            aucs.append(np.nan)
+            continue
+        ranks = rankdata(probability[:, c])
+        aucs.append(
+            (ranks[is_positive].sum() - n_positive * (n_positive + 1) / 2) / (n_positive * n_negative)
+        )
+    return float(np.mean(aucs))
+
+
+def _log_loss(codes, probability, group_codes, n_groups) -> np.array:
+    probability = probability / probability.sum(axis=1, keepdims=True)
+    likelihood = np.clip(probability[np.arange(codes.shape[0]), codes], EPS, 1 - EPS)
+    count = np.bincount(group_codes, minlength=n_groups)
+    loss = np.bincount(group_codes, weights=-np.log(likelihood), minlength=n_groups)
+    return loss / np.maximum(count, 1)
+
+
+def _histogram_auc(histograms: np.array) -> float:
+    """
+    ROC-AUC from (class, negative/positive, bin) counts, ties within a bin counted as half.
+    """
+    k = histograms.shape[0]
+    aucs = list()
+    for c in [1] if k == 2 else range(k):
+        negative, positive = histograms[c].astype(np.float64)
+        n_negative, n_positive = negative.sum(), positive.sum()
+        if n_negative == 0 or n_positive == 0:
+            aucs.append(np.nan)
+            continue
+        below = np.cumsum(negative) - negative
+        aucs.append((positive * (below + negative / 2)).sum() / (n_positive * n_negative))
+    return float(np.mean(aucs))
@@ -1 +1,15 @@
-from core.models.decisiontree import DecisionTree
+import importlib
+
+
+# attribute: module which defines it, imported on first access(PEP 562)
+_LAZY = {"DecisionTree": "core.models.decisiontree"}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
@@ -0,0 +1,209 @@
+import os
+import json
+import shutil
+
+import joblib
+import numpy as np
+
+
+# version of the layout below, raised on any change a loader has to know about
+FORMAT_VERSION = 1
+
+# suffix of the folder of an artifact, in the output folder of the train phase
+SUFFIX = ".artifact"
+
+MANIFEST = "manifest.json"
+MODEL = "model.pkl"
+
+
+def save_artifact(
+    path: str,
+    estimator: "trained model object",
+    meta: "dict or function",
+    encoder: dict = None,
+    pipeline=None,
+    compiled=None,
+    bin_edges: dict = None,
+) -> str:
+    """
+    Save a trained artifact as a folder which is memory-mapped on load.
+
+    The folder holds a manifest.json with the format version, the meta data
+    and the layout of the array sections, one uncompressed .npy file per array
+    section(classes of the encoders, bin edges, arrays of the preprocessing
+    pipeline, its imputer and the compiled tree), and the estimator dumped uncompressed by joblib, whose
+    arrays are memory-mapped on load too. The .npy headers are padded so the
+    data of each section starts 64-byte aligned.
+
+    Args
+    ------
+    path: str, path of the artifact folder, ending with SUFFIX
+    estimator: sklearn estimator object, trained model
+    meta: dict, meta data, or a function returning it, called once everything else is
+        written(e.g. to record the stages which finished meanwhile)
+    encoder: dict, classes of each encoded column
+    pipeline: PreprocessPipeline, compiled preprocessing pipeline
+    compiled: CompiledTree, flattened tree of decision trees
+    bin_edges: dict, bin edges of each binned column, the features of the pipeline included
+
+    Return
+    ------
+    path: str, path of the artifact folder
+    """
+    temp = path + ".tmp"
+    if os.path.exists(temp):
+        shutil.rmtree(temp)
+    os.makedirs(temp)
+
+    manifest = dict(format_version=FORMAT_VERSION, encoder=dict())
+    sections = dict()
+
+    # section of the classes of each encoded column, numbered as column names may not be file names
+    for i, (column, classes) in enumerate((encoder or dict()).items()):
+        manifest["encoder"][column] = f"encoder.{i}"
+        sections[f"encoder.{i}"] = _vocabulary(classes)
+
+    joblib.dump(estimator, os.path.join(temp, MODEL))
+    manifest["estimator"] = MODEL
+
+    if pipeline is not None:
+        manifest["pipeline"] = dict(
+            features=pipeline.features,
+            categorical=list(pipeline.categories),
+            target=pipeline.target,
+            target_classes=(
+                None if pipeline.target_classes is None else list(pipeline.target_classes)
+            ),
+            binned=pipeline.bin_edges is not None,
+            imputer=None,
+        )
+        sections["pipeline.fill_values"] = pipeline.fill_values
+        if pipeline.imputer is not None:
+            imputer = pipeline.imputer
+            manifest["pipeline"]["imputer"] = dict(
+                columns=imputer.columns,
+                categorical=imputer.categorical,
+                n_neighbors=imputer.n_neighbors,
+            )
+            sections["pipeline.imputer_sample"] = imputer.sample
+            sections["pipeline.imputer_scale"] = imputer.scale
+
+    bin_edges = dict(bin_edges or dict())
+    if pipeline is not None and pipeline.bin_edges is not None:
+        bin_edges.update(
+            (c, e) for c, e in zip(pipeline.features, pipeline.bin_edges) if e is not None
+        )
+    if bin_edges:
+        # edges of all the columns in one section, split by their offsets on load
+        manifest["bin_columns"] = list(bin_edges)
+        sections["bin_edges"] = np.concatenate(
+            [np.asarray(e, dtype=np.float64) for e in bin_edges.values()]
+        )
+        sections["bin_offsets"] = np.cumsum(
+            [0] + [len(e) for e in bin_edges.values()], dtype=np.int64
+        )
+
+    if compiled is not None:
+        manifest["compiled"] = dict(max_depth=compiled.max_depth)
+        for name in ("feature", "threshold", "left", "right", "value"):
+            sections[f"compiled.{name}"] = getattr(compiled, name)
+        if compiled.classes_ is not None:
+            classes = compiled.classes_
+            sections["compiled.classes"] = classes.astype(str) if classes.dtype == object else classes
+
+    manifest["sections"] = dict()
+    for name, values in sections.items():
+        values = np.ascontiguousarray(values)
+        np.save(os.path.join(temp, f"{name}.npy"), values, allow_pickle=False)
+        manifest["sections"][name] = dict(
+            file=f"{name}.npy", dtype=str(values.dtype), shape=list(values.shape)
+        )
+
+    manifest["meta"] = meta() if callable(meta) else meta
+    with open(os.path.join(temp, MANIFEST), "w") as json_file:
+        json.dump(manifest, json_file, default=_to_builtin)
+
+    # publish the artifact at once so that a half-written one is never loaded
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.rename(temp, path)
+
+    return path
+
+
+def is_artifact(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def read_manifest(path: str) -> dict:
+    """
+    Read the manifest of an artifact folder, checking its format version.
+    """
+    with open(os.path.join(path, MANIFEST), "r") as json_file:
+        manifest = json.load(json_file)
+
+    version = manifest.get("format_version")
+    if version is None or version > FORMAT_VERSION:
+        raise ValueError(
+            f"artifact '{path}' has format version {version}, "
+            f"this version reads up to {FORMAT_VERSION}"
+        )
+    return manifest
+
+
+def load_sections(path: str, manifest: dict, mmap_mode: str = "r") -> dict:
+    """
+    Array sections of an artifact folder, memory-mapped unless mmap_mode is None.
+    """
+    return {
+        name: np.load(os.path.join(path, section["file"]), mmap_mode=mmap_mode, allow_pickle=False)
+        for name, section in manifest["sections"].items()
+    }
+
+
+def load_encoder(manifest: dict, sections: dict) -> dict:
+    """
+    Classes of each encoded column, as arrays.
+    """
+    return {column: sections[name] for column, name in manifest["encoder"].items()}
+
+
+def load_bin_edges(manifest: dict, sections: dict) -> dict:
+    """
+    Bin edges of each binned column, as arrays.
+    """
+    if not manifest.get("bin_columns"):
+        return dict()
+    columns = manifest["bin_columns"]
+    edges, offsets = sections["bin_edges"], sections["bin_offsets"]
+    return {
+        c: edges[start:stop] for c, start, stop in zip(columns, offsets[:-1], offsets[1:])
+    }
+
+
+def load_estimator(path: str, manifest: dict, mmap_mode: str = "c"):
+    """
+    Estimator of an artifact folder, its arrays memory-mapped unless mmap_mode is None.
+    Copy-on-write mapping keeps the pages shared until written, and unlike a read-only
+    one is accepted by the compiled predictors of sklearn which take writable buffers.
+    """
+    return joblib.load(os.path.join(path, manifest["estimator"]), mmap_mode=mmap_mode)
+
+
+def _vocabulary(classes) -> np.array:
+    """
+    Classes as an array without objects, so it is saved without pickle and mapped on load.
+    Classes of an object column are all of one type, which numpy infers from the values.
+    """
+    classes = np.asarray(classes)
+    if classes.dtype == object:
+        classes = np.asarray(classes.tolist())
+    return classes.astype(str) if classes.dtype == object else classes
+
+
+def _to_builtin(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -1,13 +1,16 @@
 import pandas as pd
 from typing import NamedTuple
-from sklearn.model_selection import cross_validate
-from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
 
+from core.models.estimator import Estimator
+from core.models.tuning import (
+    decision_tree_space,
+    pruning_path_search,
+    successive_halving,
+)
 from core.utils.feature_select import select_feature
-from core.utils.manage_report import export_train_report
 
 
-class DecisionTree:
+class DecisionTree(Estimator):
     def __init__(self, problem_type: str, random_state=42, **kwargs):
         """
         problem_type: str, problem type which is one of 'binary', 'multiclass', 'regression'
@@ -16,38 +19,79 @@ class DecisionTree:
             DecisionTreeClassifier: https://bit.ly/3lzLWeK
             DecisionTreeRegressor: https://bit.ly/310Ds8M
         """
-        if problem_type == "regression":
-            self.estimator = DecisionTreeRegressor(random_state=random_state, **kwargs)
-        else:
-            self.estimator = DecisionTreeClassifier(random_state=random_state, **kwargs)
-
+        super().__init__("dt", problem_type, random_state=random_state, **kwargs)
 
-    def fit(self, data: pd.DataFrame, meta: NamedTuple, cv, save_path, file_id: str, encoder: 'dict of encoders', tuning=False):
+    def fit(
+        self,
+        data: pd.DataFrame,
+        meta: NamedTuple,
+        cv,
+        save_path,
+        file_id: str,
+        encoder: 'dict of encoders',
+        tuning=False,
+        time_budget: float = None,
+        max_fits: int = None,
+        **kwargs
+    ):
         """
-        data: pandas.core.frame.DataFrame, data which contains features and target
-        meta: dict, meta data for construct model and for the prediction with new raw data in the future
-        save_path: str, path to save the reports and meta files
-        cv: int, 'K' value for the cross validation
-        tuning: bool, decide if optimize model
+        tuning: bool or str, True or 'halving' to tune max_depth, min_samples_leaf, criterion
+            and ccp_alpha by successive halving before the train, 'ccp' to tune ccp_alpha only
+            from the pruning path of one fully grown tree per fold
+        time_budget: float, seconds after which the tuning stops starting new rounds
+        max_fits: int, number of fits after which the tuning stops starting new rounds
+        Other arguments are the same as Estimator.fit
         """
-        if tuning:
+        if not tuning:
+            return super().fit(data, meta, cv, save_path, file_id, encoder, **kwargs)
+        if tuning not in (True, "halving", "ccp"):
             raise NotImplementedError()
-        else:
-            X = data.drop(meta.target, axis=1)
-            y = data[meta.target]
 
-            # feature selection phase
+        X = data.drop(meta.target, axis=1)
+        y = data[meta.target]
+
+        features_for_train = kwargs.pop("features_for_train", None)
+        if features_for_train is None:
             features_for_train = select_feature(
                 X=X, y=y, problem_type=meta.problem_type
             )
-            meta = meta._replace(features_for_train=features_for_train)
-            export_train_report(
+
+        if tuning == "ccp":
+            best_alpha, report = pruning_path_search(
                 estimator=self.estimator,
-                X=X.loc[:, features_for_train],
-                y=y,
-                meta=meta,
+                X=X.loc[:, features_for_train].values,
+                y=y.values,
+                problem_type=meta.problem_type,
                 cv=cv,
-                file_id=file_id,
-                save_path=save_path,
-                encoder=encoder,
-            )
\ No newline at end of file
+                random_state=self.random_state,
+            )
+            best_params = dict(ccp_alpha=best_alpha)
+            report_name = "Pruning Path"
+        else:
+            best_params, report = successive_halving(
+                estimator=self.estimator,
+                param_space=decision_tree_space(self.estimator),
+                X=X.loc[:, features_for_train].values,
+                y=y.values,
+                problem_type=meta.problem_type,
+                cv=cv,
+                time_budget=time_budget,
+                max_fits=max_fits,
+                random_state=self.random_state,
+            )
+            report_name = "Tuning"
+        self.estimator.set_params(**best_params)
+
+        extra_reports = dict(kwargs.pop("extra_reports", None) or dict())
+        extra_reports[report_name] = report
+        super().fit(
+            data,
+            meta,
+            cv,
+            save_path,
+            file_id,
+            encoder,
+            features_for_train=features_for_train,
+            extra_reports=extra_reports,
+            **kwargs
+        )
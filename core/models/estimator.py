@@ -0,0 +1,69 @@
+import pandas as pd
+from typing import NamedTuple
+
+from core.models.zoo import make_estimator
+from core.utils.feature_select import select_feature
+from core.utils.manage_report import export_train_report
+
+
+class Estimator:
+    def __init__(self, name: str, problem_type: str, random_state=42, **kwargs):
+        """
+        name: str, type of estimator which is one of EstimatorTypes
+        problem_type: str, problem type which is one of 'binary', 'multiclass', 'regression'
+        random_state: int
+        **kwargs: Parameters of the estimator
+        """
+        self.problem_type = problem_type
+        self.random_state = random_state
+        self.estimator = make_estimator(
+            name, problem_type, random_state=random_state, **kwargs
+        )
+
+    def fit(
+        self,
+        data: pd.DataFrame,
+        meta: NamedTuple,
+        cv,
+        save_path,
+        file_id: str,
+        encoder: 'dict of encoders',
+        tuning=False,
+        features_for_train: list = None,
+        extra_reports: dict = None,
+        report_format: str = "csv",
+    ):
+        """
+        data: pandas.core.frame.DataFrame, data which contains features and target
+        meta: dict, meta data for construct model and for the prediction with new raw data in the future
+        save_path: str, path to save the reports and meta files
+        cv: int, 'K' value for the cross validation
+        tuning: bool, decide if optimize model
+        features_for_train: list, features already selected(feature selection is skipped if given)
+        extra_reports: dict, additional report sheets(name: pandas.core.frame.DataFrame)
+        report_format: str, format of the train report, one of 'csv', 'parquet', 'excel'
+        """
+        if tuning:
+            raise NotImplementedError()
+
+        X = data.drop(meta.target, axis=1)
+        y = data[meta.target]
+
+        # feature selection phase
+        if features_for_train is None:
+            features_for_train = select_feature(
+                X=X, y=y, problem_type=meta.problem_type
+            )
+        meta = meta._replace(features_for_train=features_for_train)
+        export_train_report(
+            estimator=self.estimator,
+            X=X.loc[:, features_for_train],
+            y=y,
+            meta=meta,
+            cv=cv,
+            file_id=file_id,
+            save_path=save_path,
+            encoder=encoder,
+            extra_reports=extra_reports,
+            report_format=report_format,
+        )
@@ -0,0 +1,100 @@
+import copy
+
+import numpy as np
+from sklearn.base import clone
+
+
+def update_estimator(
+    estimator,
+    X: np.array,
+    y: np.array,
+    n_new_estimators: int = 10,
+    refit: bool = False,
+    allow_refit: bool = False,
+) -> ("estimator", "strategy"):
+    """
+    Update a trained estimator with a new slice of data, at a cost which scales with
+    the slice rather than with all the data seen so far.
+
+    - Ensembles with warm_start(random forest, gradient boosting) keep their trees and
+      add `n_new_estimators` trees fitted on the slice.
+    - Other estimators with warm_start(logistic regression) start from their weights.
+    - The others can only be fitted again on the slice, which forgets all the data they
+      were fitted on before, so it is done only if `allow_refit` is given. So is histogram
+      gradient boosting, which bins the data of every fit anew: the trees kept by a warm
+      start would split on the bins of the previous data and the new ones fit wrong residuals.
+
+    The given estimator is left as it is.
+
+    Args
+    ------
+    estimator: sklearn estimator object, trained model
+    X: 2D numpy.ndarray, features of the new slice, in the order of train
+    y: 1D numpy.ndarray, target of the new slice
+    n_new_estimators: int, trees added to ensembles
+    refit: bool, fit the estimator again on the slice regardless(e.g. when the features changed)
+    allow_refit: bool, allow the estimator to be fitted again on the slice only, else a
+        ValueError is raised when it can not be extended
+
+    Return
+    ------
+    estimator: sklearn estimator object, updated model
+    strategy: str, 'warm_start' or 'refit'
+    """
+    classes = getattr(estimator, "classes_", None)
+    # a new or missing class changes the outputs, so the model can not be extended
+    same_classes = classes is None or set(np.unique(y)) == set(classes)
+
+    reason = None
+    if refit:
+        reason = "the features changed"
+    elif not same_classes:
+        reason = "the classes of the new data differ from the ones of the model"
+    elif not can_extend(estimator):
+        reason = f"{type(estimator).__name__} can not be extended with new data"
+    if reason is not None:
+        if not allow_refit:
+            raise ValueError(
+                f"{reason}, so the model can only be fitted again on the new data, which "
+                "forgets the data it was fitted on before. Allow it with allow_refit."
+            )
+        return clone(estimator).fit(X, y), "refit"
+
+    estimator = copy.deepcopy(estimator)
+    if "n_estimators" in estimator.get_params():
+        estimator.set_params(n_estimators=len(estimator.estimators_) + n_new_estimators)
+    estimator.set_params(warm_start=True)
+    estimator.fit(X, y)
+    estimator.set_params(warm_start=False)
+    return estimator, "warm_start"
+
+
+def can_extend(estimator) -> bool:
+    """
+    Whether the estimator is extended with new data by a warm start, keeping what it learned.
+    """
+    params = estimator.get_params()
+    # histogram gradient boosting bins the data of every fit anew
+    return "warm_start" in params and "max_bins" not in params
+
+
+def merge_encoder(encoder: dict, new_classes: dict) -> dict:
+    """
+    Append the classes seen for the first time to the classes of each encoder, so
+    the codes of the known classes do not change.
+
+    Args
+    ------
+    encoder: dict, classes of each encoded column
+    new_classes: dict, classes of each column in the new slice
+
+    Return
+    ------
+    encoder: dict, merged classes of each encoded column
+    """
+    merged = dict()
+    for c, classes in encoder.items():
+        known = set(classes)
+        unseen = [k for k in new_classes.get(c, list()) if k not in known]
+        merged[c] = list(classes) + sorted(unseen, key=str)
+    return merged
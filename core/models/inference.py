@@ -0,0 +1,105 @@
+import os
+import tempfile
+
+import joblib
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+
+
+# estimator loaded in a worker process, kept between the shards of the same predictor
+_WORKER_CACHE = dict()
+
+
+class ParallelPredictor:
+    """
+    Score large matrices on a process pool, shard by shard.
+
+    The estimator is dumped once, uncompressed, and every worker loads it
+    memory-mapped the first time it gets a shard, so it is never pickled again
+    per task. The matrix is memory-mapped to the workers by joblib, and each
+    task gets only the bounds of its shard. The results are reassembled in the
+    order of the rows.
+
+    Use it as a context manager so the pool and the dumped estimator are kept
+    across calls(e.g. over the chunks of a file).
+
+    If the estimator was loaded from an artifact folder, its dump there is
+    given as `model_path` and mapped by the workers instead of dumping it again.
+
+    Args
+    ------
+    estimator: sklearn estimator object, trained model
+    n_jobs: int, number of processes, -1 for all cores
+    min_shard_size: int, rows below which a shard is not split further
+    model_path: str, uncompressed joblib dump of the estimator, if there is one
+    """
+
+    def __init__(
+        self, estimator, n_jobs: int = -1, min_shard_size: int = 10000, model_path: str = None
+    ):
+        self.estimator = estimator
+        self.n_jobs = effective_n_jobs(n_jobs)
+        self.min_shard_size = min_shard_size
+        self.model_path = model_path
+        self._folder = None
+        self._path = None
+        self._parallel = None
+
+    def __enter__(self):
+        if self.n_jobs > 1:
+            if self.model_path is not None:
+                self._path = self.model_path
+            else:
+                self._folder = tempfile.TemporaryDirectory()
+                self._path = os.path.join(self._folder.name, "estimator.pkl")
+                joblib.dump(self.estimator, self._path)
+            self._parallel = Parallel(n_jobs=self.n_jobs).__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        if self._parallel is not None:
+            self._parallel.__exit__(*exc)
+            self._parallel = None
+        if self._folder is not None:
+            self._folder.cleanup()
+            self._folder = None
+
+    def predict(self, X: np.array) -> ("prediction", "probability"):
+        """
+        Predict with one predict_proba call per shard for classifiers, deriving the classes from it.
+        """
+        X = np.asarray(X)
+        bounds = self._shard_bounds(X.shape[0])
+        if self._parallel is None or len(bounds) < 2:
+            return predict_with_probability(self.estimator, X)
+
+        results = self._parallel(
+            delayed(_score_shard)(self._path, X, start, stop) for start, stop in bounds
+        )
+        prediction = np.concatenate([r[0] for r in results])
+        if results[0][1] is None:
+            return prediction, None
+        return prediction, np.concatenate([r[1] for r in results])
+
+    def _shard_bounds(self, n_rows: int) -> list:
+        n_shards = max(1, min(self.n_jobs, n_rows // self.min_shard_size))
+        edges = np.linspace(0, n_rows, n_shards + 1).astype(int)
+        return list(zip(edges[:-1], edges[1:]))
+
+
+def predict_with_probability(estimator, X) -> ("prediction", "probability"):
+    """
+    Predict with one predict_proba call for classifiers, deriving the classes from it.
+    """
+    if hasattr(estimator, "predict_proba"):
+        probability = estimator.predict_proba(X)
+        return estimator.classes_[probability.argmax(axis=1)], probability
+    return estimator.predict(X), None
+
+
+def _score_shard(path: str, X: np.array, start: int, stop: int):
+    if path not in _WORKER_CACHE:
+        _WORKER_CACHE.clear()
+        # copy-on-write, as the compiled predictors of sklearn reject read-only buffers
+        _WORKER_CACHE[path] = joblib.load(path, mmap_mode="c")
+    return predict_with_probability(_WORKER_CACHE[path], X[start:stop])
@@ -0,0 +1,238 @@
+import io
+import os
+import glob
+import json
+import zipfile
+import functools
+import threading
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+
+from core.data.load import Meta
+from core.models import artifact as artifact_format
+from core.preprocessing.impute import KNNImputer
+from core.preprocessing.pipeline import PreprocessPipeline
+from core.serving.compiled import CompiledTree
+
+
+class Artifact:
+    """
+    Trained artifact. Its estimator is either given or loaded by `load_estimator` on first
+    use, so an artifact scored by its compiled tree never unpickles(nor imports) sklearn.
+
+    Args
+    ------
+    estimator: trained model object, None to load it on first use
+    meta: Meta, meta data
+    encoder: dict, classes of each encoded column
+    pipeline: PreprocessPipeline, compiled preprocessing pipeline
+    compiled: CompiledTree, flattened tree of decision trees
+    model_path: str, uncompressed estimator dump, which workers can map
+    load_estimator: function, returning the estimator when it was not given
+    """
+
+    def __init__(
+        self,
+        estimator: object,
+        meta: Meta,
+        encoder: dict,
+        pipeline: PreprocessPipeline,
+        compiled: CompiledTree = None,
+        model_path: str = None,
+        load_estimator=None,
+    ):
+        self._estimator = estimator
+        self.meta = meta
+        self.encoder = encoder
+        self.pipeline = pipeline
+        self.compiled = compiled
+        self.model_path = model_path
+        self._load_estimator = load_estimator
+        self._lock = threading.Lock()
+
+    @property
+    def estimator(self):
+        # artifacts are shared by the threads of the server, so it is loaded once
+        with self._lock:
+            if self._estimator is None and self._load_estimator is not None:
+                self._estimator = self._load_estimator()
+                self._load_estimator = None
+        return self._estimator
+
+
+def load_artifact(path: str, mmap: bool = True) -> Artifact:
+    """
+    Load a trained artifact. The arrays of an artifact folder are memory-mapped, so
+    loading takes milliseconds whatever the size of the model, and the pages are
+    shared by the processes which load the same artifact. Zip files of older
+    artifacts are read straight from the zip, without extracting it.
+
+    Args
+    ------
+    path: str, path of the artifact folder, of the meta zip file or of the folder which contains either
+    mmap: bool, map the arrays of an artifact folder, else read them in memory
+
+    Return
+    ------
+    artifact: Artifact, estimator, meta data, encoders, preprocessing pipeline and
+        compiled tree(decision trees only, whose estimator is loaded on first use)
+    """
+    path = resolve_artifact_path(path)
+    if artifact_format.is_artifact(path):
+        return _load_artifact_folder(path, mmap)
+    return _load_artifact_zip(path)
+
+
+def _load_artifact_folder(path: str, mmap: bool = True) -> Artifact:
+    manifest = artifact_format.read_manifest(path)
+    sections = artifact_format.load_sections(path, manifest, "r" if mmap else None)
+    meta = Meta(**{k: v for k, v in manifest["meta"].items() if k in Meta._fields})
+    encoder = artifact_format.load_encoder(manifest, sections)
+    load_estimator = functools.partial(
+        artifact_format.load_estimator, path, manifest, "c" if mmap else None
+    )
+
+    spec = manifest.get("pipeline")
+    bin_edges = artifact_format.load_bin_edges(manifest, sections)
+    imputation = None
+    if spec is not None and spec.get("imputer") is not None:
+        imputation = dict(
+            method="knn",
+            sample=sections["pipeline.imputer_sample"],
+            scale=sections["pipeline.imputer_scale"],
+            **spec["imputer"],
+        )
+    # kept in the sections only, not in the meta data of the manifest
+    meta = meta._replace(bin_edges=bin_edges or None, imputation=imputation)
+
+    if spec is None:
+        pipeline = PreprocessPipeline.from_meta(meta, encoder)
+    else:
+        target_classes = spec["target_classes"]
+        pipeline = PreprocessPipeline(
+            features=spec["features"],
+            fill_values=sections["pipeline.fill_values"],
+            categories={c: np.asarray(encoder[c], dtype=object) for c in spec["categorical"]},
+            target=spec["target"],
+            target_classes=None if target_classes is None else np.asarray(target_classes, dtype=object),
+            bin_edges=[bin_edges.get(c) for c in spec["features"]] if spec["binned"] else None,
+            imputer=None if imputation is None else KNNImputer.from_dict(imputation),
+        )
+
+    compiled = None
+    if manifest.get("compiled") is not None:
+        compiled = CompiledTree(
+            feature=sections["compiled.feature"],
+            threshold=sections["compiled.threshold"],
+            left=sections["compiled.left"],
+            right=sections["compiled.right"],
+            value=sections["compiled.value"],
+            classes=sections.get("compiled.classes"),
+            max_depth=manifest["compiled"]["max_depth"],
+        )
+
+    model_path = os.path.join(path, manifest["estimator"])
+    # the compiled tree scores without the estimator, which is loaded on first use only
+    if compiled is not None:
+        return Artifact(None, meta, encoder, pipeline, compiled, model_path, load_estimator)
+    return Artifact(load_estimator(), meta, encoder, pipeline, compiled, model_path)
+
+
+def _load_artifact_zip(zip_path: str) -> Artifact:
+    meta_raw, encoder, estimator = None, dict(), None
+    with zipfile.ZipFile(zip_path) as meta_zip:
+        for name in meta_zip.namelist():
+            base = os.path.basename(name)
+            if base.endswith(".json") and "meta" in base:
+                meta_raw = json.loads(meta_zip.read(name))
+            elif base.endswith(".json") and "encoder" in base:
+                encoder = json.loads(meta_zip.read(name))
+            elif base.endswith(".pkl") and "model" in base:
+                estimator = joblib.load(io.BytesIO(meta_zip.read(name)))
+
+    meta = Meta(**{k: v for k, v in meta_raw.items() if k in Meta._fields})
+    pipeline = PreprocessPipeline.from_meta(meta, encoder)
+    return Artifact(estimator, meta, encoder, pipeline, None)
+
+
+def resolve_artifact_path(path: str) -> str:
+    """
+    Return the path of the artifact folder, or of the meta zip file of older artifacts,
+    from the path of itself or of the folder which contains it.
+    """
+    path = path.replace("\\", "/").rstrip("/")
+    if path.endswith(".zip") or artifact_format.is_artifact(path):
+        return path
+    folders = glob.glob(os.path.join(path, "*" + artifact_format.SUFFIX))
+    if folders:
+        return folders[0]
+    return glob.glob(os.path.join(path, "*.zip"))[0]
+
+
+def _modified_time(path: str) -> float:
+    # the manifest is written last, so it dates the whole artifact folder
+    if os.path.isdir(path):
+        path = os.path.join(path, artifact_format.MANIFEST)
+    return os.path.getmtime(path)
+
+
+class ModelRegistry:
+    """
+    Size-bounded LRU cache of trained artifacts kept in memory.
+
+    Artifacts are keyed by their path and modification time, so a retrained
+    artifact written to the same path is loaded again.
+
+    Args
+    ------
+    maxsize: int, maximum number of artifacts to keep
+    """
+
+    def __init__(self, maxsize: int = 8):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._artifacts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Artifact:
+        artifact_path = os.path.abspath(resolve_artifact_path(path))
+        key = (artifact_path, _modified_time(artifact_path))
+
+        with self._lock:
+            if key in self._artifacts:
+                self._artifacts.move_to_end(key)
+                self.hits += 1
+                return self._artifacts[key]
+
+        artifact = load_artifact(artifact_path)
+
+        with self._lock:
+            self.misses += 1
+            # drop stale versions of the same artifact
+            for stale in [k for k in self._artifacts if k[0] == artifact_path]:
+                del self._artifacts[stale]
+            self._artifacts[key] = artifact
+            while len(self._artifacts) > self.maxsize:
+                self._artifacts.popitem(last=False)
+
+        return artifact
+
+    def clear(self):
+        with self._lock:
+            self._artifacts.clear()
+
+    def __len__(self):
+        return len(self._artifacts)
+
+
+REGISTRY = ModelRegistry()
+
+
+def get_artifact(path: str) -> Artifact:
+    """
+    Get the artifact from the default registry, loading it on the first request.
+    """
+    return REGISTRY.get(path)
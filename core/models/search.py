@@ -0,0 +1,97 @@
+import os
+import time
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.model_selection import KFold, StratifiedKFold
+
+from core.models.zoo import make_estimator
+
+
+def search_estimators(
+    X: pd.DataFrame,
+    y: pd.Series,
+    candidates: list,
+    problem_type: str,
+    cv: int,
+    n_jobs: int = -1,
+    random_state=42,
+) -> ("best candidate", "search report"):
+    """
+    Fit every candidate estimator on the same CV splits in parallel and pick the best.
+
+    X and y are dumped once and memory-mapped read-only by the worker processes,
+    so every (candidate, fold) task shares the same copy of the data.
+
+    Args
+    ------
+    X: pandas.core.frame.DataFrame, feature data
+    y: pandas.core.series.Series, target data
+    candidates: list, estimator types to compare, one of EstimatorTypes each
+    problem_type: str, problem type which is one of 'binary', 'multiclass', 'regression'
+    cv: int, 'K' value for the cross validation
+    n_jobs: int, number of processes
+
+    Return
+    ------
+    best: str, estimator type of the best validation score
+    report: pandas.core.frame.DataFrame, scores and fit times of each candidate
+    """
+    if problem_type == "regression":
+        splitter = KFold(n_splits=cv, shuffle=True, random_state=random_state)
+    else:
+        splitter = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+    splits = list(splitter.split(X, y))
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "data.pkl")
+        joblib.dump((np.ascontiguousarray(X.values), y.values), path)
+        X_shared, y_shared = joblib.load(path, mmap_mode="r")
+
+        results = Parallel(n_jobs=n_jobs)(
+            delayed(_fit_and_score)(
+                name, problem_type, X_shared, y_shared, train, valid, random_state
+            )
+            for name in candidates
+            for train, valid in splits
+        )
+
+    report = (
+        pd.DataFrame(results, columns=["Estimator", "Train", "Validation", "Fit Time", "Score Time"])
+        .groupby("Estimator", sort=False)
+        .agg(
+            Train=("Train", "mean"),
+            Validation=("Validation", "mean"),
+            Validation_STD=("Validation", "std"),
+            Fit_Time=("Fit Time", "sum"),
+            Score_Time=("Score Time", "sum"),
+        )
+    )
+    report.columns = [c.replace("_", " ") for c in report.columns]
+    best = report["Validation"].idxmax()
+
+    for name, row in report.iterrows():
+        print(
+            f"[{name}] validation score: {row['Validation']:.4f}, fit time: {row['Fit Time']:.2f}s"
+        )
+    print(f"Best estimator: '{best}'")
+
+    return best, report
+
+
+def _fit_and_score(name, problem_type, X, y, train, valid, random_state):
+    estimator = make_estimator(name, problem_type, random_state=random_state)
+
+    start = time.perf_counter()
+    estimator.fit(X[train], y[train])
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    valid_score = estimator.score(X[valid], y[valid])
+    score_time = time.perf_counter() - start
+    train_score = estimator.score(X[train], y[train])
+
+    return name, train_score, valid_score, fit_time, score_time
@@ -1,16 +1,18 @@
 from enum import Enum
 
-from core.data.load import load
-from core.preprocessing.preprocess import auto_preprocess, make_data_fit
-from core.models.decisiontree import DecisionTree
+from core.data.cache import DatasetCache
+from core.preprocessing.preprocess import make_data_fit
+from core.models.registry import Artifact, get_artifact
 from core.utils.manage_report import (
-    read_report,
     export_test_report,
+    export_test_report_stream,
     generate_file_id,
 )
+from core.utils.async_writer import AsyncWriter, write_async
+from core.utils.profiler import Profiler, profile_stage
 
 
-def train(input: str, target: str, problem_type: str, save_path: str, estimator: str, cv: int, **kwargs):
+def train(input: str, target: str, problem_type: str, save_path: str, estimator: str, cv: int, chunksize: int = None, cache_dir: str = None, tuning=False, time_budget: float = None, report_format: str = "csv", trace_path: str = None, compact: bool = False, max_bins: int = None, impute: str = "simple", **kwargs):
     """
     Learn automatically depending on the inputs
     - Preprocessing
@@ -18,6 +20,7 @@ def train(input: str, target: str, problem_type: str, save_path: str, estimator:
         - Dropping rows which contains missing values
         - Label encoding
     - Feature Selection using Permutation Importance
+    - Model Search over the candidate estimators, if several are given
 
     Args
     ------
@@ -25,32 +28,108 @@ def train(input: str, target: str, problem_type: str, save_path: str, estimator:
     target: str, name of the target column
     problem_type: str, problem type which is one of 'binary', 'multiclass', 'regression'
     save_path: str, path to save reports
-    estimator: str or Enum object, type of estimator to train
+    estimator: str or Enum object, type of estimator to train. Several types given as a list
+        or comma-separated names(e.g. "dt,rf,lr") are compared by CV and the best one is trained
     cv: int, k value for cross-validation
+    chunksize: int, if given, stream the input in chunks of this many rows to bound memory
+    cache_dir: str, if given, reuse the preprocessed data cached in this folder
+    tuning: bool or str, tune the parameters of the estimator before the train(decision tree only,
+        a ValueError is raised for other estimators)
+    time_budget: float, seconds for the tuning
+    report_format: str, format of the train report, 'csv' or 'parquet' for a JSON summary,
+        'excel' for a workbook
+    trace_path: str, if given, save the time and memory of each stage there as a Chrome trace
+    compact: bool, load categorical features as small integer codes and numeric features
+        in the smallest exact dtype, to cut the memory of the data
+    max_bins: int, if given, quantize every feature into at most this many uint8 bins(up to 255)
+        after the preprocessing. The bin edges are kept in the meta data for the test phase
+    impute: str, 'simple' to fill the median or mode of each column, 'knn' to fill the mean of
+        the nearest complete rows of a sample of the data. The imputer is kept for the test phase
     """
+    # modules of the train phase are imported here, so the test phase starts without them
+    from core.models.search import search_estimators
+    from core.models.zoo import parse_estimators
+    from core.utils.feature_select import select_feature
 
     if isinstance(problem_type, Enum):
         problem_type = problem_type.value
 
-    if isinstance(estimator, Enum):
-        estimator = estimator.value
+    candidates = parse_estimators(estimator)
+    # checked before any work, as only the decision tree takes the tuning options
+    if tuning and candidates != ["dt"]:
+        raise ValueError(
+            f"tuning is only available for the decision tree('dt'), got {candidates}"
+        )
 
-    data, meta = load(input=input, target=target, problem_type=problem_type)
-    data, encoder = auto_preprocess(data=data, meta=meta)
+    # the stages are written in the report and in the meta data, and the reports, the
+    # artifact and the cache are written in the background while the next stage computes
+    with Profiler() as profiler, profiler.stage("train"), AsyncWriter():
+        data, meta, encoder = _load_train_data(
+            input=input,
+            target=target,
+            problem_type=problem_type,
+            chunksize=chunksize,
+            cache_dir=cache_dir,
+            compact=compact,
+            max_bins=max_bins,
+            impute=impute,
+        )
 
-    if estimator == "dt":
-        model = DecisionTree(problem_type=problem_type, **kwargs)
-    else:
-        raise NotImplementedError()
+        file_id = generate_file_id()
 
-    file_id = generate_file_id()
-    model.fit(data, meta, cv, save_path, file_id, encoder=encoder)
+        tuning_options = dict(tuning=tuning, time_budget=time_budget) if tuning else dict()
+
+        if len(candidates) == 1:
+            model = _make_model(candidates[0], problem_type, **kwargs)
+            model.fit(
+                data,
+                meta,
+                cv,
+                save_path,
+                file_id,
+                encoder=encoder,
+                report_format=report_format,
+                **tuning_options
+            )
+        else:
+            X = data.drop(meta.target, axis=1)
+            y = data[meta.target]
+            features_for_train = select_feature(X=X, y=y, problem_type=problem_type)
+            with profile_stage("model_search", X.loc[:, features_for_train]):
+                best, search_report = search_estimators(
+                    X=X.loc[:, features_for_train],
+                    y=y,
+                    candidates=candidates,
+                    problem_type=problem_type,
+                    cv=cv,
+                )
+            model = _make_model(best, problem_type, **kwargs)
+            model.fit(
+                data,
+                meta,
+                cv,
+                save_path,
+                file_id,
+                encoder=encoder,
+                features_for_train=features_for_train,
+                extra_reports={"Model Search": search_report},
+                report_format=report_format,
+                **tuning_options
+            )
+
+    if trace_path:
+        profiler.to_chrome_trace(trace_path)
 
 
 def test(
     input: "path of data",
     meta_path: "path of meta data",
     save_path: "path to save result",
+    cache_dir: str = None,
+    chunksize: int = None,
+    report_format: str = "csv",
+    n_jobs: int = 1,
+    trace_path: str = None,
 ):
     """
     test for the input data with trained model
@@ -60,12 +139,312 @@ def test(
     - input: str, path of data for test
     - meta_path: str, path of meta files
     - save_path: str, path to save result
+    - cache_dir: str, if given, reuse the test data cached in this folder
+    - chunksize: int, if given, score the input in chunks of this many rows and stream
+        the predictions to a file, keeping memory bounded
+    - report_format: str, 'csv' or 'parquet' to write the predictions in that format with
+        a JSON summary, 'excel' to render them in a workbook(not with chunksize)
+    - n_jobs: int, number of processes scoring the data in shards, -1 for all cores
+    - trace_path: str, if given, save the time and memory of each stage there as a Chrome trace
     """
-    estimator, meta = read_report(meta_path)
+    # the stages are written in the report
+    with Profiler() as profiler, profiler.stage("test"), AsyncWriter():
+        with profile_stage("load_artifact"):
+            artifact = get_artifact(meta_path)
+        file_id = meta_path.split("/")[-1] + "(" + input.split("/")[-1] + ")"
+
+        if chunksize:
+            export_test_report_stream(
+                artifact,
+                input,
+                chunksize,
+                file_id,
+                save_path,
+                report_format=report_format,
+                n_jobs=n_jobs,
+            )
+        else:
+            # make dataset in the same condition as train
+            with profile_stage("make_data_fit") as stage:
+                data = _load_test_data(
+                    input=input, artifact=artifact, meta_path=meta_path, cache_dir=cache_dir
+                )
+                stage.observe(data)
+
+            # CASE1: data has no target - just prediction
+            export_test_report(
+                artifact.estimator,
+                data,
+                file_id,
+                save_path,
+                artifact.meta.target,
+                report_format=report_format,
+                n_jobs=n_jobs,
+            )
+
+    if trace_path:
+        profiler.to_chrome_trace(trace_path)
+
+
+def retrain(
+    input: str,
+    meta_path: str,
+    save_path: str,
+    drift_threshold: float = 0.2,
+    n_new_estimators: int = 10,
+    report_format: str = "csv",
+    trace_path: str = None,
+    allow_refit: bool = False,
+    holdout: float = 0.2,
+):
+    """
+    Update a trained artifact with a new slice of data, without the data it was trained on.
+
+    - The statistics of the meta data are merged with the ones of the slice, from the
+      category counts and quantile sketches of the columns kept in train
+    - Categories seen for the first time are appended to the encoders
+    - The features selected before are kept, unless the distribution of one of them
+      drifted more than `drift_threshold`, in which case they are selected again on the slice
+    - The model is extended with the slice(see update_estimator). If it can not be, or the
+      features or the classes changed, it is fitted again on the slice only, forgetting the
+      data it was fitted on before, with `allow_refit` only. Else a ValueError is raised
+    - A `holdout` share of the slice is kept out of the update, on which the models before
+      and after it are compared
+
+    Args
+    ------
+    input: str, path of the new slice of data
+    meta_path: str, path of the artifact to update
+    save_path: str, path to save the report and the updated artifact
+    drift_threshold: float, population stability index of a column above which the
+        features are selected again(0.1 is a moderate shift, 0.2 a significant one)
+    n_new_estimators: int, trees added to ensembles
+    report_format: str, format of the report, one of 'csv', 'parquet', 'excel'
+    trace_path: str, if given, save the time and memory of each stage there as a Chrome trace
+    allow_refit: bool, allow the model to be fitted again on the slice only
+    holdout: float, share of the rows of the slice on which the models are compared
+    """
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+
+    from core.data.summary import ColumnSummary
+    from core.models.incremental import can_extend, merge_encoder, update_estimator
+    from core.preprocessing.pipeline import PreprocessPipeline
+    from core.utils.feature_select import select_feature
+    from core.utils.manage_report import export_retrain_report
+
+    with Profiler() as profiler, profiler.stage("retrain"), AsyncWriter():
+        with profile_stage("load_artifact"):
+            artifact = get_artifact(meta_path)
+        meta = artifact.meta
+        # checked before any work, when the model can never be extended
+        if not (allow_refit or can_extend(artifact.estimator)):
+            raise ValueError(
+                f"{type(artifact.estimator).__name__} can not be extended with new data, and "
+                "fitting it again on the new data only forgets the data it was fitted on "
+                "before. Allow it with allow_refit(--allow_refit)."
+            )
+
+        with profile_stage("load") as stage:
+            raw = stage.observe(pd.read_csv(input))
+
+        with profile_stage("summarize", raw):
+            # the columns dropped in train are left out, so they neither drift nor grow
+            kept = [c for c in raw.columns if c != meta.target and c not in meta.dropped_cols]
+            summary = ColumnSummary.from_data(raw, meta.target, columns=kept)
+            if meta.summary:
+                previous = ColumnSummary.from_dict(meta.summary).select(kept)
+                drift = previous.drift(summary)
+                summary = previous.merge(summary)
+            else:
+                print("The artifact has no column summary, the statistics of the new data are used.")
+                drift = dict()
+
+        # statistics of all the rows seen, for the columns known in train
+        stats = summary.stats()
+        meta = meta._replace(
+            stats={c: stats.get(c, v) for c, v in meta.stats.items()},
+            profile=dict(
+                meta.profile or dict(), n_rows=summary.n_rows, missing_rate=summary.missing_rate()
+            ),
+            summary=summary.to_dict(),
+        )
+        # from the slice rather than the summary, which counts the frequent categories only
+        new_classes = {
+            c: raw[c].dropna().unique().tolist() for c in artifact.encoder if c in raw.columns
+        }
+        encoder = merge_encoder(artifact.encoder, new_classes)
+
+        with profile_stage("preprocess", raw) as stage:
+            # every feature, in case they are selected again
+            pipeline = PreprocessPipeline.from_meta(meta._replace(features_for_train=[]), encoder)
+            data = pipeline.transform(raw)
+            stage.observe(data)
+        X, y = data.drop(meta.target, axis=1), data[meta.target]
+        classes = getattr(artifact.estimator, "classes_", None)
+        if classes is not None and meta.target in encoder:
+            y = y.astype(classes.dtype)
+        # a class with a single row can not be split
+        stratify = None if meta.problem_type == "regression" or y.value_counts().min() < 2 else y
+        X, X_holdout, y, y_holdout = train_test_split(
+            X, y, test_size=holdout, stratify=stratify, random_state=0
+        )
+
+        features = meta.features_for_train or list(X.columns)
+        # only the selected features decide whether they are selected again
+        drifted = {c: v for c, v in drift.items() if c in features and v > drift_threshold}
+        if drifted:
+            print(f"Features are selected again, drifted columns: {sorted(drifted)}")
+            features = select_feature(X=X, y=y, problem_type=meta.problem_type)
+        meta = meta._replace(features_for_train=features)
+
+        previous_features = artifact.meta.features_for_train or list(X.columns)
+        with profile_stage("update_estimator", X.loc[:, features]) as stage:
+            estimator, strategy = update_estimator(
+                artifact.estimator,
+                X.loc[:, features].to_numpy(),
+                y.to_numpy(),
+                n_new_estimators=n_new_estimators,
+                refit=features != previous_features,
+                allow_refit=allow_refit,
+            )
+        fit_time = stage.seconds
+        print(f"Model updated by {strategy} on {X.shape[0]} rows")
+        if strategy == "refit":
+            print(
+                f"Warning: the model was fitted again on the {X.shape[0]} rows of the new data "
+                f"only, the {summary.n_rows - raw.shape[0]} rows it was fitted on before are forgotten."
+            )
+
+        export_retrain_report(
+            X=X_holdout,
+            y=y_holdout,
+            n_rows=X.shape[0],
+            meta=meta,
+            estimator=estimator,
+            previous_estimator=artifact.estimator,
+            previous_features=previous_features,
+            strategy=strategy,
+            drift=drift,
+            fit_time=fit_time,
+            file_id=generate_file_id(),
+            save_path=save_path,
+            encoder=encoder,
+            report_format=report_format,
+        )
+
+    if trace_path:
+        profiler.to_chrome_trace(trace_path)
+
+
+def _make_model(name: str, problem_type: str, **kwargs) -> "Estimator":
+    from core.models.decisiontree import DecisionTree
+    from core.models.estimator import Estimator
+
+    if name == "dt":
+        return DecisionTree(problem_type=problem_type, **kwargs)
+    return Estimator(name, problem_type=problem_type, **kwargs)
+
+
+def _load_train_data(
+    input: str,
+    target: str,
+    problem_type: str,
+    chunksize: int,
+    cache_dir: str,
+    compact: bool = False,
+    max_bins: int = None,
+    impute: str = "simple",
+) -> ("data", "meta", "encoder"):
+    from core.data.load import Meta
+
+    if cache_dir is None:
+        return _load_and_preprocess(
+            input, target, problem_type, chunksize, compact, max_bins, impute
+        )
+
+    cache = DatasetCache(cache_dir)
+    key = cache.key(
+        input,
+        dict(
+            stage="train",
+            target=target,
+            problem_type=problem_type,
+            chunksize=chunksize,
+            compact=compact,
+            max_bins=max_bins,
+            impute=impute,
+        ),
+    )
+    with profile_stage("load_cache") as stage:
+        cached = cache.get(key)
+    if cached is not None:
+        data, payload = cached
+        stage.observe(data)
+        return data, Meta(**payload["meta"]), payload["encoder"]
+
+    data, meta, encoder = _load_and_preprocess(
+        input, target, problem_type, chunksize, compact, max_bins, impute
+    )
+    write_async("cache", cache.put, key, data, dict(meta=meta._asdict(), encoder=encoder))
+
+    return data, meta, encoder
+
+
+def _load_and_preprocess(
+    input: str,
+    target: str,
+    problem_type: str,
+    chunksize: int,
+    compact: bool,
+    max_bins: int,
+    impute: str = "simple",
+) -> ("data", "meta", "encoder"):
+    from core.data.load import load
+    from core.data.summary import ColumnSummary
+    from core.preprocessing.preprocess import auto_preprocess
+
+    with profile_stage("load") as stage:
+        data, meta = load(
+            input=input,
+            target=target,
+            problem_type=problem_type,
+            chunksize=chunksize,
+            compact=compact,
+        )
+        stage.observe(data)
+    # mergeable statistics of the raw columns, for an incremental retrain later
+    with profile_stage("summarize", data):
+        summary = ColumnSummary.from_data(data, target)
+    with profile_stage("auto_preprocess", data) as stage:
+        data, meta, encoder = auto_preprocess(data=data, meta=meta, impute=impute)
+        stage.observe(data)
+    # ID-like and mostly missing columns are not features, whatever their distribution
+    kept = [c for c in summary.null_counts if c not in meta.dropped_cols]
+    meta = meta._replace(summary=summary.select(kept).to_dict())
+
+    if max_bins:
+        from core.preprocessing.binning import bin_features
+
+        with profile_stage("bin_features", data):
+            data, meta = bin_features(data, meta, max_bins=max_bins)
+
+    return data, meta, encoder
+
+
+def _load_test_data(input: str, artifact: Artifact, meta_path: str, cache_dir: str):
+    if cache_dir is None:
+        return make_data_fit(input=input, meta=artifact.meta, pipeline=artifact.pipeline)
+
+    cache = DatasetCache(cache_dir)
+    key = cache.key(
+        input, dict(stage="test", meta_path=meta_path, meta=artifact.meta._asdict())
+    )
+    cached = cache.get(key)
+    if cached is not None:
+        return cached[0]
 
-    # make dataset in the same condition as train
-    data = make_data_fit(input=input, meta=meta)
-    file_id = meta_path.split("/")[-1] + "(" + input.split("/")[-1] + ")"
+    data = make_data_fit(input=input, meta=artifact.meta, pipeline=artifact.pipeline)
+    write_async("cache", cache.put, key, data)
 
-    # CASE1: data has no target - just prediction
-    export_test_report(estimator, data, file_id, save_path, meta.target)
+    return data
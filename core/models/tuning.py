@@ -0,0 +1,297 @@
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import KFold, ParameterGrid, StratifiedKFold
+
+
+def decision_tree_space(estimator) -> dict:
+    """
+    Search space of the decision tree parameters.
+    """
+    if hasattr(estimator, "predict_proba"):
+        criterion = ["gini", "entropy"]
+    else:
+        criterion = sorted({estimator.get_params()["criterion"], "friedman_mse"})
+    return dict(
+        max_depth=[None, 3, 5, 8, 12, 16, 24],
+        min_samples_leaf=[1, 2, 5, 10, 20, 50, 100],
+        criterion=criterion,
+        ccp_alpha=[0.0, 1e-4, 1e-3, 1e-2],
+    )
+
+
+def successive_halving(
+    estimator: "sklearn estimator object",
+    param_space: dict,
+    X: np.array,
+    y: np.array,
+    problem_type: str,
+    cv: int = 3,
+    n_candidates: int = 81,
+    eta: int = 3,
+    min_resources: int = 500,
+    time_budget: float = None,
+    max_fits: int = None,
+    n_jobs: int = -1,
+    random_state=42,
+) -> ("best params", "history"):
+    """
+    Search the parameters by successive halving.
+
+    Candidates sampled from the space are evaluated by CV on a small subset of
+    rows first. Only the best 1/eta of them go on to the next round, which uses
+    eta times more rows, until one candidate is left or the budget runs out.
+    Each round is evaluated in parallel over (candidate, fold).
+
+    Args
+    ------
+    estimator: sklearn estimator object, estimator to tune
+    param_space: dict, candidate values of each parameter
+    X: 2D numpy.ndarray, feature data
+    y: 1D numpy.ndarray, target data
+    problem_type: str, problem type which is one of 'binary', 'multiclass', 'regression'
+    cv: int, 'K' value for the cross validation in each round
+    n_candidates: int, number of candidates sampled from the space
+    eta: int, rate of candidates dropped and of rows added in each round
+    min_resources: int, number of rows used in the first round
+    time_budget: float, seconds the tuning should take. A round is not started if its cost,
+        projected from the previous round for its candidates and rows, would exceed them.
+        The first round always runs
+    max_fits: int, number of fits after which no more round is started
+    n_jobs: int, number of processes
+
+    Return
+    ------
+    best_params: dict, parameters of the best candidate of the last finished round
+    history: pandas.core.frame.DataFrame, score of every candidate in every round
+    """
+    start = time.perf_counter()
+    rng = np.random.RandomState(random_state)
+    X, y = np.asarray(X), np.asarray(y)
+
+    grid = list(ParameterGrid(param_space))
+    n_candidates = min(n_candidates, len(grid))
+    candidates = [grid[i] for i in rng.choice(len(grid), n_candidates, replace=False)]
+
+    n_rows = X.shape[0]
+    order = rng.permutation(n_rows)
+
+    history = list()
+    n_fits = 0
+    round_ = 0
+    round_seconds = previous_resources = None
+    while True:
+        resources = min(n_rows, min_resources * eta ** round_)
+        # the kept candidates on more rows, scaled from the time of the previous round
+        projected = round_seconds * resources / previous_resources if round_ else 0.0
+        if round_ and (
+            (time_budget is not None and time.perf_counter() - start + projected > time_budget)
+            or (max_fits is not None and n_fits + len(candidates) * cv > max_fits)
+        ):
+            print(f"Tuning budget is exhausted after {round_} round(s).")
+            break
+
+        round_start = time.perf_counter()
+        X_subset, y_subset = X[order[:resources]], y[order[:resources]]
+        splits = list(_splitter(problem_type, cv, random_state).split(X_subset, y_subset))
+
+        scores = Parallel(n_jobs=n_jobs)(
+            delayed(_fit_and_score)(
+                clone(estimator).set_params(**params), X_subset, y_subset, train, valid
+            )
+            for params in candidates
+            for train, valid in splits
+        )
+        n_fits += len(scores)
+        # seconds per candidate, to project the cost of the next round
+        round_seconds = (time.perf_counter() - round_start) / len(candidates)
+        previous_resources = resources
+        scores = np.asarray(scores).reshape(len(candidates), len(splits)).mean(axis=1)
+
+        for params, score in zip(candidates, scores):
+            history.append(dict(Round=round_, Rows=resources, Score=score, **params))
+
+        # keep the best 1/eta of the candidates for the next round
+        ranking = np.argsort(-scores, kind="mergesort")
+        candidates = [candidates[i] for i in ranking[: max(len(candidates) // eta, 1)]]
+        round_seconds *= len(candidates)
+        if len(candidates) == 1 or resources == n_rows:
+            break
+        round_ += 1
+
+    best_params = candidates[0]
+    history = pd.DataFrame(history)
+    history.index.name = "Candidate"
+    print(
+        f"Best parameters: {best_params} ({n_fits} fits in {time.perf_counter() - start:.2f}s)"
+    )
+
+    return best_params, history
+
+
+def _splitter(problem_type: str, cv: int, random_state):
+    if problem_type == "regression":
+        return KFold(n_splits=cv, shuffle=True, random_state=random_state)
+    return StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+
+
+def _fit_and_score(estimator, X, y, train, valid) -> float:
+    estimator.fit(X[train], y[train])
+    return estimator.score(X[valid], y[valid])
+
+
+def pruning_path_search(
+    estimator: "sklearn estimator object",
+    X: np.array,
+    y: np.array,
+    problem_type: str,
+    cv: int = 3,
+    n_alphas: int = 50,
+    random_state=42,
+) -> ("best alpha", "validation curve"):
+    """
+    Tune ccp_alpha of a decision tree with one fit per fold.
+
+    A fully grown tree is fitted on each fold once. The minimal cost-complexity
+    pruned subtree of every candidate alpha is then derived from that tree's
+    node arrays, and the validation rows are routed to the leaves of the pruned
+    subtrees without fitting again.
+
+    Args
+    ------
+    estimator: sklearn estimator object, DecisionTreeClassifier or DecisionTreeRegressor
+    X: 2D numpy.ndarray, feature data
+    y: 1D numpy.ndarray, target data
+    problem_type: str, problem type which is one of 'binary', 'multiclass', 'regression'
+    cv: int, 'K' value for the cross validation
+    n_alphas: int, maximum number of candidate alphas
+
+    Return
+    ------
+    best_alpha: float, alpha of the best mean validation score(the largest one among ties)
+    curve: pandas.core.frame.DataFrame, validation score and leaves over alpha
+    """
+    X, y = np.asarray(X), np.asarray(y)
+    splits = list(_splitter(problem_type, cv, random_state).split(X, y))
+
+    folds = list()
+    for train, valid in splits:
+        tree = clone(estimator).set_params(ccp_alpha=0.0).fit(X[train], y[train])
+        folds.append((tree, tree.apply(X[valid]), y[valid]))
+
+    # candidate alphas are log-spaced from the weakest link of the grown trees up to
+    # the root risk, where every tree is pruned to its root
+    effective = np.concatenate([_effective_alphas(t.tree_) for t, _, _ in folds])
+    effective = effective[effective > 0]
+    upper = max(_node_risk(t.tree_)[0] for t, _, _ in folds)
+    alphas = np.array([0.0])
+    if effective.shape[0] and upper > effective.min():
+        alphas = np.concatenate([alphas, np.geomspace(effective.min(), upper, n_alphas - 1)])
+
+    scores = np.empty((len(folds), alphas.shape[0]))
+    leaves = np.empty((len(folds), alphas.shape[0]))
+    for i, (tree, leaf_ids, y_valid) in enumerate(folds):
+        representative, n_leaves = _prune(tree.tree_, alphas)
+        nodes = representative[leaf_ids]  # (validation rows, alphas)
+        if problem_type == "regression":
+            prediction = tree.tree_.value[:, 0, 0][nodes]
+            residual = ((y_valid[:, None] - prediction) ** 2).sum(axis=0)
+            scores[i] = 1 - residual / ((y_valid - y_valid.mean()) ** 2).sum()
+        else:
+            node_class = tree.classes_[tree.tree_.value[:, 0, :].argmax(axis=1)]
+            scores[i] = (node_class[nodes] == y_valid[:, None]).mean(axis=0)
+        leaves[i] = n_leaves
+
+    curve = pd.DataFrame(
+        dict(
+            Alpha=alphas,
+            Score=scores.mean(axis=0),
+            STD=scores.std(axis=0),
+            Leaves=leaves.mean(axis=0),
+        )
+    )
+    best = np.flatnonzero(curve["Score"].values >= curve["Score"].max() - 1e-12)[-1]
+    best_alpha = float(alphas[best])
+    print(f"Best ccp_alpha: {best_alpha:.6g} (validation score: {curve['Score'][best]:.4f})")
+
+    return best_alpha, curve
+
+
+def _levels(tree) -> list:
+    """
+    Node ids of the tree grouped by depth, from the root.
+    """
+    left, right = tree.children_left, tree.children_right
+    levels = [np.array([0])]
+    while True:
+        internal = levels[-1][left[levels[-1]] >= 0]
+        if internal.shape[0] == 0:
+            return levels
+        levels.append(np.concatenate([left[internal], right[internal]]))
+
+
+def _node_risk(tree) -> np.array:
+    weight = tree.weighted_n_node_samples
+    return tree.impurity * weight / weight[0]
+
+
+def _effective_alphas(tree) -> np.array:
+    """
+    (R(t) - R(T_t)) / (|T_t| - 1) of every internal node t of the fully grown tree.
+    """
+    left, right = tree.children_left, tree.children_right
+    risk = _node_risk(tree)
+    subtree_risk = risk.copy()
+    n_leaves = np.ones(tree.node_count)
+    for nodes in reversed(_levels(tree)):
+        internal = nodes[left[nodes] >= 0]
+        subtree_risk[internal] = subtree_risk[left[internal]] + subtree_risk[right[internal]]
+        n_leaves[internal] = n_leaves[left[internal]] + n_leaves[right[internal]]
+
+    internal = left >= 0
+    alphas = (risk[internal] - subtree_risk[internal]) / (n_leaves[internal] - 1)
+    return np.clip(alphas, 0, None)
+
+
+def _prune(tree, alphas: np.array) -> ("representative node", "number of leaves"):
+    """
+    Prune the tree for every alpha at once.
+
+    Return, for every node and alpha, the leaf of the pruned subtree the node
+    falls into, and the number of leaves of every pruned subtree.
+    """
+    left, right = tree.children_left, tree.children_right
+    levels = _levels(tree)
+    risk = _node_risk(tree)
+
+    # bottom-up: a node is collapsed if its own cost is not above its best subtree cost
+    cost = np.empty((tree.node_count, alphas.shape[0]))
+    collapsed = np.zeros((tree.node_count, alphas.shape[0]), dtype=bool)
+    for nodes in reversed(levels):
+        own = risk[nodes][:, None] + alphas[None, :]
+        is_leaf = left[nodes] < 0
+        cost[nodes[is_leaf]] = own[is_leaf]
+
+        internal = nodes[~is_leaf]
+        subtree = cost[left[internal]] + cost[right[internal]]
+        collapsed[internal] = own[~is_leaf] <= subtree
+        cost[internal] = np.minimum(own[~is_leaf], subtree)
+
+    # top-down: nodes under a collapsed node fall into it
+    representative = np.empty((tree.node_count, alphas.shape[0]), dtype=np.int64)
+    representative[0] = 0
+    for nodes in levels[:-1]:
+        internal = nodes[left[nodes] >= 0]
+        parent = representative[internal]
+        inherit = (parent != internal[:, None]) | collapsed[internal]
+        for children in (left[internal], right[internal]):
+            representative[children] = np.where(inherit, parent, children[:, None])
+
+    node_ids = np.arange(tree.node_count)[:, None]
+    is_pruned_leaf = (left < 0)[:, None] | collapsed
+    n_leaves = ((representative == node_ids) & is_pruned_leaf).sum(axis=0)
+
+    return representative, n_leaves
@@ -0,0 +1,90 @@
+from enum import Enum
+
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.svm import SVC, SVR
+from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
+
+try:
+    from sklearn.ensemble import HistGradientBoostingClassifier, HistGradientBoostingRegressor
+except ImportError:
+    # experimental before scikit-learn 1.0
+    from sklearn.experimental import enable_hist_gradient_boosting  # noqa: F401
+    from sklearn.ensemble import HistGradientBoostingClassifier, HistGradientBoostingRegressor
+
+from core.utils.type_collection import EstimatorTypes
+
+
+# (classifier, regressor) of each estimator type, None if not applicable
+ESTIMATORS = {
+    EstimatorTypes.DecisionTree.value: (DecisionTreeClassifier, DecisionTreeRegressor),
+    EstimatorTypes.RandomForest.value: (RandomForestClassifier, RandomForestRegressor),
+    EstimatorTypes.SVM.value: (SVC, SVR),
+    EstimatorTypes.LogisticRegression.value: (LogisticRegression, None),
+    EstimatorTypes.LinearRegreesion.value: (None, LinearRegression),
+    EstimatorTypes.HistGradientBoosting.value: (
+        HistGradientBoostingClassifier,
+        HistGradientBoostingRegressor,
+    ),
+}
+
+# parameters needed for the estimator to work in this pipeline(e.g. predict_proba)
+DEFAULT_PARAMS = {
+    SVC: dict(probability=True),
+    LogisticRegression: dict(max_iter=1000),
+}
+
+
+def make_estimator(name: str, problem_type: str, random_state=42, **kwargs):
+    """
+    Make an unfitted sklearn estimator of the estimator type.
+
+    Args
+    ------
+    name: str or Enum object, type of estimator which is one of EstimatorTypes
+    problem_type: str, problem type which is one of 'binary', 'multiclass', 'regression'
+    random_state: int, used if the estimator takes it
+    **kwargs: Parameters of the estimator
+    """
+    if isinstance(name, Enum):
+        name = name.value
+    if name not in ESTIMATORS:
+        raise NotImplementedError(f"estimator '{name}' is not supported")
+
+    classifier, regressor = ESTIMATORS[name]
+    estimator_class = regressor if problem_type == "regression" else classifier
+    if estimator_class is None:
+        raise ValueError(f"estimator '{name}' can not be used for {problem_type}")
+
+    params = dict(DEFAULT_PARAMS.get(estimator_class, dict()))
+    if "random_state" in estimator_class().get_params():
+        params["random_state"] = random_state
+    params.update(kwargs)
+
+    return estimator_class(**params)
+
+
+def parse_estimators(estimator) -> list:
+    """
+    Parse estimator types given as an Enum, a name, comma-separated names or a list of them.
+    """
+    if isinstance(estimator, (list, tuple)):
+        names = list(estimator)
+    elif isinstance(estimator, Enum):
+        names = [estimator]
+    else:
+        names = estimator.split(",")
+    return [n.value if isinstance(n, Enum) else n.strip() for n in names]
+
+
+def get_type_name(estimator) -> str:
+    """
+    Return the estimator type of the sklearn estimator, None if it is not in the zoo.
+    Ensembles of fold estimators are named after their members.
+    """
+    for name, classes in ESTIMATORS.items():
+        if type(estimator) in classes:
+            return name
+    if hasattr(estimator, "estimators_"):
+        return get_type_name(estimator.estimators_[0])
+    return None
@@ -1 +1,15 @@
-from core.preprocessing import preprocess
\ No newline at end of file
+import importlib
+
+
+# submodules imported on first access(PEP 562)
+_SUBMODULES = ("preprocess",)
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_SUBMODULES))
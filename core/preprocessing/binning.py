@@ -0,0 +1,79 @@
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+# bins of the values, codes 0 to MAX_BINS - 1
+MAX_BINS = 255
+
+# code of the missing values, apart from the bins of the values
+MISSING_BIN = 255
+
+# rows sampled to find the bin edges of each feature
+SUBSAMPLE = 200000
+
+
+def bin_features(
+    data: pd.DataFrame, meta: NamedTuple, max_bins: int = MAX_BINS, random_state=42
+) -> ("data", "meta"):
+    """
+    Quantize every numeric feature of the preprocessed data into at most `max_bins` uint8 bins.
+
+    The bin edges are saved in the meta data, so the data of the test phase is
+    binned identically by the preprocessing pipeline. The target and the codes of
+    the categorical features are left as they are: quantiles of the codes would merge
+    categories which are only adjacent in alphabetical order.
+
+    Args
+    ------
+    data: pandas.core.frame.DataFrame, preprocessed data
+    meta: NamedTuple, meta data
+    max_bins: int, maximum number of bins of a feature, up to MAX_BINS
+    random_state: int, seed of the row sample the edges are found on
+
+    Return
+    ------
+    data: pandas.core.frame.DataFrame, numeric features of uint8 bins, categorical features and the target
+    meta: NamedTuple, meta data with the bin edges of each numeric feature
+    """
+    if not 2 <= max_bins <= MAX_BINS:
+        raise ValueError(f"max_bins should be between 2 and {MAX_BINS}, got {max_bins}")
+
+    rng = np.random.RandomState(random_state)
+    sample = None
+    if data.shape[0] > SUBSAMPLE:
+        sample = rng.choice(data.shape[0], SUBSAMPLE, replace=False)
+
+    bin_edges = dict()
+    for c in data.columns.drop([meta.target] + list(meta.categorical), errors="ignore"):
+        values = data[c].to_numpy(dtype=np.float64)
+        edges = find_bin_edges(values if sample is None else values[sample], max_bins)
+        bin_edges[c] = edges.tolist()
+        data[c] = apply_bin_edges(values, edges)
+
+    return data, meta._replace(bin_edges=bin_edges)
+
+
+def find_bin_edges(values: np.array, max_bins: int = MAX_BINS) -> np.array:
+    """
+    Edges between the bins of the values: midpoints of the distinct values if there are
+    few enough of them, so no two values share a bin, else quantiles of the values.
+    """
+    values = values[~np.isnan(values)]
+    distinct = np.unique(values)
+    if distinct.shape[0] <= max_bins:
+        return (distinct[:-1] + distinct[1:]) / 2
+
+    quantiles = np.percentile(values, np.linspace(0, 100, max_bins + 1)[1:-1])
+    return np.unique(quantiles)
+
+
+def apply_bin_edges(values: np.array, edges: np.array) -> np.array:
+    """
+    Bin of each value, MISSING_BIN for missing values.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    bins = np.searchsorted(edges, values, side="left").astype(np.uint8)
+    bins[np.isnan(values)] = MISSING_BIN
+    return bins
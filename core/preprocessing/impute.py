@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+
+
+# imputation methods of auto_preprocess
+METHODS = ("simple", "knn")
+
+# complete rows sampled as the neighbors of the KNN imputer
+SUBSAMPLE = 1000
+
+# neighbors averaged for a missing value
+N_NEIGHBORS = 5
+
+# rows imputed at once, bounding the distance matrix to BATCH_SIZE x SUBSAMPLE
+BATCH_SIZE = 4096
+
+
+class MissingMask:
+    """
+    Missing value flags of some columns, bit-packed to one bit per value.
+
+    Args
+    ------
+    packed: 2D numpy.ndarray, uint8 flags packed along the rows, one column per column
+    columns: list, flagged columns
+    n_rows: int, number of rows
+    """
+
+    def __init__(self, packed: np.array, columns: list, n_rows: int):
+        self.packed = packed
+        self.columns = list(columns)
+        self.n_rows = n_rows
+
+    @classmethod
+    def from_data(cls, data: pd.DataFrame, columns: list) -> "MissingMask":
+        flags = data[list(columns)].isnull().to_numpy(dtype=bool)
+        return cls(np.packbits(flags, axis=0), columns, data.shape[0])
+
+    def to_array(self) -> np.array:
+        """
+        Flags as a boolean matrix of rows x columns.
+        """
+        return np.unpackbits(self.packed, axis=0, count=self.n_rows).astype(bool)
+
+    def counts(self) -> dict:
+        return dict(zip(self.columns, self.to_array().sum(axis=0).tolist()))
+
+    @property
+    def nbytes(self) -> int:
+        return self.packed.nbytes
+
+
+def fill_missing(data: pd.DataFrame, values: dict) -> pd.DataFrame:
+    """
+    Fill the missing values of the columns in one pass. Values of float columns are cast
+    to the dtype of the column, so float32 columns of the compact load stay so.
+    """
+    values = {
+        c: data[c].dtype.type(v) if data[c].dtype.kind == "f" else v
+        for c, v in values.items()
+    }
+    return data.fillna(values)
+
+
+class KNNImputer:
+    """
+    Impute missing values with the mean of the nearest complete rows of a sample of train.
+
+    Distances are euclidean over the standardized values which are not missing,
+    scaled up by the share of missing ones. Categorical columns take the code
+    of the nearest neighbor instead of the mean. Rows are imputed in batches,
+    so memory is bounded whatever the number of rows.
+
+    Args
+    ------
+    columns: list, columns the imputer was fitted on, in the order of the sample
+    sample: 2D numpy.ndarray, complete rows sampled in train
+    scale: 1D numpy.ndarray, standard deviation of each column in the sample
+    categorical: list, categorical columns among the columns
+    n_neighbors: int, number of neighbors averaged
+    """
+
+    def __init__(
+        self,
+        columns: list,
+        sample: np.array,
+        scale: np.array,
+        categorical: list = None,
+        n_neighbors: int = N_NEIGHBORS,
+    ):
+        self.columns = list(columns)
+        self.sample = np.asarray(sample, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.categorical = list(categorical or list())
+        self.n_neighbors = n_neighbors
+
+    @classmethod
+    def fit(
+        cls,
+        X: np.array,
+        columns: list,
+        categorical: list = None,
+        n_neighbors: int = N_NEIGHBORS,
+        subsample: int = SUBSAMPLE,
+        random_state=42,
+    ) -> "KNNImputer":
+        """
+        Sample the complete rows of X. None if there are fewer complete rows than neighbors.
+        """
+        complete = np.flatnonzero(~np.isnan(X).any(axis=1))
+        if complete.shape[0] < n_neighbors:
+            return None
+        if complete.shape[0] > subsample:
+            rng = np.random.RandomState(random_state)
+            complete = np.sort(rng.choice(complete, subsample, replace=False))
+
+        sample = X[complete]
+        scale = sample.std(axis=0)
+        # constant columns do not move the distance
+        scale[scale == 0] = 1.0
+        return cls(columns, sample, scale, categorical, n_neighbors)
+
+    def transform(self, X: np.array, batch_size: int = BATCH_SIZE) -> np.array:
+        """
+        Impute the missing values of X, whose columns are the ones of the imputer, in place.
+        """
+        rows = np.flatnonzero(np.isnan(X).any(axis=1))
+        categorical = np.isin(self.columns, self.categorical)
+        sample = self.sample / self.scale
+        for start in range(0, rows.shape[0], batch_size):
+            batch = rows[start : start + batch_size]
+            values = X[batch]
+            missing = np.isnan(values)
+
+            scaled = np.where(missing, 0.0, values / self.scale)
+            # squared distance over the observed columns only
+            distance = (
+                (scaled ** 2).sum(axis=1)[:, np.newaxis]
+                - 2 * scaled @ sample.T
+                + ((~missing) @ (sample ** 2).T)
+            )
+            n_observed = (~missing).sum(axis=1)[:, np.newaxis]
+            distance *= len(self.columns) / np.maximum(n_observed, 1)
+
+            k = min(self.n_neighbors, self.sample.shape[0])
+            neighbors = np.argpartition(distance, k - 1, axis=1)[:, :k]
+            imputed = self.sample[neighbors].mean(axis=1)
+            if categorical.any():
+                nearest = distance.argmin(axis=1)
+                imputed[:, categorical] = self.sample[nearest][:, categorical]
+
+            X[batch] = np.where(missing, imputed, values)
+        return X
+
+    def to_dict(self) -> dict:
+        """
+        JSON serializable imputer, kept in the meta data.
+        """
+        return dict(
+            method="knn",
+            columns=self.columns,
+            sample=self.sample.tolist(),
+            scale=self.scale.tolist(),
+            categorical=self.categorical,
+            n_neighbors=self.n_neighbors,
+        )
+
+    @classmethod
+    def from_dict(cls, imputer: dict) -> "KNNImputer":
+        return cls(
+            imputer["columns"],
+            imputer["sample"],
+            imputer["scale"],
+            imputer["categorical"],
+            imputer["n_neighbors"],
+        )
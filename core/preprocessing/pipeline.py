@@ -0,0 +1,159 @@
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from core.preprocessing.binning import apply_bin_edges
+from core.preprocessing.impute import KNNImputer
+
+
+# code given to categories which were not seen in train
+UNSEEN = -1
+
+
+class PreprocessPipeline:
+    """
+    Fitted preprocessing compiled into arrays for inference.
+
+    It keeps the columns selected for train, the imputation value of each of
+    them, the category lookup of each categorical feature and, if the features
+    were binned in train, their bin edges, and applies all of them to a new
+    batch at once. With a KNN imputer, the other columns it was fitted on are
+    encoded and imputed along with the features.
+
+    Args
+    ------
+    features: list, columns used for train, in the order of train
+    fill_values: 1D numpy.ndarray, imputation value of each column(encoded for categorical ones),
+        the features then the other columns of the imputer
+    categories: dict, classes of each categorical column
+    target: str, name of the target column
+    target_classes: 1D numpy.ndarray, classes of the target if it was encoded
+    bin_edges: list, bin edges of each feature(1D numpy.ndarray, None for the features left
+        as they are), None if not binned
+    imputer: KNNImputer, imputer of the missing values fitted in train, None to fill fill_values only
+    """
+
+    def __init__(
+        self,
+        features: list,
+        fill_values: np.array,
+        categories: dict,
+        target: str = None,
+        target_classes: np.array = None,
+        bin_edges: list = None,
+        imputer: KNNImputer = None,
+    ):
+        self.features = list(features)
+        self.columns = _columns(features, imputer)
+        self.fill_values = np.asarray(fill_values, dtype=np.float64)
+        self.categories = categories
+        self.target = target
+        self.target_classes = target_classes
+        self.bin_edges = bin_edges
+        self.imputer = imputer
+        self._indexes = None
+
+    @classmethod
+    def from_meta(cls, meta: NamedTuple, encoder: dict) -> "PreprocessPipeline":
+        """
+        Compile the pipeline from the meta data and the encoders made in train.
+        """
+        encoder = encoder or dict()
+        features = meta.features_for_train or [
+            c for c in meta.stats if c not in meta.dropped_cols
+        ]
+        imputer = KNNImputer.from_dict(meta.imputation) if meta.imputation else None
+        columns = _columns(features, imputer)
+        categories = {
+            c: np.asarray(encoder[c], dtype=object) for c in columns if c in encoder
+        }
+
+        fill_values = np.empty(len(columns), dtype=np.float64)
+        for i, c in enumerate(columns):
+            value = meta.stats[c][0]
+            if c in categories:
+                value = pd.Index(categories[c]).get_indexer([value])[0]
+            fill_values[i] = value
+
+        target_classes = None
+        if meta.target in encoder:
+            target_classes = np.asarray(encoder[meta.target], dtype=object)
+
+        bin_edges = None
+        if meta.bin_edges:
+            bin_edges = [
+                np.asarray(meta.bin_edges[c], dtype=np.float64) if c in meta.bin_edges else None
+                for c in features
+            ]
+
+        return cls(
+            features, fill_values, categories, meta.target, target_classes, bin_edges, imputer
+        )
+
+    def transform(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Select, encode and impute the features of a new batch.
+        Target column is kept(encoded if needed) when the batch has it.
+        """
+        if self._indexes is None:
+            self._indexes = {c: pd.Index(v) for c, v in self.categories.items()}
+
+        X = np.empty((data.shape[0], len(self.columns)), dtype=np.float64)
+
+        numeric = [i for i, c in enumerate(self.columns) if c not in self.categories]
+        if numeric:
+            X[:, numeric] = data[[self.columns[i] for i in numeric]].to_numpy(
+                dtype=np.float64
+            )
+
+        for i, c in enumerate(self.columns):
+            if c in self.categories:
+                X[:, i] = self._encode(data[c], self._indexes[c])
+
+        if self.imputer is not None:
+            order = [self.columns.index(c) for c in self.imputer.columns]
+            X[:, order] = self.imputer.transform(X[:, order])
+        np.copyto(X, self.fill_values, where=np.isnan(X))
+        # the other columns of the imputer are not features
+        X = X[:, : len(self.features)]
+        if self.bin_edges is not None:
+            X = np.column_stack(
+                [
+                    X[:, i] if edges is None else apply_bin_edges(X[:, i], edges)
+                    for i, edges in enumerate(self.bin_edges)
+                ]
+            )
+        result = pd.DataFrame(X, columns=self.features, index=data.index)
+
+        if self.target is not None and self.target in data.columns:
+            if self.target_classes is None:
+                result[self.target] = data[self.target].to_numpy()
+            else:
+                result[self.target] = self._encode(
+                    data[self.target], pd.Index(self.target_classes)
+                )
+
+        return result
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_indexes"] = None
+        return state
+
+    @staticmethod
+    def _encode(column: pd.Series, index: pd.Index) -> np.array:
+        """
+        Map categories to codes: NaN for missing values and UNSEEN for unknown categories.
+        """
+        codes = index.get_indexer(column)
+        codes = np.where(codes < 0, UNSEEN, codes).astype(np.float64)
+        codes[column.isnull().to_numpy()] = np.nan
+        return codes
+
+
+def _columns(features: list, imputer: KNNImputer = None) -> list:
+    # features, then the other columns the imputer was fitted on
+    if imputer is None:
+        return list(features)
+    return list(features) + [c for c in imputer.columns if c not in features]
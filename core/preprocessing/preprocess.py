@@ -4,54 +4,105 @@ from typing import NamedTuple
 
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder, OneHotEncoder
-from sklearn.impute import SimpleImputer
+
+from core.data.profile import profile_columns
+from core.preprocessing.binning import apply_bin_edges
+from core.preprocessing.impute import METHODS, KNNImputer, MissingMask, fill_missing
+from core.preprocessing.pipeline import PreprocessPipeline
+from core.utils.profiler import profile_stage
 
 
 def auto_preprocess(
-    data: pd.DataFrame, meta: NamedTuple, **kwargs
-) -> ("data", "encoder"):
+    data: pd.DataFrame, meta: NamedTuple, impute: str = "simple", **kwargs
+) -> ("data", "meta", "encoder"):
     """
     Preprocess automatically(really naive for now)
     - Drop ID or other unnecessary cols
     - Imputation
     - Encoding
+    - Model-based imputation, if impute is 'knn'
+
+    Args
+    ------
+    data: pandas.core.frame.DataFrame, loaded data
+    meta: NamedTuple, meta data
+    impute: str, 'simple' to fill the median or mode of each column, 'knn' to fill the mean
+        of the nearest complete rows of a sample of the data(see KNNImputer)
 
     Return
     ------
     data: pandas.core.frame.DataFrame, preprocessed data
+    meta: NamedTuple, meta data with the dropped columns and the imputer
     encoder: meta dict for encoders 
     """
+    if impute not in METHODS:
+        raise ValueError(f"impute should be one of {METHODS}, got '{impute}'")
+
     # drop & imputate
-    data, meta = drop_and_impute(data, meta)
+    with profile_stage("drop_and_impute", data) as stage:
+        data, meta, mask = drop_and_impute(data, meta, impute)
+        stage.observe(data)
+
+    with profile_stage("label_encode", data):
+        # encoding for target column if it is string type
+        encoder = dict()
+        if data[meta.target].dtype == np.object:
+            data[meta.target], encoder[meta.target] = label_encode(data[meta.target])
 
-    # encoding for target column if it is string type
-    encoder = dict()
-    if data[meta.target].dtype == np.object:
-        data[meta.target], encoder[meta.target] = label_encode(data[meta.target])
+        # encoding for categorical features, the dropped ones aside
+        for feature in meta.categorical:
+            if feature in data.columns:
+                data[feature], encoder[feature] = label_encode(data[feature])
 
-    # encoding for categorical features
-    for feature in meta.categorical:
-        data[feature], encoder[feature] = label_encode(data[feature])
+    if mask is not None and mask.columns:
+        with profile_stage("knn_impute", data):
+            data, meta = knn_impute(data, meta, mask)
 
-    return data, encoder
+    return data, meta, encoder
 
 
-def make_data_fit(input: "path of data", meta: NamedTuple):
+def knn_impute(data: pd.DataFrame, meta: NamedTuple, mask: MissingMask) -> ("data", "meta"):
+    """
+    Impute again the values flagged in the mask, filled by drop_and_impute, with a KNNImputer
+    fitted on the encoded features. The imputer is kept in the meta data for the test phase.
     """
-    Make input data right depending on the meta data to test in proper condition
+    columns = list(data.columns.drop(meta.target))
+    X = data[columns].to_numpy(dtype=np.float64)
+    positions = [columns.index(c) for c in mask.columns]
+    X[:, positions] = np.where(mask.to_array(), np.nan, X[:, positions])
+
+    categorical = [c for c in meta.categorical if c in columns]
+    imputer = KNNImputer.fit(X, columns, categorical=categorical)
+    # too few complete rows, the values stay filled with the median or mode
+    if imputer is None:
+        return data, meta
+
+    X = imputer.transform(X)
+    for c, i in zip(mask.columns, positions):
+        data[c] = X[:, i].astype(data[c].dtype)
+    return data, meta._replace(imputation=imputer.to_dict())
+
+
+def make_data_fit(
+    input: "path of data", meta: NamedTuple, pipeline: PreprocessPipeline = None
+):
+    """
+    Make input data right depending on the meta data to test in proper condition.
+    If the pipeline is given, it is applied directly and no meta file is touched.
     """
     # load data
     data = pd.read_csv(input)
 
+    if pipeline is not None:
+        return pipeline.transform(data)
+
     # drop
     if meta.dropped_cols:
         data = data.drop(meta.dropped_cols, axis=1)
 
     # imputation
     to_impute = _get_feature_status(data, meta.target)['impute']
-    for imp in to_impute:
-        data.loc[data[imp].isnull(), imp] = meta.stats[imp][0]
+    data = fill_missing(data, {imp: meta.stats[imp][0] for imp in to_impute})
 
     # feature selection phase
     if meta.features_for_train:
@@ -65,14 +116,15 @@ def make_data_fit(input: "path of data", meta: NamedTuple):
     with open(encoder_path, "r") as json_file:
         encoder_dict = json.load(json_file)
 
-    if encoder_dict:
-        for k in list(encoder_dict.keys()):
-            encoder = LabelEncoder()
-            encoder.classes_ = encoder_dict[k]
-            try:
-                data.loc[:, k] = encoder.transform(data.loc[:, k])
-            except:
-                pass
+    # categories not seen in train get the reserved UNSEEN code
+    for k, classes in encoder_dict.items():
+        if k in data.columns:
+            data[k] = PreprocessPipeline._encode(data[k], pd.Index(classes))
+
+    # binning phase, with the edges found in train
+    for k, edges in (meta.bin_edges or dict()).items():
+        if k in data.columns:
+            data[k] = apply_bin_edges(data[k], np.asarray(edges, dtype=np.float64))
 
     # remove unzipped files
     os.remove(meta.encoder_path)
@@ -80,40 +132,80 @@ def make_data_fit(input: "path of data", meta: NamedTuple):
     return data
 
 
-def drop_and_impute(data, meta):
-    status = _get_feature_status(data, meta.target)
-    for imp in status['impute']:
-        data.loc[data[imp].isnull(), imp] = meta.stats[imp][0]
+def drop_and_impute(data, meta, impute: str = "simple") -> ("data", "meta", "mask"):
+    """
+    Drop the ID columns and the ones missing more than half of their values, and fill
+    the others with their median or mode, all in one pass.
+
+    Args
+    ------
+    data: pandas.core.frame.DataFrame, loaded data
+    meta: NamedTuple, meta data
+    impute: str, 'knn' to also flag the values filled, to be imputed again by knn_impute
+
+    Return
+    ------
+    data: pandas.core.frame.DataFrame, data without missing values
+    meta: NamedTuple, meta data with the dropped columns
+    mask: MissingMask, values filled, bit-packed, None unless impute is 'knn'
+    """
+    status = _get_feature_status(data, meta.target, profile=meta.profile)
     if status['drop']:
         data = data.drop(status['drop'], axis=1)
-        meta = meta._replace(dropped_cols=meta.dropped_cols+dropped_cols)
-    return data, meta
+        meta = meta._replace(dropped_cols=meta.dropped_cols + status['drop'])
+
+    to_impute = [c for c in status['impute'] if c in data.columns]
+    mask = MissingMask.from_data(data, to_impute) if impute == "knn" else None
+    data = fill_missing(data, {c: meta.stats[c][0] for c in to_impute})
+    return data, meta, mask
 
 
 def label_encode(column: pd.Series):
+    """
+    Encode the column into codes of its sorted classes, returned as an array. Categoricals
+    of the compact load keep their small integer codes, which are the ones LabelEncoder
+    would give.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        column = column.cat.remove_unused_categories()
+        return column.cat.codes.to_numpy(), column.cat.categories.to_numpy()
+
+    from sklearn.preprocessing import LabelEncoder
+
     encoder = LabelEncoder()
     transformed_col = encoder.fit_transform(column)
-    return transformed_col, encoder.classes_.tolist()
+    return transformed_col, encoder.classes_
 
 
 def onehot_encode(column: pd.Series):
     raise NotImplementedError()
 
 
-def _get_feature_status(data: pd.DataFrame, target: str) -> 'status dict':
-    
-    missing_rates = data.isnull().sum() / data.shape[0]
+def _get_feature_status(
+    data: pd.DataFrame, target: str, profile: dict = None
+) -> 'status dict':
+    """
+    Decide columns to impute and to drop. The profile computed at load time is
+    reused if given, so the data does not have to be scanned again.
+    """
+    if profile is None:
+        profile = profile_columns(data)
+    missing_rates = pd.Series(profile["missing_rate"]).reindex(data.columns)
 
     to_impute = list(missing_rates[(0 < missing_rates) & (missing_rates <= 0.5)].index)
     to_drop = list(missing_rates[0.5 < missing_rates].index)
     status = dict(impute=to_impute, drop=to_drop)
 
-    id_cols = _infer_id_cols(data, target)
+    id_cols = _infer_id_cols(data, target, profile)
     status['drop'].extend(id_cols)
     
     return status
 
 
-def _infer_id_cols(data: pd.DataFrame, target: str) -> 'ID cols list':
-    nrow = data.drop(target, axis=1).nunique()
+def _infer_id_cols(data: pd.DataFrame, target: str, profile: dict = None) -> 'ID cols list':
+    if profile is not None and "n_unique" in profile:
+        nrow = pd.Series(profile["n_unique"]).reindex(data.columns)
+    else:
+        nrow = data.nunique()
+    nrow = nrow.drop(target, errors="ignore")
     return list(nrow[nrow == data.shape[0]].index)
\ No newline at end of file
@@ -0,0 +1,130 @@
+import numpy as np
+
+
+# batches up to this many rows are routed row by row
+SMALL_BATCH = 16
+
+
+class CompiledTree:
+    """
+    Fitted decision tree flattened into arrays, scored without sklearn.
+
+    Rows are routed down all the levels of the tree at once, comparing the
+    feature cast to float32 with the threshold by '<=' like sklearn does, so
+    the predictions are identical to the ones of the fitted tree.
+
+    Args
+    ------
+    feature: 1D numpy.ndarray, feature index of each node(-2 for leaves)
+    threshold: 1D numpy.ndarray, split threshold of each node
+    left: 1D numpy.ndarray, left child of each node(-1 for leaves)
+    right: 1D numpy.ndarray, right child of each node(-1 for leaves)
+    value: 2D numpy.ndarray, class probabilities(classifier) or prediction(regressor) of each node
+    classes: 1D numpy.ndarray, class labels(classifier only)
+    max_depth: int, depth of the tree
+    """
+
+    def __init__(self, feature, threshold, left, right, value, classes=None, max_depth=None):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.classes_ = None if classes is None else np.asarray(classes)
+        self.max_depth = int(max_depth) if max_depth is not None else self._depth()
+        self.n_features = int(self.feature.max()) + 1 if (self.feature >= 0).any() else 0
+        self._children = None
+        self._lists = None
+
+    @classmethod
+    def from_estimator(cls, estimator) -> "CompiledTree":
+        """
+        Flatten a fitted DecisionTreeClassifier or DecisionTreeRegressor.
+        """
+        tree = estimator.tree_
+        if tree.n_outputs != 1:
+            raise ValueError("only trees of a single output can be compiled")
+
+        value = tree.value[:, 0, :]
+        classes = getattr(estimator, "classes_", None)
+        if classes is not None:
+            # probabilities normalized the same way as predict_proba
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            value = value / normalizer
+
+        return cls(
+            feature=tree.feature,
+            threshold=tree.threshold,
+            left=tree.children_left,
+            right=tree.children_right,
+            value=value,
+            classes=classes,
+            max_depth=tree.max_depth,
+        )
+
+    def apply(self, X: np.array) -> np.array:
+        """
+        Leaf of each row.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        if X.shape[0] <= SMALL_BATCH:
+            return np.array([self._apply_row(row) for row in X.tolist()], dtype=np.int64)
+
+        if self._children is None:
+            self._children = np.stack([self.left, self.right]).astype(np.int64)
+
+        # rows reaching a leaf leave the active set, so each level only visits deeper rows
+        flat = np.ascontiguousarray(X).ravel()
+        n_features = X.shape[1]
+        leaf = np.empty(X.shape[0], dtype=np.int64)
+        active = np.arange(X.shape[0])
+        node = np.zeros(X.shape[0], dtype=np.int64)
+        while active.shape[0]:
+            feature = self.feature[node]
+            is_leaf = feature < 0
+            if is_leaf.any():
+                leaf[active[is_leaf]] = node[is_leaf]
+                keep = ~is_leaf
+                active, node, feature = active[keep], node[keep], feature[keep]
+            go_right = ~(flat[active * n_features + feature] <= self.threshold[node])
+            node = self._children[go_right.view(np.int8), node]
+        return leaf
+
+    def _apply_row(self, row: list) -> int:
+        if self._lists is None:
+            # python scalars are faster to walk than arrays for a few rows
+            self._lists = (
+                self.feature.tolist(),
+                self.threshold.tolist(),
+                self.left.tolist(),
+                self.right.tolist(),
+            )
+        feature, threshold, left, right = self._lists
+        node = 0
+        while feature[node] >= 0:
+            node = left[node] if row[feature[node]] <= threshold[node] else right[node]
+        return node
+
+    @property
+    def is_classifier(self) -> bool:
+        return self.classes_ is not None
+
+    def predict_proba(self, X: np.array) -> np.array:
+        if not self.is_classifier:
+            raise ValueError("predict_proba is not available for regression trees")
+        return self.value[self.apply(X)]
+
+    def predict(self, X: np.array) -> np.array:
+        if not self.is_classifier:
+            return self.value[self.apply(X), 0]
+        return self.classes_[self.value[self.apply(X)].argmax(axis=1)]
+
+    def _depth(self) -> int:
+        depth = np.zeros(self.left.shape[0], dtype=np.int64)
+        for node in range(self.left.shape[0]):
+            if self.left[node] >= 0:
+                depth[self.left[node]] = depth[self.right[node]] = depth[node] + 1
+        return int(depth.max()) if depth.shape[0] else 0
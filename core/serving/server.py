@@ -0,0 +1,243 @@
+import io
+import os
+import json
+import time
+import queue
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import numpy as np
+import pandas as pd
+
+from core.models.artifact import SUFFIX as ARTIFACT_SUFFIX
+from core.models.registry import Artifact, get_artifact
+
+
+class MicroBatcher:
+    """
+    Score requests of one artifact in micro-batches.
+
+    Requests which arrive within `max_wait` seconds of the first one in a batch
+    are concatenated and scored with a single vectorized `predict_proba` call.
+
+    Args
+    ------
+    artifact: Artifact, trained artifact to score with
+    max_wait: float, seconds to wait for more requests before scoring a batch
+    max_rows: int, maximum number of rows in a batch
+    """
+
+    def __init__(self, artifact: Artifact, max_wait: float = 0.005, max_rows: int = 65536):
+        self.artifact = artifact
+        self.max_wait = max_wait
+        self.max_rows = max_rows
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def predict(self, data: pd.DataFrame) -> dict:
+        """
+        Score the rows and block until the result of its batch is ready.
+        """
+        # the other columns of the imputer are needed too
+        missing = [c for c in self.artifact.pipeline.columns if c not in data.columns]
+        if missing:
+            raise ValueError(f"missing columns: {missing}")
+
+        request = _Request(data)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            rows = batch[0].data.shape[0]
+            deadline = time.perf_counter() + self.max_wait
+            while rows < self.max_rows:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                rows += request.data.shape[0]
+            self._score(batch)
+
+    def _score(self, batch: list):
+        try:
+            pipeline = self.artifact.pipeline
+            # flattened tree skips the input validation of sklearn on every batch
+            compiled = self.artifact.compiled
+            estimator = compiled or self.artifact.estimator
+            data = pd.concat([r.data for r in batch], ignore_index=True)
+            X = pipeline.transform(data)[pipeline.features].to_numpy()
+
+            if compiled is not None:
+                is_classifier = compiled.is_classifier
+            else:
+                is_classifier = hasattr(estimator, "predict_proba")
+
+            if is_classifier:
+                probability = estimator.predict_proba(X)
+                prediction = estimator.classes_[probability.argmax(axis=1)]
+            else:
+                probability = None
+                prediction = estimator.predict(X)
+
+            if pipeline.target_classes is not None:
+                prediction = pipeline.target_classes[prediction.astype(np.int64)]
+
+            start = 0
+            for r in batch:
+                stop = start + r.data.shape[0]
+                r.result = dict(prediction=prediction[start:stop].tolist())
+                if probability is not None:
+                    r.result["probability"] = probability[start:stop].tolist()
+                start = stop
+
+        except Exception as e:
+            for r in batch:
+                r.error = e
+
+        finally:
+            for r in batch:
+                r.done.set()
+
+
+class _Request:
+    def __init__(self, data: pd.DataFrame):
+        self.data = data
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class ScoringServer(socketserver.ThreadingMixIn, HTTPServer):
+    """
+    HTTP server which scores rows with the artifacts loaded on start.
+
+    Endpoints
+    ------
+    GET /health: names of the loaded artifacts
+    POST /predict/<name>: score rows with the artifact named <name>. Body is either
+        json({"rows": [{column: value}, ...]} or {"columns": [...], "data": [[...]]})
+        or csv with a header(Content-Type: text/csv). <name> can be omitted if
+        only one artifact is loaded.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple, batchers: dict):
+        super().__init__(address, _ScoringHandler)
+        self.batchers = batchers
+
+
+class _ScoringHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") == "/health":
+            self._send(200, dict(models=sorted(self.server.batchers)))
+        else:
+            self._send(404, dict(error=f"unknown path '{self.path}'"))
+
+    def do_POST(self):
+        start = time.perf_counter()
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        if not parts or parts[0] != "predict":
+            self._send(404, dict(error=f"unknown path '{self.path}'"))
+            return
+
+        batchers = self.server.batchers
+        if len(parts) > 1:
+            name = parts[1]
+        elif len(batchers) == 1:
+            name = next(iter(batchers))
+        else:
+            self._send(400, dict(error="model name is required"))
+            return
+        if name not in batchers:
+            self._send(404, dict(error=f"unknown model '{name}'"))
+            return
+
+        try:
+            data = self._read_rows()
+            result = batchers[name].predict(data)
+        except ValueError as e:
+            self._send(400, dict(error=str(e)))
+            return
+        except Exception as e:
+            self._send(500, dict(error=str(e)))
+            return
+
+        result["latency_ms"] = (time.perf_counter() - start) * 1000
+        self._send(200, result)
+
+    def _read_rows(self) -> pd.DataFrame:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if "csv" in self.headers.get("Content-Type", ""):
+            return pd.read_csv(io.BytesIO(body))
+
+        payload = json.loads(body)
+        if isinstance(payload, list):
+            return pd.DataFrame(payload)
+        if "rows" in payload:
+            return pd.DataFrame(payload["rows"])
+        return pd.DataFrame(payload["data"], columns=payload["columns"])
+
+    def _send(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(
+    meta_paths: list, host: str = "127.0.0.1", port: int = 8000, max_wait_ms: float = 5
+) -> ScoringServer:
+    """
+    Load the artifacts once and make a scoring server for them.
+
+    Args
+    ------
+    meta_paths: list, paths of artifacts made by the train phase
+    host: str, host to bind
+    port: int, port to bind(0 for any free port)
+    max_wait_ms: float, milliseconds to wait for more requests to batch together
+    """
+    batchers = dict()
+    for path in meta_paths:
+        name = os.path.basename(os.path.normpath(path))
+        for suffix in (".zip", ARTIFACT_SUFFIX):
+            if name.endswith(suffix):
+                name = name[: -len(suffix)]
+        batchers[name] = MicroBatcher(get_artifact(path), max_wait=max_wait_ms / 1000)
+
+    return ScoringServer((host, port), batchers)
+
+
+def serve(
+    meta_paths: list, host: str = "127.0.0.1", port: int = 8000, max_wait_ms: float = 5
+):
+    """
+    Serve the artifacts until interrupted.
+    """
+    server = make_server(meta_paths, host=host, port=port, max_wait_ms=max_wait_ms)
+    print(
+        f"Serving {sorted(server.batchers)} on http://{host}:{server.server_address[1]}"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,107 @@
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from core.utils.profiler import bind_stages
+
+
+# writers entered and not exited yet, the last one takes the writes
+_ACTIVE = list()
+
+
+class AsyncWriter:
+    """
+    Background threads writing reports and artifacts while the next stage computes.
+
+    Writes are submitted with `submit` or `write_async` anywhere in the package
+    while the writer is entered, and start in the order they were submitted.
+    `flush` waits for all of them and raises the first error of a write, so a
+    failed write is never silent. Exiting the writer flushes it.
+
+    The data handed to a write must not be modified afterwards, since it is
+    read on another thread.
+
+    Args
+    ------
+    max_workers: int, number of writes run at once
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self.elapsed = dict()
+        self._futures = list()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def __enter__(self):
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="writer")
+        _ACTIVE.append(self)
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        _ACTIVE.remove(self)
+        try:
+            # an error of the body is not hidden by the ones of the writes
+            self.flush(raise_error=exc_type is None)
+        finally:
+            self._executor.shutdown()
+            self._executor = None
+
+    def submit(self, name: str, func, *args, **kwargs) -> Future:
+        """
+        Run func(*args, **kwargs) in the background. Stages it profiles nest under the
+        stages open when it was submitted.
+        """
+        func = bind_stages(func)
+
+        def write():
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.elapsed[name] = self.elapsed.get(name, 0.0) + time.perf_counter() - start
+
+        future = self._executor.submit(write)
+        future.name = name
+        with self._lock:
+            self._futures.append(future)
+        return future
+
+    def flush(self, raise_error: bool = True):
+        """
+        Wait for every write submitted so far, raising the first error.
+        """
+        with self._lock:
+            futures, self._futures = self._futures, list()
+
+        errors = list()
+        for future in futures:
+            error = future.exception()
+            if error is not None:
+                errors.append((future.name, error))
+        for name, error in errors[1:] if raise_error else errors:
+            print(f"Error: writing '{name}' failed: {error!r}")
+        if errors and raise_error:
+            raise errors[0][1]
+
+
+def active_writer() -> AsyncWriter:
+    """
+    Writer entered last, None if there is none.
+    """
+    return _ACTIVE[-1] if _ACTIVE else None
+
+
+def write_async(name: str, func, *args, **kwargs) -> Future:
+    """
+    Run the write in the background on the active writer. Without one, it is run right
+    away, raising its error if any, and its result returned as a finished future.
+    """
+    writer = active_writer()
+    if writer is not None:
+        return writer.submit(name, func, *args, **kwargs)
+
+    future = Future()
+    future.set_result(func(*args, **kwargs))
+    return future
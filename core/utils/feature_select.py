@@ -1,12 +1,16 @@
 import numpy as np
 import pandas as pd
 
+from joblib import Parallel, delayed, effective_n_jobs
 from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
 from sklearn.inspection import permutation_importance
+from sklearn.model_selection import train_test_split
+
+from core.utils.profiler import profile_stage
 
 
 def select_feature(
-    X, y, problem_type, estimator="dt", method="permutation", random_state=42
+    X, y, problem_type, estimator="dt", method="sequential", random_state=42
 ):
     """
     Select features using several selection methods.
@@ -16,25 +20,39 @@ def select_feature(
     X: pandas.core.frame.DataFrame
     y: pandas.core.series.Series
     problem_type: str, problem type which is one of 'binary', 'multiclass', 'regression'
+    method: str, 'sequential' for permutation importance on a row sample with early
+        rejection of useless features, 'permutation' for permutation importance on all rows
 
     Return
     ------
     essence_feature: list, selected feature(s)
     """
-    if method == "permutation":
-        importances = get_permutation_importance(
-            X,
-            y,
-            problem_type=problem_type,
-            estimator="dt",
-            n_repeats=5,
-            n_jobs=-1,
-            random_state=random_state,
-        )
-        threshold = np.percentile(importances, 50, interpolation="nearest")
-        essence_feature = list(X.columns[np.where(importances > threshold)[0]])
-    else:
-        raise NotImplementedError()
+    with profile_stage("select_feature", X):
+        if method == "sequential":
+            importances, _ = get_sequential_importance(
+                X,
+                y,
+                problem_type=problem_type,
+                n_repeats=5,
+                n_jobs=-1,
+                random_state=random_state,
+            )
+            threshold = np.percentile(importances, 50, interpolation="nearest")
+            essence_feature = list(X.columns[np.where(importances > threshold)[0]])
+        elif method == "permutation":
+            importances = get_permutation_importance(
+                X,
+                y,
+                problem_type=problem_type,
+                estimator="dt",
+                n_repeats=5,
+                n_jobs=-1,
+                random_state=random_state,
+            )
+            threshold = np.percentile(importances, 50, interpolation="nearest")
+            essence_feature = list(X.columns[np.where(importances > threshold)[0]])
+        else:
+            raise NotImplementedError()
 
     return essence_feature
 
@@ -59,9 +77,14 @@ def get_permutation_importance(
         calculator = DecisionTreeRegressor(random_state=random_state).fit(X, y)
     else:
         calculator = DecisionTreeClassifier(random_state=random_state).fit(X, y)
-    importances = permutation_importance(estimator=calculator, X=X, y=y, n_jobs=-1)[
-        "importances_mean"
-    ]
+    importances = permutation_importance(
+        estimator=calculator,
+        X=X,
+        y=y,
+        n_repeats=n_repeats,
+        n_jobs=n_jobs,
+        random_state=random_state,
+    )["importances_mean"]
 
     # normalize
     importances = (importances - importances.min()) / (
@@ -69,3 +92,110 @@ def get_permutation_importance(
     )
 
     return importances
+
+
+def get_sequential_importance(
+    X: pd.DataFrame,
+    y: pd.Series,
+    problem_type: str,
+    n_repeats: int = 5,
+    n_jobs=-1,
+    sample_size: int = 10000,
+    z: float = 2.0,
+    random_state=42,
+) -> ("importances", "elapsed time of each stage"):
+    """
+    Calculate permutation importance on a row sample, rejecting useless features early.
+
+    Every feature is permuted once per round. From the second round on, features
+    whose upper confidence bound of the mean score drop(mean + z * standard error)
+    is not above zero are rejected and not permuted anymore.
+
+    Args
+    ------
+    X: pandas.core.frame.DataFrame or 2D numpy.ndarray
+    y: pandas.core.series.Series or 1D numpy.ndarray
+    problem_type: str, problem type which is one of 'binary', 'multiclass', 'regression'
+    n_repeats: int, maximum number of permutation for each feature
+    n_jobs: int, number of threads for parallel processing
+    sample_size: int, number of rows sampled(stratified for classification)
+    z: float, width of the confidence bound used to reject features
+    random_state: int, seed of the sampling and of the permutations
+
+    Return
+    ------
+    importances: 1D numpy.ndarray, normalized importance of each feature
+    elapsed: dict, seconds spent on each stage
+    """
+    elapsed = dict()
+
+    with profile_stage("sampling", X) as stage:
+        X, y = np.asarray(X), np.asarray(y)
+        if X.shape[0] > sample_size:
+            stratify = None
+            # a class with a single row can not be split
+            if problem_type != "regression" and np.unique(y, return_counts=True)[1].min() >= 2:
+                stratify = y
+            X, _, y, _ = train_test_split(
+                X, y, train_size=sample_size, stratify=stratify, random_state=random_state
+            )
+        stage.observe(X)
+    elapsed["sampling"] = stage.seconds
+
+    with profile_stage("fit", X) as stage:
+        if problem_type == "regression":
+            calculator = DecisionTreeRegressor(random_state=random_state).fit(X, y)
+        else:
+            calculator = DecisionTreeClassifier(random_state=random_state).fit(X, y)
+        baseline = calculator.score(X, y)
+    elapsed["fit"] = stage.seconds
+
+    with profile_stage("permutation", X) as stage:
+        n_features = X.shape[1]
+        drops = np.full((n_features, n_repeats), np.nan)
+        remaining = np.arange(n_features)
+        # one copy of the sample per worker, whose columns are permuted in place
+        n_workers = max(min(effective_n_jobs(n_jobs), n_features), 1)
+        buffers = [X.copy() for _ in range(n_workers)]
+        for round_ in range(n_repeats):
+            chunks = np.array_split(remaining, n_workers)
+            drops[remaining, round_] = np.concatenate(
+                Parallel(n_jobs=n_workers, prefer="threads")(
+                    delayed(_score_drops)(
+                        calculator, buffer, y, baseline, chunk, random_state + round_ * n_features + chunk
+                    )
+                    for buffer, chunk in zip(buffers, chunks)
+                )
+            )
+
+            if round_ > 0:
+                observed = drops[remaining, : round_ + 1]
+                upper = observed.mean(axis=1) + z * observed.std(axis=1, ddof=1) / np.sqrt(round_ + 1)
+                remaining = remaining[upper > 0]
+            if remaining.shape[0] == 0:
+                break
+    elapsed["permutation"] = stage.seconds
+
+    importances = np.nanmean(drops, axis=1)
+
+    # normalize
+    span = importances.max() - importances.min()
+    importances = (importances - importances.min()) / (span if span > 0 else 1)
+
+    return importances, elapsed
+
+
+def _score_drops(estimator, X, y, baseline, columns, seeds) -> np.array:
+    """
+    Score drop of permuting each of the columns, one at a time in place in X,
+    which is left as it was.
+    """
+    drops = np.empty(len(columns))
+    for i, (column, seed) in enumerate(zip(columns, seeds)):
+        original = X[:, column].copy()
+        X[:, column] = np.random.RandomState(seed).permutation(original)
+        try:
+            drops[i] = baseline - estimator.score(X, y)
+        finally:
+            X[:, column] = original
+    return drops
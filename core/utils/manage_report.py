@@ -2,14 +2,25 @@ import os
 import glob
 import json
 import zipfile
+import time
+from concurrent.futures import Future, wait
 from datetime import datetime
 from typing import NamedTuple
 
 import pandas as pd
 import joblib
 
-from core.evaluation.evaluate import MeasuringTool, evaluate_cv
+from core.evaluation.evaluate import MeasuringTool
+from core.evaluation.metrics import StreamingMetrics
 from core.data.load import Meta
+from core.preprocessing.pipeline import PreprocessPipeline
+from core.models.artifact import SUFFIX as ARTIFACT_SUFFIX, is_artifact, save_artifact
+from core.models.inference import ParallelPredictor, predict_with_probability
+from core.models.registry import load_artifact, resolve_artifact_path
+from core.serving.compiled import CompiledTree
+from core.utils.async_writer import write_async
+from core.utils.report_backend import is_report_file, make_backend
+from core.utils.profiler import active_profiler, profile_stage
 
 
 def export_train_report(
@@ -21,6 +32,9 @@ def export_train_report(
     file_id: "ID used to save the outputs",
     save_path: str,
     encoder: dict = None,
+    extra_reports: dict = None,
+    refit: str = "parallel",
+    report_format: str = "csv",
 ) -> "saved path":
     """
     Export report after train.
@@ -34,43 +48,38 @@ def export_train_report(
     file_id: str, ID used to save the outputs
     save_path: str, path to save
     enoder: dict, encoders used to encode categorical features
+    extra_reports: dict, additional sheets to write(sheet name: pandas.core.frame.DataFrame)
+    refit: str, 'parallel' to fit the final model on all rows alongside the CV folds,
+        'ensemble' to make it of the fold models
+    report_format: str, one of REPORT_FORMATS. 'csv' and 'parquet' write the report as a JSON
+        summary, 'excel' renders it as a workbook
     """
+    # sklearn model selection is only needed in train, so the test startup skips it
+    from core.evaluation.cv import cross_validate_once
+
     model_report = pd.Series(estimator.get_params()).to_frame("Value")
     model_report.index.name = f"Params"
 
-    report = evaluate_cv(estimator, X, y, cv)
+    # each fold is fitted once, and every metric comes from its cached predictions
+    with profile_stage("cross_validate", X) as stage:
+        cv_result = cross_validate_once(estimator, X.values, y.values, cv, refit=refit)
+    fit_time = stage.seconds
 
-    train_report = pd.DataFrame(
-        dict(
-            Accuracy=report["train_accuracy"],
-            Precision=report["train_precision"],
-            Recall=report["train_recall"],
-            F1=report["train_f1"],
-        )
-    )
     train_report = pd.concat(
         [
-            train_report,
-            train_report.mean().to_frame("AVG").T,
-            train_report.std().to_frame("STD").T,
+            cv_result.train_scores,
+            cv_result.train_scores.mean().to_frame("AVG").T,
+            cv_result.train_scores.std().to_frame("STD").T,
         ],
         axis=0,
     )
     train_report.index.name = f"K={cv}"
 
-    valid_report = pd.DataFrame(
-        dict(
-            Accuracy=report["test_accuracy"],
-            Precision=report["test_precision"],
-            Recall=report["test_recall"],
-            F1=report["test_f1"],
-        )
-    )
     valid_report = pd.concat(
         [
-            valid_report,
-            valid_report.mean().to_frame("AVG").T,
-            valid_report.std().to_frame("STD").T,
+            cv_result.valid_scores,
+            cv_result.valid_scores.mean().to_frame("AVG").T,
+            cv_result.valid_scores.std().to_frame("STD").T,
         ],
         axis=0,
     )
@@ -82,27 +91,121 @@ def export_train_report(
 
     folder_path = os.path.join(save_path, f"{estimator_name}_{file_id}")
     create_folder(folder_path)
-    writer = pd.ExcelWriter(
-        os.path.join(folder_path, f"dt_report_{file_id}.xlsx")
-    )  # pylint: disable=abstract-class-instantiated
-    train_report.to_excel(writer, sheet_name="Train Result")
-    valid_report.to_excel(writer, sheet_name="Validation Result")
-    model_report.to_excel(writer, sheet_name="Model Setting")
-    feature_report.to_excel(writer, sheet_name="Features for Train")
-
-    writer.save()
-
-    estimator.fit(X.values, y)
-    joblib.dump(estimator, os.path.join(folder_path, f"dt_model_{file_id}.pkl"))
-    print(f"Train report has been saved in '{folder_path}'.")
-
-    _export_meta_data(
-        save_path=folder_path,
-        meta=meta,
-        estimator=estimator,
-        file_id=file_id,
-        encoder=encoder,
+    reports = {
+        "Train Result": train_report,
+        "Validation Result": valid_report,
+        "Model Setting": model_report,
+        "Features for Train": feature_report,
+    }
+    reports.update(extra_reports or dict())
+    reports["Elapsed Time"] = _elapsed_report(Fit=fit_time)
+    profile_report = _profile_report()
+    if profile_report is not None:
+        reports["Profile"] = profile_report
+
+    # written in the background if a writer is active, the artifact alongside the report
+    report = write_async(
+        "write_report",
+        _write_report,
+        report_format,
+        folder_path,
+        f"{estimator_name}_report_{file_id}",
+        reports,
     )
+    artifact = _export_artifact(
+        folder_path, cv_result.estimator, meta, file_id, encoder, after=[report]
+    )
+    _print_saved("Train", folder_path, fit_time, report, artifact)
+
+
+def export_retrain_report(
+    X: pd.DataFrame,
+    y: pd.Series,
+    n_rows: int,
+    meta: NamedTuple,
+    estimator: "updated model object",
+    previous_estimator: "model object before the update",
+    previous_features: list,
+    strategy: str,
+    drift: dict,
+    fit_time: float,
+    file_id: str,
+    save_path: str,
+    encoder: dict = None,
+    report_format: str = "csv",
+):
+    """
+    Export report and artifact after an incremental retrain.
+
+    Args
+    ------
+    X: pandas.core.frame.DataFrame, all features of the rows of the new slice held out of the update
+    y: pandas.core.series.Series, target of the rows held out
+    n_rows: int, number of rows of the new slice the model was updated on
+    meta: NamedTuple, merged meta data, with the features for train
+    estimator: sklearn estimator object, updated model
+    previous_estimator: sklearn estimator object, model before the update
+    previous_features: list, features of the model before the update
+    strategy: str, how the model was updated, 'warm_start' or 'refit'
+    drift: dict, population stability index of each column of the new slice
+    fit_time: float, seconds spent updating the model
+    file_id: str, ID used to save the outputs
+    save_path: str, path to save
+    encoder: dict, merged encoders of the categorical features
+    report_format: str, one of REPORT_FORMATS
+    """
+    problem_type = meta.problem_type
+    # both models are scored on rows neither was fitted on
+    evaluation = pd.concat(
+        [
+            _scores(previous_estimator, X.loc[:, previous_features], y, problem_type),
+            _scores(estimator, X.loc[:, meta.features_for_train], y, problem_type),
+        ]
+    )
+    evaluation.index = pd.Index(["Previous", "Updated"], name="Model")
+
+    retrain_report = pd.Series(
+        {
+            "Strategy": strategy,
+            "Rows": n_rows,
+            "Rows Held Out": X.shape[0],
+            "Rows Seen": meta.summary["n_rows"] if meta.summary else n_rows + X.shape[0],
+            "Features Reselected": list(previous_features) != list(meta.features_for_train),
+            "Max Drift": max(drift.values()) if drift else 0.0,
+        }
+    ).to_frame("Value")
+    retrain_report.index.name = "Retrain"
+    drift_report = pd.Series(drift, dtype=float).sort_values(ascending=False).to_frame("PSI")
+    drift_report.index.name = "Column"
+
+    model_report = pd.Series(estimator.get_params()).to_frame("Value")
+    model_report.index.name = "Params"
+
+    estimator_name = get_estimator_name(estimator)
+    folder_path = os.path.join(save_path, f"{estimator_name}_{file_id}")
+    create_folder(folder_path)
+    reports = {
+        "Retrain": retrain_report,
+        "Evaluation": evaluation,
+        "Drift": drift_report,
+        "Model Setting": model_report,
+        "Features for Train": pd.Series(meta.features_for_train).to_frame("Features"),
+        "Elapsed Time": _elapsed_report(Fit=fit_time),
+    }
+    profile_report = _profile_report()
+    if profile_report is not None:
+        reports["Profile"] = profile_report
+
+    report = write_async(
+        "write_report",
+        _write_report,
+        report_format,
+        folder_path,
+        f"{estimator_name}_report_{file_id}",
+        reports,
+    )
+    artifact = _export_artifact(folder_path, estimator, meta, file_id, encoder, after=[report])
+    _print_saved("Retrain", folder_path, fit_time, report, artifact)
 
 
 def export_test_report(
@@ -111,54 +214,217 @@ def export_test_report(
     file_id: str,
     save_path: str,
     target: str,
+    report_format: str = "csv",
+    n_jobs: int = 1,
 ):
-    # data without target
-    if target is None:
-        pred_report = pd.DataFrame(
-            dict(
-                Prediction=estimator.predict(data),
-                Probability=estimator.predict_proba(data)[:, 1],
-            )
-        )
-        pred_report.index.name = "ID"
-
-        folder_path = os.path.join(save_path, f"prediction_{file_id}")
-        create_folder(folder_path)
-        writer = pd.ExcelWriter(
-            os.path.join(folder_path, f"prediction_{file_id}.xlsx")
-        )  # pylint: disable=abstract-class-instantiated
-        pred_report.to_excel(writer, sheet_name="Prediction Result")
+    """
+    Export report after test.
 
-        writer.save()
-        print(f"Test report has been saved in '{folder_path}'.")
+    Args
+    ------
+    estimator: sklearn estimator object, trained model
+    data: pandas.core.frame.DataFrame, transformed data, with the target if it is known
+    file_id: str, ID used to save the outputs
+    save_path: str, path to save
+    target: str, name of the target column
+    report_format: str, one of REPORT_FORMATS. 'csv' and 'parquet' write the predictions in
+        that format with a JSON summary, 'excel' renders both in a workbook
+    n_jobs: int, number of processes scoring the shards of the data, -1 for all cores
+    """
+    start = time.perf_counter()
+    X = data if target is None else data.drop(target, axis=1, errors="ignore")
+    with profile_stage("score", X), ParallelPredictor(estimator, n_jobs=n_jobs) as predictor:
+        prediction, probability = predictor.predict(X.to_numpy())
+    pred_report = _prediction_report(prediction, probability, data.index)
 
+    reports = dict()
     # data with target
-    else:
-        X = data.drop(target, axis=1)
+    if target in data.columns:
         y = data[target]
-        pred_report = pd.DataFrame(
-            dict(
-                Observation=y.values.tolist(),
-                Prediction=estimator.predict(X),
-                Probability=estimator.predict_proba(X)[:, 1],
+        pred_report.insert(0, "Observation", y.to_numpy())
+        reports["Test Result"] = MeasuringTool(
+            y_true=y,
+            y_pred=prediction,
+            probability=probability,
+            classes=getattr(estimator, "classes_", None),
+            problem_type=_problem_type(probability),
+        ).get_scores()
+    scoring_time = time.perf_counter() - start
+
+    folder_path = os.path.join(save_path, f"prediction_{file_id}")
+    create_folder(folder_path)
+    with profile_stage("write_report", pred_report), make_backend(
+        report_format, folder_path, f"prediction_{file_id}"
+    ) as backend:
+        backend.write_table("Prediction Result", pred_report)
+        reports["Elapsed Time"] = _elapsed_report(
+            Scoring=scoring_time, Writing_Predictions=backend.elapsed
+        )
+        profile_report = _profile_report()
+        if profile_report is not None:
+            reports["Profile"] = profile_report
+        backend.write_summary(reports)
+
+    print(f"Test report has been saved in '{folder_path}'.")
+    print(f"Elapsed time - scoring: {scoring_time:.2f}s, report writing: {backend.elapsed:.2f}s")
+
+
+def export_test_report_stream(
+    artifact: NamedTuple,
+    input: str,
+    chunksize: int,
+    file_id: str,
+    save_path: str,
+    report_format: str = "csv",
+    n_jobs: int = 1,
+):
+    """
+    Export report after test, scoring the input chunk by chunk in bounded memory.
+
+    Each chunk is transformed by the compiled pipeline and predicted with one
+    predict_proba call, its predictions are appended to the prediction file and
+    its metrics are merged into running counts.
+
+    Args
+    ------
+    artifact: Artifact, trained model, meta data and compiled pipeline
+    input: str, path of data for test
+    chunksize: int, number of rows scored at once
+    file_id: str, id of the report
+    save_path: str, path to save
+    report_format: str, format of the prediction file, one of 'csv', 'parquet'
+    n_jobs: int, number of processes scoring the shards of each chunk, -1 for all cores
+    """
+    estimator, pipeline, target = artifact.estimator, artifact.pipeline, artifact.meta.target
+    classes = getattr(estimator, "classes_", None)
+    metrics = None
+    scoring_time = 0.0
+
+    folder_path = os.path.join(save_path, f"prediction_{file_id}")
+    create_folder(folder_path)
+    with make_backend(
+        report_format, folder_path, f"prediction_{file_id}"
+    ) as backend, ParallelPredictor(
+        estimator, n_jobs=n_jobs, model_path=artifact.model_path
+    ) as predictor:
+        with profile_stage("score") as stage, backend.sink("Prediction Result") as sink:
+            for chunk in pd.read_csv(input, chunksize=chunksize):
+                start = time.perf_counter()
+                data = pipeline.transform(chunk)
+                prediction, probability = predictor.predict(data[pipeline.features].to_numpy())
+                pred_report = _prediction_report(prediction, probability, chunk.index)
+
+                # data with target
+                if target in data.columns:
+                    y = data[target].to_numpy()
+                    pred_report.insert(0, "Observation", y)
+                    if metrics is None:
+                        metrics = StreamingMetrics(_problem_type(probability), classes)
+                    metrics.update(y, prediction, probability)
+                scoring_time += time.perf_counter() - start
+
+                sink.write(pred_report)
+            stage.rows, stage.cols = sink.n_rows, len(pipeline.features)
+
+        reports = dict()
+        if metrics is not None:
+            reports["Test Result"] = metrics.get_scores()
+        reports["Elapsed Time"] = _elapsed_report(
+            Scoring=scoring_time, Writing_Predictions=sink.elapsed
+        )
+        profile_report = _profile_report()
+        if profile_report is not None:
+            reports["Profile"] = profile_report
+        backend.write_summary(reports)
+
+    print(f"Test report of {sink.n_rows} rows has been saved in '{folder_path}'.")
+    print(f"Elapsed time - scoring: {scoring_time:.2f}s, report writing: {backend.elapsed:.2f}s")
+
+
+def _write_report(report_format: str, folder_path: str, name: str, reports: dict) -> float:
+    with profile_stage("write_report"), make_backend(report_format, folder_path, name) as backend:
+        backend.write_summary(reports)
+    return backend.elapsed
+
+
+def _export_artifact(
+    folder_path: str,
+    estimator: "trained model object",
+    meta: NamedTuple,
+    file_id: str,
+    encoder: dict,
+    after: list = (),
+) -> Future:
+    """
+    Export the artifact, in the background if a writer is active. Its meta data keeps
+    the stages finished when it is written, the ones of the `after` writes included.
+    """
+
+    def export():
+        with profile_stage("export_artifact"):
+            _export_meta_data(
+                save_path=folder_path,
+                meta=meta,
+                estimator=estimator,
+                file_id=file_id,
+                encoder=encoder,
+                after=after,
             )
+
+    return write_async("export_artifact", export)
+
+
+def _print_saved(phase: str, folder_path: str, fit_time: float, report: Future, artifact: Future):
+    def saved(_):
+        # a failed write is raised by the writer instead
+        if report.exception() is None and artifact.exception() is None:
+            print(f"{phase} report has been saved in '{folder_path}'.")
+            print(f"Elapsed time - fit: {fit_time:.2f}s, report writing: {report.result():.2f}s")
+
+    artifact.add_done_callback(saved)
+
+
+def _scores(estimator, X: pd.DataFrame, y: pd.Series, problem_type: str) -> pd.DataFrame:
+    prediction, probability = predict_with_probability(estimator, X.to_numpy())
+    return MeasuringTool(
+        y_true=y,
+        y_pred=prediction,
+        probability=probability,
+        classes=getattr(estimator, "classes_", None),
+        problem_type=problem_type,
+    ).get_scores()
+
+
+def _prediction_report(prediction, probability, index) -> pd.DataFrame:
+    pred_report = pd.DataFrame(dict(Prediction=prediction), index=index)
+    if probability is not None:
+        # probability of the positive class, or of the predicted class for multiclass
+        pred_report["Probability"] = (
+            probability[:, 1] if probability.shape[1] == 2 else probability.max(axis=1)
         )
-        pred_report.index.name = "ID"
+    pred_report.index.name = "ID"
+    return pred_report
+
+
+def _problem_type(probability) -> str:
+    if probability is None:
+        return "regression"
+    return "binary" if probability.shape[1] == 2 else "multiclass"
 
-        test_report = MeasuringTool(
-            y_true=y, y_pred=pred_report["Probability"]
-        ).get_scores()
 
-        folder_path = os.path.join(save_path, f"prediction_{file_id}")
-        create_folder(folder_path)
-        writer = pd.ExcelWriter(
-            os.path.join(folder_path, f"prediction_{file_id}.xlsx")
-        )  # pylint: disable=abstract-class-instantiated
-        test_report.to_excel(writer, sheet_name="Test Result", index=False)
-        pred_report.to_excel(writer, sheet_name="Prediction Result")
+def _elapsed_report(**elapsed) -> pd.DataFrame:
+    report = pd.Series(elapsed).to_frame("Seconds")
+    report.index = [i.replace("_", " ") for i in report.index]
+    report.index.name = "Stage"
+    return report
 
-        writer.save()
-        print(f"Test report has been saved in '{folder_path}'.")
+
+def _profile_report() -> pd.DataFrame:
+    # stages finished so far by the active profiler, None without one
+    profiler = active_profiler()
+    if profiler is None or not profiler.records:
+        return None
+    return profiler.to_frame()
 
 
 def read_report(path):
@@ -176,6 +442,11 @@ def read_report(path):
     """
     path = path.replace("\\", "/")
 
+    # artifact folder, memory-mapped without extracting anything
+    if is_artifact(resolve_artifact_path(path)):
+        artifact = load_artifact(path)
+        return artifact.estimator, artifact.meta
+
     # input path point out meta.zip file
     if path.endswith(".zip"):
         meta_path = "/".join(path.split("/")[:-1])
@@ -209,8 +480,10 @@ def read_report(path):
     # remove extracted files
     for f in paths:
         try:
-            if ("encoder" not in f.split("/")[-1]) and (
-                not f.split("/")[-1].endswith(".xlsx")
+            if (
+                ("encoder" not in f.split("/")[-1])
+                and ("pipeline" not in f.split("/")[-1])
+                and (not is_report_file(f))
             ):
                 os.remove(f)
         except:
@@ -233,6 +506,11 @@ def generate_file_id():
 
 
 def get_estimator_name(estimator):
+    from core.models.zoo import get_type_name
+
+    name = get_type_name(estimator)
+    if name is not None:
+        return name
     return "".join([i for i in list(str(estimator)) if i.isupper()])[:-1].lower()
 
 
@@ -250,53 +528,47 @@ def _export_meta_data(
     estimator: "trained model object",
     file_id: str,
     encoder: dict = None,
+    after: list = (),
 ):
     """
-    Make zip file which contains meta files after train. It will be used for test phase as a meta data.
+    Save the artifact folder which contains the trained model and meta data after train.
+    It will be used for test phase as a meta data(see core.models.artifact for the format).
 
     Args
     ------
-    path: str, save path
-    estimator_name: str, estimator name used to name report file
+    save_path: str, save path
+    meta: NamedTuple, meta data
+    estimator: sklearn estimator object, trained model
     file_id: str, report file ID
+    encoder: dict, classes of each encoded column
+    after: list, futures of the writes to wait for before the stages are recorded in the meta data
     """
-    # NamedTuple to dictionary to save as a json file
-    meta = dict(meta._asdict())
     estimator_name = get_estimator_name(estimator)
-    # make json file of encoder
-    if encoder is not None:
-        encoder_path = os.path.join(
-            save_path, f"{estimator_name}_encoder_{file_id}.json"
-        )
-        meta["encoder_path"] = encoder_path
-        with open(encoder_path, "w") as json_file:
-            json.dump(encoder, json_file)
-
-    # make json file of meta data
-    meta_path = os.path.join(save_path, f"{estimator_name}_meta_{file_id}.json")
-    with open(meta_path, "w") as json_file:
-        json.dump(meta, json_file)
-
-    # compress all meta files as a zip file
-    meta_zip = zipfile.ZipFile(
-        os.path.join(save_path, f"{estimator_name}_{file_id}.zip"), "w"
+
+    # compile preprocessing pipeline used for the inference
+    pipeline = PreprocessPipeline.from_meta(meta, encoder)
+    # decision trees are also flattened into arrays for low-latency scoring
+    compiled = CompiledTree.from_estimator(estimator) if hasattr(estimator, "tree_") else None
+
+    bin_edges = meta.bin_edges
+    # paths of extracted files only made sense for the zip of older artifacts, and the
+    # bin edges and the imputer are array sections of the artifact
+    meta = meta._replace(encoder_path=None, bin_edges=None, imputation=None)
+
+    def finished_meta() -> dict:
+        # stages finished so far, the ones of the writes to wait for included
+        wait(after)
+        profiler = active_profiler()
+        if profiler is None:
+            return dict(meta._asdict())
+        return dict(meta._replace(stage_profile=profiler.to_records())._asdict())
+
+    save_artifact(
+        os.path.join(save_path, f"{estimator_name}_{file_id}{ARTIFACT_SUFFIX}"),
+        estimator,
+        finished_meta,
+        encoder=encoder,
+        pipeline=pipeline,
+        compiled=compiled,
+        bin_edges=bin_edges,
     )
-    for folder, _, files in os.walk(save_path):
-        for file in files:
-            if file.endswith(".json") or file.endswith(".pkl"):
-                meta_zip.write(
-                    os.path.join(folder, file),
-                    os.path.relpath(os.path.join(folder, file), save_path),
-                    compress_type=zipfile.ZIP_DEFLATED,
-                )
-    meta_zip.close()
-    paths = [
-        f
-        for f in glob.glob(f"{save_path}/*")
-        if (not os.path.basename(f).endswith(".zip"))
-        and (not os.path.basename(f).endswith(".xlsx"))
-    ]
-
-    # remove all files except for the zip file
-    for f in paths:
-        os.remove(f)
@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import time
+import resource
+import threading
+from functools import wraps
+
+import pandas as pd
+
+
+# profilers entered and not exited yet, the last one records the stages
+_ACTIVE = list()
+
+
+class Profiler:
+    """
+    Wall time, CPU time, peak RSS and shape of the data of each stage of a run.
+
+    Stages are opened with `stage` or `profile_stage` and nest: a stage opened
+    inside another one is recorded under its name, e.g. 'train/load'. While the
+    profiler is entered, `profile_stage` anywhere in the package records into
+    it, and cost almost nothing when no profiler is entered.
+
+    CPU time is the one of the whole process, so it exceeds the wall time when
+    threads run in parallel. Peak RSS is the peak of the process so far, and
+    its growth over the stage tells the memory the stage took.
+    """
+
+    def __init__(self):
+        self.records = list()
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __enter__(self):
+        _ACTIVE.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        _ACTIVE.remove(self)
+
+    def stage(self, name: str, data=None) -> "_Stage":
+        """
+        Context manager measuring a stage, with the shape of `data` if given.
+        """
+        return _Stage(name, data, self)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        One row per stage, in the order the stages started.
+        """
+        columns = ["Wall Seconds", "CPU Seconds", "Peak RSS MB", "RSS Growth MB", "Rows", "Columns"]
+        records = sorted(self.records, key=lambda r: r["start"])
+        report = pd.DataFrame(
+            [[r[c] for c in ("wall", "cpu", "peak_rss_mb", "rss_growth_mb", "rows", "cols")] for r in records],
+            index=pd.Index([r["name"] for r in records], name="Stage"),
+            columns=columns,
+        )
+        # stages without data have no shape
+        return report.astype({"Rows": "Int64", "Columns": "Int64"})
+
+    def to_records(self) -> list:
+        """
+        Stages as JSON serializable dicts, in the order they started.
+        """
+        return [
+            {k: v for k, v in r.items() if k != "tid"}
+            for r in sorted(self.records, key=lambda r: r["start"])
+        ]
+
+    def to_chrome_trace(self, path: str):
+        """
+        Save the stages as a Chrome trace(chrome://tracing, Perfetto or speedscope).
+        """
+        events = [
+            dict(
+                name=r["name"].split("/")[-1],
+                cat="stage",
+                ph="X",
+                ts=r["start"] * 1e6,
+                dur=r["wall"] * 1e6,
+                pid=os.getpid(),
+                tid=r["tid"],
+                args=dict(
+                    stage=r["name"],
+                    cpu_seconds=r["cpu"],
+                    peak_rss_mb=r["peak_rss_mb"],
+                    rss_growth_mb=r["rss_growth_mb"],
+                    rows=r["rows"],
+                    cols=r["cols"],
+                ),
+            )
+            for r in self.records
+        ]
+        with open(path, "w") as json_file:
+            json.dump(dict(traceEvents=events, displayTimeUnit="ms"), json_file)
+
+    def _parents(self) -> list:
+        if not hasattr(self._local, "parents"):
+            self._local.parents = list()
+        return self._local.parents
+
+
+class _Stage:
+    def __init__(self, name: str, data=None, profiler: Profiler = None):
+        self.name = name
+        self.profiler = profiler
+        self.rows, self.cols = _shape(data)
+        self.seconds = None
+
+    def observe(self, data):
+        """
+        Record the shape of the data the stage produced, replacing the one it was given.
+        """
+        self.rows, self.cols = _shape(data)
+        return data
+
+    def __enter__(self):
+        if self.profiler is not None:
+            parents = self.profiler._parents()
+            self.path = "/".join(parents + [self.name])
+            parents.append(self.name)
+            self.rss = _peak_rss_mb()
+            self.cpu = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.seconds = end - self.start
+        if self.profiler is None:
+            return
+
+        peak_rss = _peak_rss_mb()
+        record = dict(
+            name=self.path,
+            start=self.start - self.profiler._origin,
+            wall=self.seconds,
+            cpu=time.process_time() - self.cpu,
+            peak_rss_mb=peak_rss,
+            rss_growth_mb=peak_rss - self.rss,
+            rows=self.rows,
+            cols=self.cols,
+            tid=threading.get_ident() % 2 ** 31,
+        )
+        self.profiler._parents().pop()
+        with self.profiler._lock:
+            self.profiler.records.append(record)
+
+
+def active_profiler() -> Profiler:
+    """
+    Profiler entered last, None if there is none.
+    """
+    return _ACTIVE[-1] if _ACTIVE else None
+
+
+def profile_stage(name: str, data=None) -> _Stage:
+    """
+    Measure a stage into the active profiler. Without one, only the wall time
+    is measured, in `seconds` of the stage.
+
+    >>> with profile_stage("auto_preprocess", data) as stage:
+    ...     data, meta, encoder = auto_preprocess(data, meta)
+    ...     stage.observe(data)
+    """
+    return _Stage(name, data, active_profiler())
+
+
+def bind_stages(func):
+    """
+    Wrap the function so that, called on another thread, its stages nest under the
+    stages open on this thread, as if it was called here.
+    """
+    profiler = active_profiler()
+    if profiler is None:
+        return func
+    parents = list(profiler._parents())
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        local = profiler._local
+        previous = getattr(local, "parents", None)
+        local.parents = list(parents)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            local.parents = previous if previous is not None else list()
+
+    return wrapper
+
+
+def _shape(data) -> ("rows", "cols"):
+    shape = getattr(data, "shape", None)
+    if shape is None:
+        return None, None
+    return int(shape[0]), int(shape[1]) if len(shape) > 1 else 1
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
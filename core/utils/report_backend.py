@@ -0,0 +1,162 @@
+import os
+import json
+import time
+
+import pandas as pd
+
+from core.utils.sink import PredictionSink
+
+
+# formats of the reports, the first one is the default
+REPORT_FORMATS = ("csv", "parquet", "excel")
+
+# rows of a sheet in Excel, header excluded
+EXCEL_MAX_ROWS = 1048575
+
+
+class ReportBackend:
+    """
+    Writer of a report made of small summary tables and large row-level tables.
+
+    The time spent writing is accumulated in `elapsed`, apart from the time
+    spent computing the report.
+
+    Args
+    ------
+    folder_path: str, folder to write the report in
+    name: str, name of the report, used as the prefix of the files
+    """
+
+    def __init__(self, folder_path: str, name: str):
+        self.folder_path = folder_path
+        self.name = name
+        self._elapsed = 0.0
+        self._sinks = list()
+
+    @property
+    def elapsed(self) -> float:
+        return self._elapsed + sum(sink.elapsed for sink in self._sinks)
+
+    def write_summary(self, reports: dict):
+        """
+        Write small tables(name: pandas.core.frame.DataFrame).
+        """
+        raise NotImplementedError()
+
+    def write_table(self, table_name: str, data: pd.DataFrame):
+        """
+        Write a large row-level table at once.
+        """
+        with self.sink(table_name) as sink:
+            sink.write(data)
+
+    def sink(self, table_name: str) -> PredictionSink:
+        """
+        Open a row-level table to be appended batch by batch.
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        for sink in self._sinks:
+            sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ColumnarBackend(ReportBackend):
+    """
+    Row-level tables in CSV or Parquet files and the summary in one JSON file.
+    """
+
+    def __init__(self, folder_path: str, name: str, output_format: str = "csv"):
+        super().__init__(folder_path, name)
+        self.output_format = output_format
+
+    def write_summary(self, reports: dict):
+        start = time.perf_counter()
+        summary = {
+            sheet_name: json.loads(
+                (report.reset_index() if _has_index(report) else report).to_json(orient="records")
+            )
+            for sheet_name, report in reports.items()
+        }
+        with open(os.path.join(self.folder_path, f"{self.name}.json"), "w") as json_file:
+            json.dump(summary, json_file, indent=2)
+        self._elapsed += time.perf_counter() - start
+
+    def sink(self, table_name: str) -> PredictionSink:
+        sink = PredictionSink(
+            os.path.join(self.folder_path, _file_name(table_name, self.name)), self.output_format
+        )
+        self._sinks.append(sink)
+        return sink
+
+
+class ExcelBackend(ReportBackend):
+    """
+    Every table in a sheet of one Excel workbook, written on close.
+    """
+
+    def __init__(self, folder_path: str, name: str):
+        super().__init__(folder_path, name)
+        self._sheets = dict()
+
+    def write_summary(self, reports: dict):
+        self._sheets.update(reports)
+
+    def write_table(self, table_name: str, data: pd.DataFrame):
+        if data.shape[0] > EXCEL_MAX_ROWS:
+            raise ValueError(
+                f"'{table_name}' has {data.shape[0]} rows, more than an Excel sheet holds. "
+                "Use the 'csv' or 'parquet' report format instead."
+            )
+        self._sheets[table_name] = data
+
+    def sink(self, table_name: str):
+        raise NotImplementedError("Excel reports can not be streamed")
+
+    def close(self):
+        super().close()
+        if not self._sheets:
+            return
+
+        start = time.perf_counter()
+        writer = pd.ExcelWriter(
+            os.path.join(self.folder_path, f"{self.name}.xlsx")
+        )  # pylint: disable=abstract-class-instantiated
+        for sheet_name, report in self._sheets.items():
+            report.to_excel(writer, sheet_name=sheet_name, index=_has_index(report))
+        writer.save()
+        self._sheets = dict()
+        self._elapsed += time.perf_counter() - start
+
+
+def make_backend(report_format: str, folder_path: str, name: str) -> ReportBackend:
+    """
+    Make the report backend of the format, which is one of REPORT_FORMATS.
+    """
+    if report_format == "excel":
+        return ExcelBackend(folder_path, name)
+    if report_format in PredictionSink.FORMATS:
+        return ColumnarBackend(folder_path, name, report_format)
+    raise NotImplementedError(f"report format '{report_format}' is not supported")
+
+
+def is_report_file(path: str) -> bool:
+    """
+    Whether the file is a part of a report rather than of the artifact.
+    """
+    file_name = os.path.basename(path)
+    return file_name.endswith(".xlsx") or "_report_" in file_name
+
+
+def _file_name(table_name: str, name: str) -> str:
+    return f"{name}_{table_name.lower().replace(' ', '_')}"
+
+
+def _has_index(report: pd.DataFrame) -> bool:
+    return not (isinstance(report.index, pd.RangeIndex) and report.index.name is None)
@@ -0,0 +1,81 @@
+import os
+import time
+
+import pandas as pd
+
+
+class PredictionSink:
+    """
+    Append batches of predictions to a file, so the whole result is never held in memory.
+    Time spent writing is accumulated in `elapsed`.
+
+    Args
+    ------
+    path: str, path of the file without extension
+    output_format: str, one of 'csv', 'parquet'(requires pyarrow)
+    """
+
+    FORMATS = ("csv", "parquet")
+
+    def __init__(self, path: str, output_format: str = "csv"):
+        if output_format not in self.FORMATS:
+            raise NotImplementedError(f"output format '{output_format}' is not supported")
+        self.path = f"{path}.{output_format}"
+        self.output_format = output_format
+        self.n_rows = 0
+        self.elapsed = 0.0
+        self._writer = None
+        self._schema = None
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def write(self, batch: pd.DataFrame):
+        start = time.perf_counter()
+        if self.output_format == "csv":
+            batch.to_csv(self.path, mode="a", header=self.n_rows == 0)
+        else:
+            table = self._to_table(batch)
+            if self._writer is None:
+                import pyarrow.parquet as pq
+
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            self._writer.write_table(table)
+        self.n_rows += batch.shape[0]
+        self.elapsed += time.perf_counter() - start
+
+    def close(self):
+        if self._writer is not None:
+            start = time.perf_counter()
+            self._writer.close()
+            self._writer = None
+            self.elapsed += time.perf_counter() - start
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _to_table(self, batch: pd.DataFrame):
+        """
+        Convert a batch to the schema of the first one, which every row group of the file
+        shares: an integer column with missing values in a later batch is written as integers
+        with nulls, rather than failing as a schema mismatch.
+        """
+        try:
+            import pyarrow as pa
+        except ModuleNotFoundError as err:
+            if err.name != "pyarrow":
+                raise
+            raise ImportError("pyarrow is required to write predictions in parquet") from err
+
+        if self._schema is None:
+            schema = pa.Schema.from_pandas(batch, preserve_index=True)
+            # a column missing in the whole first batch has no type of its own, pandas keeps
+            # such columns as objects, which are strings here
+            for i, field in enumerate(schema):
+                if pa.types.is_null(field.type):
+                    schema = schema.set(i, field.with_type(pa.string()))
+            self._schema = schema
+        return pa.Table.from_pandas(batch, schema=self._schema, preserve_index=True)
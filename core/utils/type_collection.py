@@ -7,6 +7,7 @@ class EstimatorTypes(Enum):
     SVM = "svm"
     LogisticRegression = "lr"
     LinearRegreesion = "reg"
+    HistGradientBoosting = "hgb"
 
 
 class ProblemTypes(Enum):
@@ -1,19 +1,65 @@
 import argparse
-import time
 
 from core.utils.type_collection import EstimatorTypes
-from core.train_test import train, test
 
 
 def main(args):
+    # each mode imports only its own dependencies to keep the startup short
     if args.mode == "train":
-        # del args.mode
-        train(**vars(args))
+        from core.models.train_test import train
+
+        train(
+            input=args.input,
+            target=args.target,
+            problem_type=args.problem_type,
+            save_path=args.save_path,
+            estimator=args.estimator,
+            cv=args.cv,
+            chunksize=args.chunksize,
+            cache_dir=args.cache_dir,
+            tuning=args.tuning or False,
+            time_budget=args.time_budget,
+            report_format=args.report_format,
+            trace_path=args.trace_path,
+            compact=args.compact,
+            max_bins=args.max_bins,
+            impute=args.impute,
+        )
     elif args.mode == "test":
-        del args.mode
-        test(args)
-    # if args.mode == 'train':
-    #     train
+        from core.models.train_test import test
+
+        test(
+            input=args.input,
+            meta_path=args.meta_path,
+            save_path=args.save_path,
+            cache_dir=args.cache_dir,
+            chunksize=args.chunksize,
+            report_format=args.report_format,
+            n_jobs=args.n_jobs,
+            trace_path=args.trace_path,
+        )
+    elif args.mode == "retrain":
+        from core.models.train_test import retrain
+
+        retrain(
+            input=args.input,
+            meta_path=args.meta_path,
+            save_path=args.save_path,
+            drift_threshold=args.drift_threshold,
+            n_new_estimators=args.n_new_estimators,
+            report_format=args.report_format,
+            trace_path=args.trace_path,
+            allow_refit=args.allow_refit,
+        )
+    elif args.mode == "serve":
+        from core.serving.server import serve
+
+        serve(
+            meta_paths=args.meta_path.split(","),
+            host=args.host,
+            port=args.port,
+            max_wait_ms=args.max_wait_ms,
+        )
 
 
 if __name__ == "__main__":
@@ -28,6 +74,22 @@ if __name__ == "__main__":
     parser.add_argument("--save_path", type=str, default="results")
     parser.add_argument("--cv", type=int, default=3)
     parser.add_argument("--meta_path", type=str, default=None)
+    parser.add_argument("--chunksize", type=int, default=None)
+    parser.add_argument("--cache_dir", type=str, default=None)
+    parser.add_argument("--report_format", type=str, default="csv")
+    parser.add_argument("--n_jobs", type=int, default=1)
+    parser.add_argument("--trace_path", type=str, default=None)
+    parser.add_argument("--compact", action="store_true")
+    parser.add_argument("--max_bins", type=int, default=None)
+    parser.add_argument("--impute", type=str, default="simple", choices=["simple", "knn"])
+    parser.add_argument("--drift_threshold", type=float, default=0.2)
+    parser.add_argument("--n_new_estimators", type=int, default=10)
+    parser.add_argument("--allow_refit", action="store_true")
+    parser.add_argument("--tuning", type=str, default=None)
+    parser.add_argument("--time_budget", type=float, default=None)
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max_wait_ms", type=float, default=5)
 
     args = parser.parse_args()
     main(args)
@@ -1,14 +1,89 @@
 import os
+import glob
 import sys
+import importlib.util
+import json
+import tempfile
+import subprocess
+import threading
 import unittest
+import urllib.request
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.datasets import make_classification
+from sklearn.metrics import f1_score, log_loss, roc_auc_score
+from sklearn.model_selection import cross_validate
 from typing import NamedTuple
 
 from core.data.load import load
-from core.preprocessing.preprocess import auto_preprocess
+from core.data.cache import DatasetCache
+from core.data.profile import profile_columns
+from core.data.summary import ColumnSummary
+from core.evaluation.cv import cross_validate_once
+from core.evaluation.metrics import StreamingMetrics, evaluate
+from core.preprocessing.preprocess import auto_preprocess, drop_and_impute, make_data_fit
+from core.preprocessing.pipeline import UNSEEN, PreprocessPipeline
+from core.preprocessing.binning import bin_features
+from core.preprocessing.impute import MissingMask
 from core.models.decisiontree import DecisionTree
-from core.utils.manage_report import generate_file_id
+from core.models.artifact import FORMAT_VERSION, MANIFEST, SUFFIX as ARTIFACT_SUFFIX
+from core.models.incremental import update_estimator
+from core.models.inference import ParallelPredictor
+from core.models.registry import ModelRegistry, get_artifact, load_artifact
+from core.models.search import search_estimators
+from core.models.zoo import make_estimator
+from core.models.tuning import (
+    decision_tree_space,
+    pruning_path_search,
+    successive_halving,
+)
+from core.serving.compiled import CompiledTree
+from core.serving.server import make_server
+from core.utils.async_writer import AsyncWriter, write_async
+from core.utils.manage_report import _export_meta_data, generate_file_id, read_report
+from core.utils.profiler import Profiler, profile_stage
+from core.utils.report_backend import EXCEL_MAX_ROWS, ExcelBackend
+from core.utils.feature_select import get_sequential_importance
 from core.utils.type_collection import EstimatorTypes, DataTypes
-from core.models.train_test import train, test
+from core.models.train_test import retrain, train, test
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# prints whether serving an artifact imports sklearn
+_SERVE_PROBE = """
+import sys
+from core.serving.server import make_server
+make_server([{path!r}], port=0).server_close()
+print("sklearn" in sys.modules)
+"""
+
+
+def glob_one(folder, pattern):
+    return glob.glob(os.path.join(folder, pattern))[0]
+
+
+def import_benchmark(name):
+    """
+    Import a script of the benchmarks folder, which is on the path while importing only,
+    for the script to find its siblings. Neither is left in sys.modules under its bare name.
+    """
+    folder = os.path.join(ROOT, "benchmarks")
+    spec = importlib.util.spec_from_file_location(
+        f"benchmarks_{name}", os.path.join(folder, f"{name}.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    before = set(sys.modules)
+    sys.path.insert(0, folder)
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(folder)
+        for loaded in set(sys.modules) - before:
+            if os.path.dirname(getattr(sys.modules[loaded], "__file__", None) or "") == folder:
+                del sys.modules[loaded]
+    return module
 
 
 class Test(unittest.TestCase):
@@ -31,20 +106,349 @@ class Test(unittest.TestCase):
         self.assertEqual(meta.target, self.TARGET)
         self.assertEqual(meta.problem_type, self.PROBLEM_TYPE)
 
+    def test_load_stream(self):
+        data, meta = load(
+            input=self.TRAIN.value, target=self.TARGET, problem_type=self.PROBLEM_TYPE
+        )
+        data_stream, meta_stream = load(
+            input=self.TRAIN.value,
+            target=self.TARGET,
+            problem_type=self.PROBLEM_TYPE,
+            chunksize=5000,
+        )
+
+        self.assertEqual(data.shape, data_stream.shape)
+        self.assertEqual(meta.categorical, meta_stream.categorical)
+        self.assertEqual(meta.profile["missing_rate"], meta_stream.profile["missing_rate"])
+        for c in meta.categorical:
+            self.assertEqual(meta.stats[c], meta_stream.stats[c])
+            self.assertIsInstance(data_stream[c].dtype, pd.CategoricalDtype)
+        # counted while reading, so the ID columns are found without scanning the data again
+        self.assertEqual(meta_stream.profile["n_unique"], profile_columns(data)["n_unique"])
+
+    def test_profile_columns(self):
+        mixed = pd.DataFrame(
+            {
+                "numeric": [1.0, 2.0, np.nan, 4.0, 4.0],
+                "nan_only": [np.nan] * 5,
+                "mixed": ["a", 1, np.nan, "a", 2.5],
+                "integer": [3, 1, 2, 2, 5],
+                "category": pd.Categorical(["x", "y", None, "y", "y"]),
+            }
+        )
+        for data in (mixed, pd.read_csv(self.TRAIN.value), pd.read_csv(DataTypes.TitanicTrain.value)):
+            profile = profile_columns(data)
+            n_rows = data.shape[0]
+
+            missing = {c: round(v * n_rows) for c, v in profile["missing_rate"].items()}
+            self.assertEqual(missing, data.isnull().sum().to_dict())
+            self.assertEqual(profile["n_unique"], data.nunique().to_dict())
+            for c, median in profile["median"].items():
+                expected = data[c].median()
+                self.assertTrue(np.isnan(median) if np.isnan(expected) else np.isclose(median, expected), c)
+            for c, mode in profile["mode"].items():
+                self.assertIn(mode, data[c].mode().tolist(), c)
+
+        self.assertEqual(profile_columns(mixed)["dtype"]["mixed"], "categorical")
+
     def test_preprocess(self):
         data, meta = load(
             input=self.TRAIN.value, target=self.TARGET, problem_type=self.PROBLEM_TYPE
         )
 
-        _, encoder = auto_preprocess(data, meta)
+        _, _, encoder = auto_preprocess(data, meta)
 
         self.assertEqual(len(encoder), len(meta.categorical))
 
+    def test_compact_load(self):
+        data, meta = load(
+            input=self.TRAIN.value, target=self.TARGET, problem_type=self.PROBLEM_TYPE
+        )
+        compact, compact_meta = load(
+            input=self.TRAIN.value,
+            target=self.TARGET,
+            problem_type=self.PROBLEM_TYPE,
+            compact=True,
+        )
+        self.assertEqual(meta.stats, compact_meta.stats)
+
+        data, meta, encoder = auto_preprocess(data, meta)
+        compact, compact_meta, compact_encoder = auto_preprocess(compact, compact_meta)
+
+        self.assertEqual(list(encoder), list(compact_encoder))
+        for c, classes in encoder.items():
+            self.assertEqual(list(classes), list(compact_encoder[c]))
+        self.assertTrue((compact[meta.categorical].values == data[meta.categorical].values).all())
+        self.assertLess(
+            compact.memory_usage(deep=True).sum() * 2, data.memory_usage(deep=True).sum()
+        )
+
+    def test_unseen_category(self):
+        data, meta = load(
+            input=self.TRAIN.value, target=self.TARGET, problem_type=self.PROBLEM_TYPE
+        )
+        feature = meta.categorical[0]
+        raw = data.head(10).copy()
+        raw.loc[raw.index[0], feature] = "never seen in train"
+        _, _, encoder = auto_preprocess(data, meta)
+
+        with tempfile.TemporaryDirectory() as folder:
+            input, encoder_path = os.path.join(folder, "test.csv"), os.path.join(folder, "encoder.json")
+            raw.to_csv(input, index=False)
+            # encoder file of the artifacts before the pipeline, classes as lists
+            with open(encoder_path, "w") as json_file:
+                json.dump({c: classes.tolist() for c, classes in encoder.items()}, json_file)
+            transformed = make_data_fit(input, meta._replace(encoder_path=encoder_path))
+
+        self.assertEqual(transformed[feature].iloc[0], UNSEEN)
+        self.assertTrue((transformed[feature].iloc[1:] >= 0).all())
+
+    def test_pipeline(self):
+        data, meta = load(
+            input=self.TRAIN.value, target=self.TARGET, problem_type=self.PROBLEM_TYPE
+        )
+        raw = data.copy()
+        data, meta, encoder = auto_preprocess(data, meta)
+
+        pipeline = PreprocessPipeline.from_meta(meta, encoder)
+        transformed = pipeline.transform(raw)
+
+        self.assertEqual(list(transformed.columns), list(data.columns))
+        self.assertTrue((transformed.values == data.values).all())
+
+    def test_impute(self):
+        data, meta = load(
+            input=DataTypes.TitanicTrain.value, target="Survived", problem_type=self.PROBLEM_TYPE
+        )
+        raw = data.copy()
+        mask = MissingMask.from_data(raw, list(raw.columns))
+        self.assertEqual(mask.counts(), raw.isnull().sum().to_dict())
+        self.assertLessEqual(mask.nbytes, (raw.shape[0] // 8 + 1) * raw.shape[1])
+
+        data, meta, encoder = auto_preprocess(data, meta, impute="knn")
+
+        # ID and mostly missing columns, categorical ones included
+        self.assertIn("Name", meta.dropped_cols)
+        self.assertIn("Cabin", meta.dropped_cols)
+        self.assertFalse(set(meta.dropped_cols) & set(data.columns))
+        self.assertFalse(data.isnull().any().any())
+        self.assertIsNotNone(meta.imputation)
+
+        transformed = PreprocessPipeline.from_meta(meta, encoder).transform(raw)
+        self.assertEqual(sorted(transformed.columns), sorted(data.columns))
+        self.assertTrue(np.allclose(transformed[data.columns].values, data.values))
+
+        # the imputer and the bin edges are saved as sections only, and rebuilt on load
+        features = [c for c in data.columns if c != "Survived"]
+        binned, meta = bin_features(data, meta._replace(features_for_train=features[:3]))
+        estimator = make_estimator("dt", self.PROBLEM_TYPE).fit(binned[features[:3]], binned["Survived"])
+        with tempfile.TemporaryDirectory() as folder:
+            _export_meta_data(folder, meta, estimator, "0", encoder)
+            path = glob_one(folder, "*" + ARTIFACT_SUFFIX)
+            with open(os.path.join(path, MANIFEST)) as json_file:
+                manifest = json.load(json_file)
+            loaded = load_artifact(path).meta
+
+            self.assertIsNone(manifest["meta"]["imputation"])
+            self.assertIsNone(manifest["meta"]["bin_edges"])
+            self.assertEqual(list(loaded.bin_edges), list(meta.bin_edges))
+            for c, edges in meta.bin_edges.items():
+                self.assertEqual(loaded.bin_edges[c].tolist(), edges)
+            self.assertTrue(np.array_equal(loaded.imputation["sample"], meta.imputation["sample"]))
+
+            # every column, as retrain needs them
+            every = dict(features_for_train=[])
+            expected = PreprocessPipeline.from_meta(meta._replace(**every), encoder).transform(raw)
+            transformed = PreprocessPipeline.from_meta(loaded._replace(**every), encoder).transform(raw)
+        self.assertTrue(transformed.equals(expected))
+
+    def test_drop_and_impute(self):
+        data, meta = load(
+            input=DataTypes.TitanicTrain.value, target="Survived", problem_type=self.PROBLEM_TYPE
+        )
+        dropped, meta, mask = drop_and_impute(data, meta, impute="knn")
+
+        # the dropped columns are recorded in the meta, once each
+        self.assertEqual(sorted(meta.dropped_cols), sorted(set(data.columns) - set(dropped.columns)))
+        self.assertIn("PassengerId", meta.dropped_cols)
+        self.assertFalse(dropped[mask.columns].isnull().any().any())
+        # the filled values are only flagged for the KNN imputer
+        self.assertIsNone(drop_and_impute(data, meta)[2])
+
+    def test_binning(self):
+        data, meta = load(
+            input=self.TRAIN.value, target=self.TARGET, problem_type=self.PROBLEM_TYPE
+        )
+        raw = data.copy()
+        data, meta, encoder = auto_preprocess(data, meta)
+        raw_codes = data.drop(self.TARGET, axis=1).copy()
+        data, meta = bin_features(data, meta, max_bins=32)
+        X = data.drop(self.TARGET, axis=1)
+        numeric = [c for c in X.columns if c not in meta.categorical]
+
+        # the codes of the categorical features are not binned
+        self.assertEqual(sorted(meta.bin_edges), sorted(numeric))
+        self.assertTrue((X[numeric].dtypes == np.uint8).all())
+        self.assertLessEqual(X[numeric].nunique().max(), 32)
+        self.assertTrue(X.drop(numeric, axis=1).equals(raw_codes.drop(numeric, axis=1)))
+
+        transformed = PreprocessPipeline.from_meta(meta, encoder).transform(raw)
+        self.assertTrue((transformed.values == data.values).all())
+
+        estimator = make_estimator(EstimatorTypes.HistGradientBoosting, self.PROBLEM_TYPE)
+        estimator.fit(X, data[self.TARGET])
+        self.assertGreater(estimator.score(X, data[self.TARGET]), 0.8)
+
+    def test_cache(self):
+        data, meta = load(
+            input=self.TRAIN.value, target=self.TARGET, problem_type=self.PROBLEM_TYPE
+        )
+        data, meta, encoder = auto_preprocess(data, meta)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = DatasetCache(cache_dir)
+            key = cache.key(self.TRAIN.value, dict(target=self.TARGET))
+            self.assertIsNone(cache.get(key))
+
+            cache.put(key, data, dict(encoder=encoder))
+            cached, payload = cache.get(key)
+
+        self.assertTrue(cached.equals(data))
+        # numeric columns are read from the memory-mapped files, not copied
+        self.assertIsInstance(cached[self.TARGET].to_numpy().base, np.memmap)
+        self.assertEqual(payload["encoder"], {c: list(v) for c, v in encoder.items()})
+
+    def test_registry(self):
+        files = sorted(os.listdir(self.META))
+        registry = ModelRegistry(maxsize=1)
+
+        first = registry.get(self.META)
+        second = registry.get(self.META)
+
+        self.assertIs(first, second)
+        self.assertEqual((registry.hits, registry.misses), (1, 1))
+        self.assertEqual(first.meta.target, self.TARGET)
+        self.assertEqual(sorted(os.listdir(self.META)), files)
+
+    def test_artifact(self):
+        legacy = load_artifact(self.META)
+        data = legacy.pipeline.transform(pd.read_csv(self.TEST.value))
+        X = data[legacy.pipeline.features].to_numpy()
+
+        with tempfile.TemporaryDirectory() as folder:
+            _export_meta_data(folder, legacy.meta, legacy.estimator, "0", legacy.encoder)
+            path = glob_one(folder, "*" + ARTIFACT_SUFFIX)
+            artifact = load_artifact(folder)
+            transformed = artifact.pipeline.transform(pd.read_csv(self.TEST.value))
+            estimator, meta = read_report(path)
+
+            # the compiled tree is served without loading the estimator, nor sklearn
+            served = subprocess.run(
+                [sys.executable, "-c", _SERVE_PROBE.format(path=os.path.abspath(path))],
+                cwd=ROOT,
+                stdout=subprocess.PIPE,
+                check=True,
+            ).stdout
+            self.assertEqual(served.decode().split()[-1], "False")
+
+            # the estimator is loaded on first use
+            predicted = artifact.estimator.predict(X)
+
+            with open(os.path.join(path, MANIFEST)) as json_file:
+                manifest = json.load(json_file)
+            with open(os.path.join(path, MANIFEST), "w") as json_file:
+                json.dump(dict(manifest, format_version=FORMAT_VERSION + 1), json_file)
+            with self.assertRaises(ValueError):
+                load_artifact(path)
+
+        self.assertIsInstance(artifact.pipeline.fill_values.base, np.memmap)
+        self.assertIsInstance(artifact.compiled.threshold.base, np.memmap)
+        # classes of the encoders are mapped sections, not lists of the manifest
+        self.assertEqual(list(artifact.encoder), list(legacy.encoder))
+        for c, classes in artifact.encoder.items():
+            self.assertIsInstance(classes, np.memmap)
+            self.assertEqual(classes.tolist(), list(legacy.encoder[c]))
+        self.assertTrue(transformed.equals(data))
+        self.assertTrue((artifact.compiled.predict(X) == legacy.estimator.predict(X)).all())
+        self.assertTrue((predicted == legacy.estimator.predict(X)).all())
+        self.assertEqual(meta.features_for_train, legacy.meta.features_for_train)
+
+    def test_serve(self):
+        server = make_server([self.META], port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        rows = pd.read_csv(self.TEST.value).head(20)
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{server.server_address[1]}/predict",
+            data=rows.to_json(orient="records").encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            result = json.loads(urllib.request.urlopen(request).read())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        artifact = get_artifact(self.META)
+        X = artifact.pipeline.transform(rows)[artifact.pipeline.features].to_numpy()
+        self.assertEqual(result["prediction"], artifact.estimator.predict(X).tolist())
+
+    def test_serve_missing_columns(self):
+        with tempfile.TemporaryDirectory() as save_path:
+            train(
+                input=DataTypes.TitanicTrain.value,
+                target="Survived",
+                problem_type=self.PROBLEM_TYPE,
+                save_path=save_path,
+                estimator=EstimatorTypes.DecisionTree,
+                cv=self.CV,
+                impute="knn",
+            )
+            server = make_server([glob_one(save_path, "dt_*")], port=0)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+            # a column the KNN imputer takes, which is not a feature
+            pipeline = next(iter(server.batchers.values())).artifact.pipeline
+            column = next(c for c in pipeline.columns if c not in pipeline.features)
+            rows = pd.read_csv(DataTypes.TitanicTest.value).head(5).drop(column, axis=1)
+            request = urllib.request.Request(
+                f"http://127.0.0.1:{server.server_address[1]}/predict",
+                data=rows.to_json(orient="records").encode(),
+                headers={"Content-Type": "application/json"},
+            )
+            try:
+                with self.assertRaises(urllib.error.HTTPError) as context:
+                    urllib.request.urlopen(request)
+            finally:
+                server.shutdown()
+                server.server_close()
+        self.assertEqual(context.exception.code, 400)
+
+    def test_sequential_importance(self):
+        data, meta = load(
+            input=self.TRAIN.value, target=self.TARGET, problem_type=self.PROBLEM_TYPE
+        )
+        data, meta, _ = auto_preprocess(data, meta)
+        X, y = data.drop(self.TARGET, axis=1), data[self.TARGET]
+
+        first, elapsed = get_sequential_importance(X, y, self.PROBLEM_TYPE, sample_size=5000)
+        second, _ = get_sequential_importance(X, y, self.PROBLEM_TYPE, sample_size=5000)
+
+        self.assertEqual(first.shape[0], X.shape[1])
+        self.assertTrue((first == second).all())
+        self.assertEqual(set(elapsed), {"sampling", "fit", "permutation"})
+
+        # a class with a single row is sampled without stratification
+        y_single = y.copy()
+        y_single.iloc[0] = 2
+        importances, _ = get_sequential_importance(X, y_single, "multiclass", sample_size=5000)
+        self.assertEqual(importances.shape[0], X.shape[1])
+
     def test_DecisionTree(self):
         data, meta = load(
             input=self.TRAIN.value, target=self.TARGET, problem_type=self.PROBLEM_TYPE
         )
-        data, encoder = auto_preprocess(data=data, meta=meta)
+        data, meta, encoder = auto_preprocess(data=data, meta=meta)
 
         model = DecisionTree(problem_type=self.PROBLEM_TYPE)
         model.fit(
@@ -56,6 +460,159 @@ class Test(unittest.TestCase):
             encoder=encoder
         )
 
+    def test_search(self):
+        data, meta = load(
+            input=self.TRAIN.value, target=self.TARGET, problem_type=self.PROBLEM_TYPE
+        )
+        data, meta, _ = auto_preprocess(data=data.head(3000), meta=meta)
+
+        best, report = search_estimators(
+            X=data.drop(self.TARGET, axis=1),
+            y=data[self.TARGET],
+            candidates=[EstimatorTypes.DecisionTree.value, EstimatorTypes.RandomForest.value],
+            problem_type=self.PROBLEM_TYPE,
+            cv=self.CV,
+            n_jobs=2,
+        )
+
+        self.assertEqual(list(report.index), ["dt", "rf"])
+        self.assertEqual(best, report["Validation"].idxmax())
+        self.assertTrue((report["Fit Time"] > 0).all())
+
+    def test_cross_validate_once(self):
+        data, meta = load(
+            input=self.TRAIN.value, target=self.TARGET, problem_type=self.PROBLEM_TYPE
+        )
+        data, meta, _ = auto_preprocess(data=data, meta=meta)
+        X = data.drop(self.TARGET, axis=1).values
+        y = data[self.TARGET].values
+        model = DecisionTree(problem_type=self.PROBLEM_TYPE)
+
+        expected = cross_validate(
+            model.estimator, X, y, cv=self.CV, scoring=["accuracy", "f1"], return_train_score=True
+        )
+        result = cross_validate_once(model.estimator, X, y, self.CV, n_jobs=1)
+
+        self.assertTrue(np.allclose(result.valid_scores["Accuracy"], expected["test_accuracy"]))
+        self.assertTrue(np.allclose(result.valid_scores["F1"], expected["test_f1"]))
+        self.assertTrue(np.allclose(result.train_scores["F1"], expected["train_f1"]))
+        self.assertEqual(result.oof_prediction.shape, y.shape)
+
+        ensemble = cross_validate_once(model.estimator, X, y, self.CV, refit="ensemble", n_jobs=1)
+        self.assertEqual(len(ensemble.estimator.estimators_), self.CV)
+        self.assertTrue(set(ensemble.estimator.predict(X[:100])) <= set(y))
+
+        # a class of a single row is missing from the train rows of one fold
+        y_rare = y.copy()
+        y_rare[0] = 2
+        ensemble = cross_validate_once(model.estimator, X, y_rare, self.CV, refit="ensemble", n_jobs=1)
+        self.assertEqual(ensemble.oof_probability.shape, (y.shape[0], 3))
+        self.assertTrue(np.allclose(ensemble.oof_probability.sum(axis=1), 1))
+        self.assertEqual(ensemble.estimator.classes_.tolist(), [0, 1, 2])
+        probability = ensemble.estimator.predict_proba(X[:100])
+        self.assertEqual(probability.shape, (100, 3))
+        self.assertTrue(np.allclose(probability.sum(axis=1), 1))
+
+    def test_metrics(self):
+        rng = np.random.RandomState(42)
+        y = rng.randint(0, 3, 10000)
+        probability = rng.dirichlet(np.ones(3), 10000)
+        prediction = probability.argmax(axis=1)
+        groups = rng.randint(0, 2, 10000)
+
+        result = evaluate(y, prediction, "multiclass", probability=probability, groups=groups)
+
+        for g in (0, 1):
+            y_g, pred_g, proba_g = y[groups == g], prediction[groups == g], probability[groups == g]
+            self.assertAlmostEqual(result["F1"][g], f1_score(y_g, pred_g, average="macro"))
+            self.assertAlmostEqual(
+                result["ROC-AUC"][g], roc_auc_score(y_g, proba_g, multi_class="ovr")
+            )
+            self.assertAlmostEqual(result["LogLoss"][g], log_loss(y_g, proba_g))
+
+        # missing targets and classes the model never saw are left out, not raised on
+        y_test = np.where(np.arange(10000) % 10 == 0, np.nan, y.astype(np.float64))
+        y_test[1] = 7
+        known = np.isin(y_test, [0, 1, 2])
+        result = evaluate(
+            y_test, prediction, "multiclass", probability=probability, classes=np.array([0, 1, 2])
+        )
+        self.assertEqual(result["Count"].iloc[0], known.sum())
+        self.assertAlmostEqual(
+            result["LogLoss"].iloc[0], log_loss(y_test[known], probability[known])
+        )
+        streaming = StreamingMetrics("multiclass", classes=np.array([0, 1, 2]))
+        streaming.update(y_test, prediction, probability)
+        self.assertEqual(streaming.count, known.sum())
+        self.assertAlmostEqual(streaming.get_scores()["Accuracy"].iloc[0], result["Accuracy"].iloc[0])
+
+    def test_tuning(self):
+        data, meta = load(
+            input=self.TRAIN.value, target=self.TARGET, problem_type=self.PROBLEM_TYPE
+        )
+        data, meta, _ = auto_preprocess(data=data, meta=meta)
+        model = DecisionTree(problem_type=self.PROBLEM_TYPE)
+
+        best_params, history = successive_halving(
+            estimator=model.estimator,
+            param_space=decision_tree_space(model.estimator),
+            X=data.drop(self.TARGET, axis=1).values,
+            y=data[self.TARGET].values,
+            problem_type=self.PROBLEM_TYPE,
+            cv=self.CV,
+            n_candidates=27,
+            max_fits=27 * self.CV + 9 * self.CV,
+        )
+
+        # the budget allows the first two rounds only
+        self.assertEqual(list(history["Round"].unique()), [0, 1])
+        self.assertEqual(set(best_params), set(decision_tree_space(model.estimator)))
+
+        # a time budget spent by the first round stops before the second one
+        _, history = successive_halving(
+            estimator=model.estimator,
+            param_space=decision_tree_space(model.estimator),
+            X=data.drop(self.TARGET, axis=1).values,
+            y=data[self.TARGET].values,
+            problem_type=self.PROBLEM_TYPE,
+            cv=self.CV,
+            n_candidates=27,
+            time_budget=0.0,
+        )
+        self.assertEqual(list(history["Round"].unique()), [0])
+
+        # only the decision tree takes the tuning options
+        with self.assertRaises(ValueError):
+            train(
+                input=self.TRAIN.value,
+                target=self.TARGET,
+                problem_type=self.PROBLEM_TYPE,
+                save_path=self.SAVE_PATH,
+                estimator="rf",
+                cv=self.CV,
+                tuning="halving",
+            )
+
+    def test_pruning_path(self):
+        data, meta = load(
+            input=self.TRAIN.value, target=self.TARGET, problem_type=self.PROBLEM_TYPE
+        )
+        data, meta, _ = auto_preprocess(data=data, meta=meta)
+        model = DecisionTree(problem_type=self.PROBLEM_TYPE)
+
+        best_alpha, curve = pruning_path_search(
+            estimator=model.estimator,
+            X=data.drop(self.TARGET, axis=1).values,
+            y=data[self.TARGET].values,
+            problem_type=self.PROBLEM_TYPE,
+            cv=self.CV,
+        )
+
+        self.assertIn(best_alpha, curve["Alpha"].values)
+        best = curve.loc[curve["Alpha"] == best_alpha, "Score"].iloc[0]
+        self.assertEqual(best, curve["Score"].max())
+        self.assertTrue((curve["Leaves"].diff().dropna() <= 0).all())
+
     def test_train(self):
         train(
             input=self.TRAIN.value,
@@ -66,5 +623,259 @@ class Test(unittest.TestCase):
             cv=self.CV,
         )
 
+    def test_profile(self):
+        with tempfile.TemporaryDirectory() as save_path:
+            trace_path = os.path.join(save_path, "trace.json")
+            train(
+                input=self.TRAIN.value,
+                target=self.TARGET,
+                problem_type=self.PROBLEM_TYPE,
+                save_path=save_path,
+                estimator=EstimatorTypes.DecisionTree,
+                cv=self.CV,
+                trace_path=trace_path,
+            )
+            folder = glob_one(save_path, "dt_*")
+            with open(glob_one(folder, "*_report_*.json")) as json_file:
+                profile = pd.DataFrame(json.load(json_file)["Profile"]).set_index("Stage")
+            with open(trace_path) as json_file:
+                events = json.load(json_file)["traceEvents"]
+            artifact = get_artifact(folder)
+
+        for stage in ("train/load", "train/auto_preprocess", "train/select_feature", "train/cross_validate"):
+            self.assertIn(stage, profile.index)
+        self.assertEqual(profile.loc["train/load", "Rows"], pd.read_csv(self.TRAIN.value).shape[0])
+        self.assertTrue((profile["CPU Seconds"] >= 0).all())
+        self.assertIn("train/write_report", [s["name"] for s in artifact.meta.stage_profile])
+        self.assertIn("train", [e["args"]["stage"] for e in events])
+        # the writes are flushed before the root stage ends, so it spans all of them
+        root = next(e for e in events if e["args"]["stage"] == "train")
+        self.assertTrue(all(e["ts"] + e["dur"] <= root["ts"] + root["dur"] + 1 for e in events))
+
+    def test_async_writer(self):
+        def write(path, text):
+            with profile_stage("write"), open(path, "w") as text_file:
+                text_file.write(text)
+
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "written.txt")
+            with Profiler() as profiler, profiler.stage("run"):
+                with AsyncWriter() as writer:
+                    future = write_async("text", write, path, "done")
+                self.assertTrue(future.done())
+                with open(path) as text_file:
+                    self.assertEqual(text_file.read(), "done")
+
+            with self.assertRaises(FileNotFoundError):
+                with AsyncWriter():
+                    write_async("text", write, os.path.join(folder, "missing", "written.txt"), "")
+
+        self.assertIn("run/write", [r["name"] for r in profiler.records])
+        self.assertIn("text", writer.elapsed)
+
+    def test_excel_backend(self):
+        summary = pd.DataFrame({"Score": [0.5, 0.75]}, index=pd.Index(["F1", "AUC"], name="Metric"))
+        table = pd.DataFrame({"id": [1, 2, 3], "prediction": ["yes", "no", "yes"]})
+
+        with tempfile.TemporaryDirectory() as folder:
+            with ExcelBackend(folder, "report") as backend:
+                backend.write_summary({"Metrics": summary})
+                backend.write_table("Predictions", table)
+            sheets = pd.read_excel(
+                os.path.join(folder, "report.xlsx"), sheet_name=None, engine="openpyxl"
+            )
+
+        self.assertEqual(list(sheets), ["Metrics", "Predictions"])
+        pd.testing.assert_frame_equal(sheets["Metrics"].set_index("Metric"), summary)
+        pd.testing.assert_frame_equal(sheets["Predictions"], table)
+
+        # a table longer than a sheet is rejected rather than truncated
+        too_long = pd.DataFrame({"id": np.zeros(EXCEL_MAX_ROWS + 1, dtype=np.int8)})
+        with tempfile.TemporaryDirectory() as folder:
+            backend = ExcelBackend(folder, "report")
+            with self.assertRaises(ValueError):
+                backend.write_table("Predictions", too_long)
+            backend.close()
+            self.assertEqual(os.listdir(folder), [])
+
+    def test_retrain(self):
+        with tempfile.TemporaryDirectory() as save_path:
+            train(
+                input=self.TRAIN.value,
+                target=self.TARGET,
+                problem_type=self.PROBLEM_TYPE,
+                save_path=save_path,
+                estimator=EstimatorTypes.HistGradientBoosting,
+                cv=self.CV,
+            )
+            previous = load_artifact(glob_one(save_path, "hgb_*"))
+            with tempfile.TemporaryDirectory() as retrain_path:
+                with self.assertRaises(ValueError):
+                    retrain(input=self.TEST.value, meta_path=glob_one(save_path, "hgb_*"), save_path=retrain_path)
+                retrain(
+                    input=self.TEST.value,
+                    meta_path=glob_one(save_path, "hgb_*"),
+                    save_path=retrain_path,
+                    allow_refit=True,
+                )
+                updated = load_artifact(glob_one(retrain_path, "hgb_*"))
+                data = updated.pipeline.transform(pd.read_csv(self.TEST.value))
+                X, y = data[updated.pipeline.features].to_numpy(), data[self.TARGET].to_numpy()
+                y = y.astype(updated.estimator.classes_.dtype)
+                score, previous_score = updated.estimator.score(X, y), previous.estimator.score(X, y)
+
+        n_rows = sum(pd.read_csv(path).shape[0] for path in (self.TRAIN.value, self.TEST.value))
+        self.assertEqual(updated.meta.summary["n_rows"], n_rows)
+        self.assertEqual(updated.meta.features_for_train, previous.meta.features_for_train)
+        # fitted on the slice, the model is at least as accurate on it as before
+        self.assertGreaterEqual(score, previous_score)
+        self.assertGreater(score, max(np.mean(y == 0), np.mean(y == 1)))
+
+    def test_column_summary(self):
+        data = pd.read_csv(DataTypes.TitanicTrain.value)
+        first, second = data.iloc[:600], data.iloc[600:]
+        summary = ColumnSummary.from_data(first, "Survived")
+
+        # the categories of an ID-like column are summed up, and do not drift
+        self.assertEqual(sum(summary.counts["Ticket"].values()), first["Ticket"].notnull().sum())
+        self.assertLessEqual(len(summary.counts["Ticket"]), 2)
+        self.assertEqual(summary.counts["Sex"], first["Sex"].value_counts().to_dict())
+        self.assertLess(summary.drift(ColumnSummary.from_data(second, "Survived"))["Ticket"], 0.1)
+        merged = summary.merge(ColumnSummary.from_data(second, "Survived"))
+        self.assertEqual(merged.stats()["Embarked"][0], data["Embarked"].mode()[0])
+
+        with tempfile.TemporaryDirectory() as folder:
+            for name, part in (("first", first), ("second", second)):
+                part.to_csv(os.path.join(folder, f"{name}.csv"), index=False)
+            train(
+                input=os.path.join(folder, "first.csv"),
+                target="Survived",
+                problem_type=self.PROBLEM_TYPE,
+                save_path=os.path.join(folder, "train"),
+                estimator=EstimatorTypes.DecisionTree,
+                cv=self.CV,
+            )
+            previous = load_artifact(glob_one(os.path.join(folder, "train"), "dt_*"))
+            retrain(
+                input=os.path.join(folder, "second.csv"),
+                meta_path=glob_one(os.path.join(folder, "train"), "dt_*"),
+                save_path=os.path.join(folder, "retrain"),
+                allow_refit=True,
+            )
+            updated = load_artifact(glob_one(os.path.join(folder, "retrain"), "dt_*"))
+            with open(glob_one(os.path.join(folder, "retrain"), "dt_*/dt_report_*.json")) as file:
+                report = json.load(file)
+
+        # the models are compared on rows held out of the refit, which the tree does not fit exactly
+        retrain_report = {row["Retrain"]: row["Value"] for row in report["Retrain"]}
+        self.assertEqual(retrain_report["Rows"] + retrain_report["Rows Held Out"], second.shape[0])
+        self.assertLess(report["Evaluation"][1]["Accuracy"], 1.0)
+
+        # the dropped columns are not summarized, and the features are not selected again
+        for meta in (previous.meta, updated.meta):
+            self.assertFalse(set(meta.summary["null_counts"]) & set(meta.dropped_cols))
+        self.assertEqual(updated.meta.features_for_train, previous.meta.features_for_train)
+
+    def test_update_estimator(self):
+        X, y = make_classification(n_samples=6000, n_features=8, random_state=0)
+        # a slice whose values spread differently, so its bins differ from the ones of train
+        X_slice, y_slice = np.where(X[3000:] > 0, X[3000:] * 5, X[3000:]), y[3000:]
+
+        hgb = make_estimator(EstimatorTypes.HistGradientBoosting, self.PROBLEM_TYPE, max_iter=30)
+        hgb.fit(X[:3000], y[:3000])
+        # fitting it again forgets the data it was fitted on, so it is done only if allowed
+        with self.assertRaises(ValueError):
+            update_estimator(hgb, X_slice, y_slice)
+        updated, strategy = update_estimator(hgb, X_slice, y_slice, allow_refit=True)
+        fitted = clone(hgb).fit(X_slice, y_slice)
+        self.assertEqual(strategy, "refit")
+        self.assertTrue((updated.predict(X_slice) == fitted.predict(X_slice)).all())
+        self.assertGreater(updated.score(X_slice, y_slice), hgb.score(X_slice, y_slice))
+
+        rf = make_estimator(EstimatorTypes.RandomForest, self.PROBLEM_TYPE, n_estimators=10)
+        rf.fit(X[:3000], y[:3000])
+        updated, strategy = update_estimator(rf, X_slice, y_slice, n_new_estimators=5)
+        self.assertEqual(strategy, "warm_start")
+        self.assertEqual(len(updated.estimators_), 15)
+        self.assertEqual(len(rf.estimators_), 10)
+        # a class missing from the slice changes the outputs, so the forest is fitted again
+        with self.assertRaises(ValueError):
+            update_estimator(rf, X_slice[y_slice == 0], y_slice[y_slice == 0])
+
+    def test_test_stream(self):
+        with tempfile.TemporaryDirectory() as save_path:
+            test(input=self.TRAIN.value, meta_path=self.META, save_path=save_path, chunksize=4000)
+            folder = os.path.join(save_path, os.listdir(save_path)[0])
+            predictions = pd.read_csv(glob_one(folder, "*_prediction_result.csv"))
+            with open(glob_one(folder, "*.json")) as json_file:
+                result = pd.DataFrame(json.load(json_file)["Test Result"])
+
+        artifact = get_artifact(self.META)
+        data = artifact.pipeline.transform(pd.read_csv(self.TRAIN.value))
+        probability = artifact.estimator.predict_proba(data[artifact.pipeline.features].to_numpy())
+
+        self.assertEqual(predictions.shape[0], data.shape[0])
+        self.assertTrue(np.allclose(predictions["Probability"], probability[:, 1]))
+        expected = evaluate(
+            data[self.TARGET], predictions["Prediction"], self.PROBLEM_TYPE, probability=probability
+        )
+        for c in result.columns:
+            self.assertAlmostEqual(result[c][0], expected[c][0], places=3)
+
+    def test_parallel_predictor(self):
+        artifact = get_artifact(self.META)
+        data = artifact.pipeline.transform(pd.read_csv(self.TRAIN.value))
+        X = data[artifact.pipeline.features].to_numpy()
+
+        with ParallelPredictor(artifact.estimator, n_jobs=2, min_shard_size=1000) as predictor:
+            self.assertEqual(len(predictor._shard_bounds(X.shape[0])), 2)
+            prediction, probability = predictor.predict(X)
+            second, _ = predictor.predict(X[:5000])
+
+        self.assertTrue((prediction == artifact.estimator.predict(X)).all())
+        self.assertTrue(np.allclose(probability, artifact.estimator.predict_proba(X)))
+        self.assertTrue((second == prediction[:5000]).all())
+
+    def test_compiled_tree(self):
+        artifact = get_artifact(self.META)
+        data = artifact.pipeline.transform(pd.read_csv(self.TEST.value))
+        X = data[artifact.pipeline.features].to_numpy()
+
+        compiled = CompiledTree.from_estimator(artifact.estimator)
+
+        self.assertTrue((compiled.predict(X) == artifact.estimator.predict(X)).all())
+        self.assertTrue((compiled.predict(X[:3]) == artifact.estimator.predict(X[:3])).all())
+        self.assertTrue((compiled.predict_proba(X) == artifact.estimator.predict_proba(X)).all())
+
+    def test_import_time(self):
+        import_time = import_benchmark("import_time")
+
+        for mode in ("test", "serve"):
+            result = import_time.measure(import_time.MODES[mode], repeat=1)
+            self.assertEqual(result["modules"], [], f"{mode} mode loads train-only modules")
+
+    def test_benchmark(self):
+        run = import_benchmark("run").run
+
+        result = run(shape="Marketing_NaNs_Train", n_rows=3000)
+
+        self.assertEqual(
+            list(result["stages"]),
+            [
+                "generate",
+                "load",
+                "auto_preprocess",
+                "select_feature",
+                "evaluate_cv",
+                "export_train_report",
+                "load_artifact",
+                "read_report",
+                "make_data_fit",
+                "score",
+                "export_test_report",
+            ],
+        )
+        self.assertTrue(all(s["seconds"] >= 0 for s in result["stages"].values()))
+
     def test_test(self):
         test(input=self.TEST.value, meta_path=self.META, save_path=self.SAVE_PATH)